@@ -0,0 +1,98 @@
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.config_store import build_config
+from benchmarks.device_resolver import report
+from benchmarks.fake_system import FakeSystem
+from src.application.dispatch import DispatchTable
+from src.file.config_store import ConfigStore
+from src.file.file import JSONFile
+
+
+def measure(operation, repeat, prepare=None):
+    samples = []
+
+    for index in range(repeat):
+        if prepare:
+            prepare(index)
+
+        start = time.perf_counter_ns()
+        operation(index)
+        samples.append(time.perf_counter_ns() - start)
+
+    return samples
+
+
+def config_operations(devices=50, macros=200, repeat=20):
+    system = FakeSystem(actions=12)
+    config = build_config(devices, macros)
+
+    # Point the macros at functions that exist, so compiling the dispatch table does real work
+    for entry in config:
+        for index, macro in enumerate(entry["macros"]):
+            macro["function"] = system.functions[index % len(system.functions)]["name"]
+
+    results = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        file = JSONFile(path=os.path.join(directory, "device_config.json"))
+        file.save_file(config)
+        results["file_size_kb"] = os.path.getsize(file.path) / 1024
+
+        store = ConfigStore(file=file, flush_delay=None)
+        table = DispatchTable()
+        registry = system.registry()
+
+        samples = {
+            "load": measure(lambda index: store.load(), repeat),
+            "compile": measure(lambda index: table.compile(store.entries, registry), repeat),
+            "edit": measure(
+                lambda index: store.save_macro("Device 0", f"f{index % macros}", f"Action {index % 12}"), repeat
+            ),
+            "edit_and_compile": measure(
+                lambda index: (
+                    store.save_macro("Device 1", f"f{index % macros}", f"Action {index % 12}"),
+                    table.compile(store.entries, registry),
+                ),
+                repeat,
+            ),
+            "flush": measure(
+                lambda index: (store.save_macro("Device 2", "f0", f"Action {index % 12}"), store.flush()), repeat
+            ),
+        }
+
+        def external_edit(index):
+            # Another process (the editor) rewrote the file, only the store noticing and re-reading it is timed
+            config[3]["macros"][0]["function"] = f"Action {index % 12}"
+            file.save_file(config)
+            os.utime(file.path, ns=(index, index))
+
+        samples["reload"] = measure(lambda index: store.reload(), repeat, prepare=external_edit)
+        store.close()
+
+    for name, operation_samples in samples.items():
+        operation_samples.sort()
+        # Best of the repetitions, the operations are deterministic and the rest is scheduler noise
+        results[f"{name}_best_us"] = operation_samples[0] / 1000
+
+    return results, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Config operations on a large device_config.json")
+    parser.add_argument("--devices", type=int, default=50)
+    parser.add_argument("--macros", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    results, samples = config_operations(args.devices, args.macros, args.repeat)
+
+    print(f"{args.devices} devices x {args.macros} macros, {results['file_size_kb']:.0f} KB")
+    for name, operation_samples in samples.items():
+        report(name, operation_samples)
+
+
+if __name__ == "__main__":
+    main()
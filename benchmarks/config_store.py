@@ -0,0 +1,88 @@
+import argparse
+import os
+import tempfile
+import time
+
+from src.file.config_store import ConfigStore
+from src.file.file import JSONFile
+
+
+def build_config(devices, macros):
+    return [
+        {
+            "device": f"Device {device}",
+            "device_id": device,
+            "device_type": "USB",
+            "macros": [{"key": f"f{macro}", "function": "Volume +"} for macro in range(macros)],
+        }
+        for device in range(devices)
+    ]
+
+
+class CountingJSONFile(JSONFile):
+    def __init__(self, path):
+        super().__init__(path)
+
+        self.reads = 0
+        self.writes = 0
+
+    def load_file(self):
+        self.reads += 1
+        return super().load_file()
+
+    def save_file(self, data):
+        self.writes += 1
+        super().save_file(data)
+
+
+def edit_per_file_roundtrip(file, edits):
+    # Before: every edit re-reads the whole file and rewrites it
+    for edit in range(edits):
+        data = file.load_file()
+        data[0]["macros"][edit % len(data[0]["macros"])]["function"] = f"Function {edit}"
+        file.save_file(data=data)
+
+
+def edit_config_store(file, edits):
+    # After: edits touch memory, the store writes once on flush
+    store = ConfigStore(file=file, flush_delay=None)
+    store.load()
+
+    for edit in range(edits):
+        store.save_macro("Device 0", f"f{edit % 100}", f"Function {edit}")
+
+    store.close()
+
+
+def run(label, edit, config, edits):
+    with tempfile.TemporaryDirectory() as directory:
+        file = CountingJSONFile(path=os.path.join(directory, "device_config.json"))
+        JSONFile.save_file(file, config)
+
+        start = time.perf_counter()
+        edit(file, edits)
+        elapsed = time.perf_counter() - start
+
+        size = os.path.getsize(file.path)
+
+    print(
+        f"{label:<28} {elapsed * 1000:>10.1f}ms  reads={file.reads:<6} writes={file.writes:<6} "
+        f"bytes written={file.writes * size}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of sequential macro edits")
+    parser.add_argument("--edits", type=int, default=1000)
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--macros", type=int, default=100)
+    args = parser.parse_args()
+
+    config = build_config(args.devices, args.macros)
+
+    run("file round-trip (before)", edit_per_file_roundtrip, config, args.edits)
+    run("config store (after)", edit_config_store, config, args.edits)
+
+
+if __name__ == "__main__":
+    main()
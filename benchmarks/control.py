@@ -0,0 +1,154 @@
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.device_resolver import report
+from benchmarks.fake_system import FakeSystem
+from benchmarks.replay import build_config
+from src.control.protocol import encode, read_message
+from src.profiler.stats_server import is_listening, query_stats
+
+
+def serve(directory, macros):
+    from src.application.application import Application
+    from src.data.settings import settings
+    from src.file.file import JSONFile
+
+    system = FakeSystem()
+    scenario_settings = {
+        **settings,
+        "DEVICE_CONFIG_PATH": os.path.join(directory, "device_config.json"),
+        "DEVICE_CACHE_PATH": os.path.join(directory, "device_cache.json"),
+        "STATS_SOCKET": os.path.join(directory, "stats.sock"),
+        "CONTROL_SOCKET": os.path.join(directory, "control.sock"),
+        "EXECUTOR_QUEUE_SIZE": 4096,
+    }
+    JSONFile(path=scenario_settings["DEVICE_CONFIG_PATH"]).save_file(build_config(system, macros))
+
+    application = Application(settings=scenario_settings, system=system)
+    application.start()
+    application.follow_current_device = False
+    application.start_keyboard_listener()
+
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopped.set())
+    stopped.wait()
+
+    application.shutdown()
+
+
+async def client(path, requests, message, samples, interval=0.0, offset=0.0):
+    reader, writer = await asyncio.open_unix_connection(path)
+    frame = encode(message)
+    started = time.perf_counter() + offset
+
+    try:
+        for index in range(requests):
+            # Paced clients send on a fixed schedule, closed-loop ones as soon as the previous answer arrives
+            if interval:
+                await asyncio.sleep(max(0.0, started + index * interval - time.perf_counter()))
+
+            start = time.perf_counter_ns()
+            writer.write(frame)
+            response = await read_message(reader)
+            samples.append(time.perf_counter_ns() - start)
+
+            if not response["ok"]:
+                raise RuntimeError(response["error"])
+    finally:
+        writer.close()
+
+
+async def load(path, clients, requests, message, interval=0.0):
+    samples = []
+
+    start = time.perf_counter()
+    # Paced clients are spread over the interval instead of all sending at the same moment
+    await asyncio.gather(
+        *(client(path, requests, message, samples, interval, interval * index / clients) for index in range(clients))
+    )
+    elapsed = time.perf_counter() - start
+
+    return samples, len(samples) / elapsed
+
+
+def spawned_connect(path, count):
+    # Before: a script had to start a process per action, this is only the interpreter start and a connect
+    samples = []
+
+    for _ in range(count):
+        start = time.perf_counter_ns()
+        subprocess.run(
+            [sys.executable, "-c", f"import socket; s = socket.socket(socket.AF_UNIX); s.connect({path!r})"],
+            check=True,
+        )
+        samples.append(time.perf_counter_ns() - start)
+
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round trips of the control socket under concurrent clients")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--requests", type=int, default=500, help="requests per client")
+    parser.add_argument("--batch", type=int, default=10, help="invocations per batch request")
+    parser.add_argument("--rate", type=float, default=1000, help="requests per second of all paced clients together")
+    parser.add_argument("--macros", type=int, default=500)
+    parser.add_argument("--serve", metavar="DIRECTORY", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.macros)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "control.sock")
+
+        # The application runs in its own process, so clients and server do not share a GIL
+        server = subprocess.Popen([sys.executable, "-m", "benchmarks.control", "--serve", directory])
+
+        try:
+            deadline = time.monotonic() + 10.0
+            while not is_listening(path):
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise RuntimeError("control server did not start")
+                time.sleep(0.05)
+
+            action = FakeSystem().functions[0]["id"]
+            scenarios = [
+                ("ping", {"op": "ping"}, 1),
+                ("invoke", {"op": "invoke", "action": action}, 1),
+                ("batch", {"op": "batch", "actions": [action] * args.batch}, args.batch),
+            ]
+
+            for clients in args.clients:
+                print(f"{clients} concurrent clients x {args.requests} requests")
+
+                for label, message, invocations in scenarios:
+                    samples, rate = asyncio.run(load(path, clients, args.requests, message))
+                    report(f"  {label} round trip", samples)
+                    print(f"{'':<28} {rate:>10.0f} requests/s  {rate * invocations:>10.0f} invocations/s")
+
+                # Closed-loop clients only measure queueing at saturation, paced ones show the round trip itself
+                requests = max(1, min(args.requests, int(args.rate * 2 / clients)))
+                samples, rate = asyncio.run(
+                    load(path, clients, requests, scenarios[1][1], interval=clients / args.rate)
+                )
+                report(f"  invoke at {args.rate:.0f}/s", samples)
+
+            report("process per request", spawned_connect(path, 20))
+
+            print(f"server: {query_stats(os.path.join(directory, 'stats.sock'))['control']}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import io
+import statistics
+import subprocess
+import time
+from pathlib import Path
+
+from src.device.resolver import DeviceResolver, ReplaySource
+from src.system.macOS.parsers import parse_active_input_device
+
+FIXTURE = Path(__file__).parent / "fixtures" / "ioreg_hid.plist"
+
+
+def measure(resolve, events):
+    samples = []
+
+    for _ in range(events):
+        start = time.perf_counter_ns()
+        resolve()
+        samples.append(time.perf_counter_ns() - start)
+
+    return samples
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2] / 1000
+    p99 = samples[int(len(samples) * 0.99) - 1] / 1000
+    mean = statistics.fmean(samples) / 1000
+    print(f"{label:<28} mean={mean:>10.2f}us  p50={p50:>10.2f}us  p99={p99:>10.2f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-event active device lookup latency")
+    parser.add_argument("--events", type=int, default=200)
+    args = parser.parse_args()
+
+    # Before: spawn a process and parse the whole dump on every key event
+    def spawn_and_parse():
+        return parse_active_input_device(io.BytesIO(subprocess.run(["cat", FIXTURE], capture_output=True).stdout))
+
+    # After: read the snapshot kept by the resolver
+    resolver = DeviceResolver(
+        source=ReplaySource([FIXTURE.read_bytes()], parser=lambda output: parse_active_input_device(io.BytesIO(output)))
+    )
+    resolver.start()
+
+    assert spawn_and_parse() == resolver.get()
+
+    report("spawn per event (before)", measure(spawn_and_parse, args.events))
+    report("resolver snapshot (after)", measure(resolver.get, args.events * 1000))
+
+    resolver.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import os
+import threading
+import time
+
+from benchmarks.device_resolver import report
+from src.device.device import Device
+from src.system.linux.evdev import KEY_DOWN, KEY_UP, EvdevReader, pack_key_event
+
+
+def replay(fd, events, rate):
+    interval = 1 / rate if rate else 0
+
+    for index in range(events):
+        now = time.monotonic()
+        seconds, fraction = divmod(now, 1)
+        code = 183 + index % 12
+
+        # The event time carries the send timestamp, so the handler can measure delivery latency
+        os.write(fd, pack_key_event(code, KEY_DOWN, int(seconds), int(fraction * 1e6)))
+        os.write(fd, pack_key_event(code, KEY_UP, int(seconds), int(fraction * 1e6)))
+
+        if interval:
+            time.sleep(max(0.0, interval - (time.monotonic() - now)))
+
+    os.close(fd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded key events through the evdev reader")
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--devices", type=int, default=4)
+    parser.add_argument("--rate", type=int, default=1000, help="events per second per device, 0 = flat out")
+    args = parser.parse_args()
+
+    latencies = []
+    per_device = {}
+
+    def on_event(event):
+        if event.event_type == "down":
+            latencies.append(int((time.monotonic() - event.time) * 1e9))
+            per_device[event.device] = per_device.get(event.device, 0) + 1
+
+    reader = EvdevReader(on_event=on_event)
+    writers = []
+
+    for index in range(args.devices):
+        read_fd, write_fd = os.pipe()
+        reader.add(read_fd, Device(name=f"Recorded device {index}", device_type="USB"))
+        writers.append(threading.Thread(target=replay, args=(write_fd, args.events, args.rate)))
+
+    thread = threading.Thread(target=reader.run, daemon=True)
+    thread.start()
+
+    start = time.perf_counter()
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+
+    while sum(per_device.values()) < args.events * args.devices:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    reader.stop()
+
+    print(f"delivered {len(latencies)} key presses in {elapsed:.2f}s ({len(latencies) / elapsed:.0f}/s)")
+    print(f"per device: {per_device}")
+    report("write -> handler", latencies)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import namedtuple
+
+from src.action.registry import ActionRegistry
+from src.device.device import Device
+from src.state.state_model import PAUSED, PLAYING
+from src.system.system.system import System
+
+FakeKeyEvent = namedtuple("FakeKeyEvent", ["name", "device", "event_type"], defaults=["down"])
+
+# Mirrors the groups and coalescing of the real backends, so the executor sees the same contention
+GROUPS = [
+    ("audio", 0.15),
+    ("audio", None),
+    ("player", None),
+    ("player", 0.3),
+    ("brightness", 0.15),
+    (None, None),
+]
+
+
+class FakeSystem(System):
+    def __init__(self, devices=1, actions=12, action_time=0.0):
+        super().__init__(name="Fake")
+
+        self.devices = [
+            Device(name=f"Fake Keyboard {index}", device_type="USB", device_id=index) for index in range(devices)
+        ]
+        self.action_time = action_time
+        self.last_device = self.devices[0].name if self.devices else None
+        self.foreground_app = None
+
+        self.handler = None
+        self.ready = threading.Event()
+        self.stopped = threading.Event()
+
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.steps = 0
+
+        self.functions = []
+
+        for index in range(actions):
+            group, coalesce = GROUPS[index % len(GROUPS)]
+            name = f"Action {index}"
+            function = {
+                "id": f"fake.action_{index}",
+                "name": name,
+                "category": group or "utils",
+                "function": self.action,
+                "group": group or name,
+            }
+
+            if coalesce:
+                function["coalesce"] = coalesce
+
+            self.functions.append(function)
+
+    def registry(self):
+        registry = ActionRegistry()
+        registry.register_functions(self.functions)
+
+        return registry
+
+    def action(self, steps=1):
+        # Stands in for the osascript/pactl call, sleeping releases the GIL like waiting on a process does
+        if self.action_time:
+            time.sleep(self.action_time)
+
+        with self.lock:
+            self.calls += 1
+            self.steps += steps
+
+    def get_active_input_device(self):
+        return self.last_device
+
+    def get_foreground_app(self):
+        # Stands in for osascript/xprop, benchmarks switch apps by setting the attribute
+        return self.foreground_app
+
+    def device_probes(self):
+        return {"fake": lambda: list(self.devices)}
+
+    def device_listener(self, handler):
+        self.handler = handler
+        self.stopped.clear()
+        self.ready.set()
+
+        self.stopped.wait()
+
+    def stop_device_listener(self):
+        self.ready.clear()
+        self.stopped.set()
+
+    def press(self, key, device):
+        self.last_device = device
+        self.handler(FakeKeyEvent(name=key, device=device))
+
+    def release(self, key, device):
+        self.handler(FakeKeyEvent(name=key, device=device, event_type="up"))
+
+
+class FakeStateProvider:
+    def __init__(self, latency=0.0, fail_every=0):
+        # Every read and write stands in for one osascript/pactl round trip
+        self.latency = latency
+        self.fail_every = fail_every
+
+        self.state = {"volume": 50, "muted": False, "player": PAUSED}
+        self.lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+
+    def round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def read(self, key):
+        self.round_trip()
+
+        with self.lock:
+            self.reads += 1
+            return self.state.get(key)
+
+    def write(self, key, value):
+        self.round_trip()
+
+        with self.lock:
+            self.writes += 1
+
+            if self.fail_every and self.writes % self.fail_every == 0:
+                return False
+
+            self.state[key] = value
+            return True
+
+    def external_change(self, key, value):
+        # Another app (or the hardware keys) changed the state behind the model's back
+        with self.lock:
+            self.state[key] = value
+
+    # Before: every press asks for the current value and then sets it, or sends a relative script
+    def read_then_write(self, key, change):
+        value = self.read(key)
+        return self.write(key, change(value))
+
+
+def flip_player(value):
+    return PAUSED if value == PLAYING else PLAYING
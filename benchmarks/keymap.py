@@ -0,0 +1,124 @@
+import argparse
+import random
+import time
+
+from benchmarks.device_resolver import report
+from benchmarks.fake_system import FakeKeyEvent, FakeSystem
+from src.application.dispatch import DispatchTable
+from src.application.keymap import MODIFIERS, KeyMatcher, format_step, parse_key
+from src.executor.scheduler import Scheduler
+
+KEYS = [f"f{index}" for index in range(1, 25)] + list("abcdefghijklmnopqrstuvwxyz0123456789")
+MODIFIER_SETS = [(), ("ctrl",), ("alt",), ("ctrl", "shift")]
+
+
+def build_config(bindings, actions, seed=0):
+    generator = random.Random(seed)
+    keys = set()
+
+    # Single keys, chords and two- or three-step leader sequences in roughly equal parts
+    while len(keys) < bindings:
+        steps = [
+            format_step(generator.choice(MODIFIER_SETS), generator.choice(KEYS))
+            for _ in range(generator.choice((1, 1, 2, 3)))
+        ]
+        keys.add(", ".join(steps))
+
+    macros = [{"key": key, "function": f"Action {index % actions}"} for index, key in enumerate(sorted(keys))]
+    return [{"device": "Keyboard", "macros": macros}]
+
+
+def key_events(config, presses, seed=1):
+    generator = random.Random(seed)
+    events = []
+
+    while len(events) < presses:
+        macro = generator.choice(config[0]["macros"])
+
+        for modifiers, key in parse_key(macro["key"]):
+            modifiers = sorted(modifiers)
+            events += [FakeKeyEvent(name=modifier, device="Keyboard") for modifier in modifiers]
+            events.append(FakeKeyEvent(name=key, device="Keyboard"))
+            events.append(FakeKeyEvent(name=key, device="Keyboard", event_type="up"))
+            events += [FakeKeyEvent(name=modifier, device="Keyboard", event_type="up") for modifier in modifiers]
+
+    return events
+
+
+class Rescan:
+    # Before: the last few steps are kept and every binding is compared against their tail on each press
+    def __init__(self, config, table, submit, depth=3):
+        self.bindings = [
+            (parse_key(macro["key"]), table.lookup("Keyboard", macro["key"])) for macro in config[0]["macros"]
+        ]
+        self.submit = submit
+        self.depth = depth
+
+        self.recent = []
+        self.modifiers = set()
+
+    def feed(self, device, event, pressed_at=0):
+        modifier = MODIFIERS.get(event.name)
+
+        if event.event_type == "up":
+            self.modifiers.discard(modifier)
+            return
+
+        step = (frozenset(self.modifiers), event.name)
+        if modifier:
+            self.modifiers.add(modifier)
+            return
+
+        self.recent = (self.recent + [step])[-self.depth :]
+
+        for steps, binding in self.bindings:
+            if tuple(self.recent[-len(steps) :]) == steps:
+                self.recent = []
+                self.submit(binding, pressed_at)
+                return
+
+
+def measure(matcher, events):
+    samples = []
+
+    for event in events:
+        start = time.perf_counter_ns()
+        matcher.feed("Keyboard", event)
+        samples.append(time.perf_counter_ns() - start)
+
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-event cost of matching chords and leader sequences")
+    parser.add_argument("--bindings", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--presses", type=int, default=20000)
+    args = parser.parse_args()
+
+    system = FakeSystem(actions=12)
+    registry = system.registry()
+    scheduler = Scheduler()
+    scheduler.start()
+
+    try:
+        for bindings in args.bindings:
+            config = build_config(bindings, actions=len(system.functions))
+            table = DispatchTable()
+            table.compile(config, registry)
+            events = key_events(config, args.presses)
+
+            rescanned, matched = [], []
+            rescan = Rescan(config, table, lambda binding, pressed_at: rescanned.append(binding))
+            # A long timeout keeps prefixes that are bindings of their own from firing on the scheduler mid-run
+            matcher = KeyMatcher(table, lambda binding, pressed_at: matched.append(binding), scheduler, timeout=60.0)
+
+            print(f"{bindings} bindings, {len(events)} events")
+            report("rescan every binding", measure(rescan, events))
+            report("compiled keymap", measure(matcher, events))
+            print(f"{'':<28} fired: rescan={len(rescanned)}  keymap={len(matched)}  {matcher.stats}")
+    finally:
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
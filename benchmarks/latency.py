@@ -0,0 +1,53 @@
+import argparse
+import time
+from types import SimpleNamespace
+
+from benchmarks.device_resolver import report
+from src.application.application import Application
+from src.data.settings import settings
+
+
+def measure(application, event, release, events):
+    samples = []
+
+    for _ in range(events):
+        start = time.perf_counter_ns()
+        application.on_key_press(event)
+        samples.append(time.perf_counter_ns() - start)
+
+        # Untimed, without the release the next press would be taken for auto-repeat
+        application.on_key_press(release)
+
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of the latency instrumentation on the key press path")
+    parser.add_argument("--events", type=int, default=200000)
+    args = parser.parse_args()
+
+    application = Application(settings=settings)
+    application.actions.register_functions([{"name": "noop", "function": lambda *args: None}])
+    application.dispatch_table.compile(
+        [{"device": "Keyboard", "macros": [{"key": "f1", "function": "noop"}]}], application.actions
+    )
+    # The matcher reads the keymaps it was given last, rebuild_dispatch_table does this after every compile
+    application.key_matcher.select(None)
+    application.current_device = "Keyboard"
+
+    # The executor is not started, so only the path up to the queue is measured
+    application.executor.queue_size = args.events * 2
+    event = SimpleNamespace(name="f1", device="Keyboard", event_type="down")
+    release = SimpleNamespace(name="f1", device="Keyboard", event_type="up")
+
+    application.latency.enabled = False
+    report("instrumentation disabled", measure(application, event, release, args.events))
+    application.executor.queue.clear()
+
+    application.latency.enabled = True
+    report("instrumentation enabled", measure(application, event, release, args.events))
+    print(f"recorded dispatch samples: {application.latency.snapshot()['noop']['dispatch']['count']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import io
+import json
+import re
+import time
+from pathlib import Path
+
+from src.device.device import Device
+from src.system.macOS.parsers import (
+    parse_active_input_device,
+    parse_bluetooth_devices,
+    parse_usb_devices,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+# Line-by-line text parsers as they were before the structured formats were used
+def legacy_active_input_device(output):
+    devices = []
+    current_device = None
+
+    for line in output.split("\n"):
+        line = line.strip()
+
+        if '"Product"' in line:
+            match = re.search(r'"Product" = "(.*?)"', line)
+            if match:
+                current_device = match.group(1)
+
+        if current_device and (
+            "Keyboard" in current_device or "Trackpad" in current_device or "Mouse" in current_device
+        ):
+            devices.append(current_device)
+
+    return devices[0] if devices else None
+
+
+def legacy_usb_devices(output):
+    devices = []
+    current_device = None
+
+    for line in output.split("\n"):
+        line = line.strip()
+
+        if line.startswith("Product Name:"):
+            current_device = Device(name=line.split(":")[1].strip(), device_type="USB")
+
+        elif line.startswith("Product ID:") and current_device:
+            match = re.search(r"Product ID: 0x(\w+)", line)
+            if match:
+                current_device.device_id = int(match.group(1), 16)
+
+        if current_device and current_device.name:
+            devices.append(current_device)
+            current_device = None
+
+    return devices
+
+
+def legacy_bluetooth_devices(output):
+    devices = []
+    inside_connected_section = False
+    current_device_name = None
+    current_device_data = {}
+
+    for line in output.split("\n"):
+        line = line.strip()
+
+        if line.startswith("Connected:"):
+            inside_connected_section = True
+            continue
+
+        if line.startswith("Not Connected:"):
+            break
+
+        if inside_connected_section:
+            device_match = re.match(r"^([A-Za-z0-9 ()-_]+):$", line)
+            if device_match:
+                if current_device_name:
+                    devices.append({"name": current_device_name, "data": current_device_data})
+
+                current_device_name = device_match.group(1)
+                current_device_data = {}
+            else:
+                data_match = re.match(r"^(.+?):\s(.+)$", line)
+                if data_match:
+                    current_device_data[data_match.group(1).strip().lower().replace(" ", "_")] = data_match.group(2)
+
+    if current_device_name:
+        devices.append({"name": current_device_name, "data": current_device_data})
+
+    return [
+        Device(name=device["name"], device_type="Bluetooth", device_id=device["data"].get("product_id"))
+        for device in devices
+    ]
+
+
+def measure(label, parse, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = parse()
+    elapsed = (time.perf_counter() - start) / repeat
+
+    print(f"{label:<34} {elapsed * 1e6:>10.1f}us  -> {result}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse recorded ioreg / system_profiler dumps")
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    hid_text = (FIXTURES / "ioreg_hid.txt").read_text()
+    hid_plist = (FIXTURES / "ioreg_hid.plist").read_bytes()
+    usb_text = (FIXTURES / "system_profiler_usb.txt").read_text()
+    usb_json = (FIXTURES / "system_profiler_usb.json").read_text()
+    bluetooth_text = (FIXTURES / "system_profiler_bluetooth.txt").read_text()
+    bluetooth_json = (FIXTURES / "system_profiler_bluetooth.json").read_text()
+
+    measure("active device, text (before)", lambda: legacy_active_input_device(hid_text), args.repeat)
+    measure("active device, plist (after)", lambda: parse_active_input_device(io.BytesIO(hid_plist)), args.repeat)
+    measure("usb, text (before)", lambda: legacy_usb_devices(usb_text), args.repeat)
+    measure("usb, json (after)", lambda: parse_usb_devices(json.loads(usb_json)), args.repeat)
+    measure("bluetooth, text (before)", lambda: legacy_bluetooth_devices(bluetooth_text), args.repeat)
+    measure("bluetooth, json (after)", lambda: parse_bluetooth_devices(json.loads(bluetooth_json)), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
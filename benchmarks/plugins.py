@@ -0,0 +1,111 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from src.action.plugin_index import PluginIndex
+from src.action.registry import ENTRY_POINT_GROUP, ActionRegistry
+from src.application.dispatch import DispatchTable
+from src.file.file import JSONFile
+
+PLUGIN_MODULE = """import time
+
+# Stands in for a plugin pulling in its own client library
+time.sleep({import_time})
+
+{functions}
+"""
+
+
+def write_plugins(directory, plugins, actions, import_time):
+    for plugin in range(plugins):
+        module = f"streamdeck_bench_plugin_{plugin}"
+        dist_info = os.path.join(directory, f"{module}-1.0.dist-info")
+        os.makedirs(dist_info)
+
+        with open(os.path.join(dist_info, "METADATA"), "w") as file:
+            file.write(f"Metadata-Version: 2.1\nName: {module}\nVersion: 1.0\n")
+
+        with open(os.path.join(dist_info, "entry_points.txt"), "w") as file:
+            file.write(f"[{ENTRY_POINT_GROUP}]\n")
+            for action in range(actions):
+                file.write(f"bench_{plugin}.action_{action} = {module}:action_{action}\n")
+
+        functions = "\n".join(f"def action_{action}(steps=1):\n    return {action}\n" for action in range(actions))
+        with open(os.path.join(directory, f"{module}.py"), "w") as file:
+            file.write(PLUGIN_MODULE.format(import_time=import_time, functions=functions))
+
+
+def imported_plugins():
+    return sorted(name for name in sys.modules if name.startswith("streamdeck_bench_plugin_"))
+
+
+def forget_plugins():
+    for name in imported_plugins():
+        del sys.modules[name]
+
+
+def run(plugins, actions, import_time):
+    # The index lives outside sys.path, writing it must not look like a newly installed distribution
+    with tempfile.TemporaryDirectory() as directory, tempfile.TemporaryDirectory() as index_directory:
+        write_plugins(directory, plugins, actions, import_time)
+        sys.path.insert(0, directory)
+
+        try:
+            index = PluginIndex(file=JSONFile(path=os.path.join(index_directory, "plugin_index.json")))
+
+            # First start scans the installed distributions, later ones read the index
+            start = time.perf_counter()
+            ActionRegistry().load_entry_points(index=index)
+            scan = time.perf_counter() - start
+
+            start = time.perf_counter()
+            registry = ActionRegistry()
+            registry.load_entry_points(index=index)
+            lazy = time.perf_counter() - start
+            assert index.stats == {"hits": 1, "scans": 1}
+
+            assert len(registry.actions()) == plugins * actions
+            assert not imported_plugins()
+
+            # Binding one plugin action imports that plugin's module only
+            if plugins:
+                table = DispatchTable()
+                table.compile(
+                    [{"device": "Keyboard", "macros": [{"key": "f1", "function": "bench_0.action_1"}]}], registry
+                )
+                assert table.lookup("Keyboard", "f1").function() == 1
+                assert imported_plugins() == ["streamdeck_bench_plugin_0"]
+
+            forget_plugins()
+
+            # Before: every plugin imported when its actions are registered
+            start = time.perf_counter()
+            for action in registry.actions():
+                action.loader()
+            eager = time.perf_counter() - start + scan
+
+            forget_plugins()
+        finally:
+            sys.path.remove(directory)
+
+    print(
+        f"{plugins:>5} plugins x {actions} actions   eager import={eager * 1000:>8.1f}ms   "
+        f"lazy, scanned={scan * 1000:>7.1f}ms   lazy, indexed={lazy * 1000:>7.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Start-up cost of entry point plugins")
+    parser.add_argument("--plugins", type=int, nargs="+", default=[0, 10, 50, 200])
+    parser.add_argument("--actions", type=int, default=5)
+    parser.add_argument("--import-ms", type=float, default=5.0, help="import time of each plugin module")
+    args = parser.parse_args()
+
+    for plugins in args.plugins:
+        run(plugins, args.actions, args.import_ms / 1000)
+
+
+if __name__ == "__main__":
+    main()
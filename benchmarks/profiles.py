@@ -0,0 +1,115 @@
+import argparse
+import time
+
+from benchmarks.device_resolver import report
+from benchmarks.fake_system import FakeKeyEvent, FakeSystem
+from src.application.dispatch import DispatchTable
+from src.application.foreground import ForegroundTracker
+from src.application.keymap import KeyMatcher
+from src.executor.scheduler import Scheduler
+
+
+def build_config(system, devices, macros, apps):
+    names = [function["name"] for function in system.functions]
+
+    def macro_list(count, offset):
+        return [{"key": f"f{key + 1}", "function": names[(key + offset) % len(names)]} for key in range(count)]
+
+    return [
+        {
+            "device": f"Device {device}",
+            "macros": macro_list(macros, 0),
+            # Each profile rebinds half of the device's keys
+            "profiles": {f"App {app}": {"macros": macro_list(macros // 2, app + 1)} for app in range(apps)},
+        }
+        for device in range(devices)
+    ]
+
+
+def flatten(config, app):
+    # Before: a switch rewrote the flat macro lists with the app's macros on top and compiled them again
+    flat = []
+
+    for entry in config:
+        macros = {macro["key"]: macro for macro in entry["macros"]}
+        macros.update({macro["key"]: macro for macro in entry["profiles"].get(app, {}).get("macros", [])})
+        flat.append({"device": entry["device"], "macros": list(macros.values())})
+
+    return flat
+
+
+def measure_switches(switch, apps, count):
+    samples = []
+
+    for index in range(count):
+        app = apps[index % len(apps)]
+        start = time.perf_counter_ns()
+        switch(app)
+        samples.append(time.perf_counter_ns() - start)
+
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of switching bindings when the foreground app changes")
+    parser.add_argument("--devices", type=int, default=5)
+    parser.add_argument("--macros", type=int, default=200)
+    parser.add_argument("--apps", type=int, default=10)
+    parser.add_argument("--switches", type=int, default=200)
+    args = parser.parse_args()
+
+    system = FakeSystem(actions=12)
+    registry = system.registry()
+    config = build_config(system, args.devices, args.macros, args.apps)
+    apps = [None] + [f"App {app}" for app in range(args.apps)]
+
+    table = DispatchTable()
+    start = time.perf_counter()
+    table.compile(config, registry)
+    print(f"compile with {args.apps} profiles x {args.devices} devices: {(time.perf_counter() - start) * 1000:.2f}ms")
+
+    fired = []
+    scheduler = Scheduler()
+    matcher = KeyMatcher(table, lambda binding, pressed_at: fired.append(binding.name), scheduler)
+
+    # The stub source stands in for osascript/xprop, the tracker calls select on every change
+    tracker = ForegroundTracker(source=system.get_foreground_app, on_change=matcher.select)
+
+    def switch_profile(app):
+        system.foreground_app = app
+        tracker.poll()
+
+    def press():
+        matcher.feed("Device 0", FakeKeyEvent(name="f1", device="Device 0"))
+        matcher.feed("Device 0", FakeKeyEvent(name="f1", device="Device 0", event_type="up"))
+
+    # Every app's keymap is used once, later switches find their tries already built
+    for app in apps:
+        switch_profile(app)
+        press()
+
+    report("profile switch", measure_switches(switch_profile, apps, args.switches))
+
+    def switch_and_press(app):
+        switch_profile(app)
+        press()
+
+    report("switch + first press", measure_switches(switch_and_press, apps, args.switches))
+
+    flat_table = DispatchTable()
+    report(
+        "flatten + recompile",
+        measure_switches(lambda app: flat_table.compile(flatten(config, app), registry), apps, args.switches // 4),
+    )
+
+    # The profile's binding must win over the device's default for the same key
+    flat_table.compile(flatten(config, "App 0"), registry)
+    switch_profile("App 0")
+    fired.clear()
+    press()
+    assert fired == [flat_table.lookup("Device 0", "f1").name]
+    print(f"tracker: {tracker.stats}  matcher switches: {matcher.stats['switches']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.device_resolver import report
+from benchmarks.fake_system import FakeSystem
+from src.application.application import Application
+from src.data.settings import settings
+from src.file.file import JSONFile
+
+
+def build_config(system, macros):
+    devices = system.devices
+    per_device = -(-macros // len(devices))
+
+    return [
+        {
+            "device": device.name,
+            "device_id": device.id,
+            "device_type": device.type,
+            "macros": [
+                {
+                    "key": f"k{key}",
+                    "function": system.functions[(index * per_device + key) % len(system.functions)]["name"],
+                }
+                for key in range(min(per_device, macros - index * per_device))
+            ],
+        }
+        for index, device in enumerate(devices)
+    ]
+
+
+def build_events(config, count, seed):
+    rng = random.Random(seed)
+    keys = [(macro["key"], entry["device"]) for entry in config for macro in entry["macros"]]
+
+    return [rng.choice(keys) for _ in range(count)]
+
+
+def replay(rate=1000, duration=2.0, macros=500, devices=5, actions=12, action_time=0.0, seed=0, overrides=None):
+    system = FakeSystem(devices=devices, actions=actions, action_time=action_time)
+    config = build_config(system, macros)
+    events = build_events(config, int(rate * duration), seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        scenario_settings = {
+            **settings,
+            "DEVICE_CONFIG_PATH": os.path.join(directory, "device_config.json"),
+            "DEVICE_CACHE_PATH": os.path.join(directory, "device_cache.json"),
+            "STATS_SOCKET": os.path.join(directory, "stats.sock"),
+            "CONTROL_SOCKET": os.path.join(directory, "control.sock"),
+            "LATENCY_STATS": True,
+            "LATENCY_LOG_INTERVAL": None,
+            **(overrides or {}),
+        }
+        JSONFile(path=scenario_settings["DEVICE_CONFIG_PATH"]).save_file(config)
+
+        application = Application(settings=scenario_settings, system=system)
+        application.start()
+        application.follow_current_device = False
+        application.start_keyboard_listener()
+
+        if not system.ready.wait(timeout=5.0):
+            raise RuntimeError("fake listener did not start")
+
+        dispatch_samples = []
+        started = time.perf_counter()
+
+        for index, (key, device) in enumerate(events):
+            # Pace against the schedule, not the previous event, so a slow dispatch does not lower the rate
+            delay = started + index / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            pressed = time.perf_counter_ns()
+            system.press(key, device)
+            dispatch_samples.append(time.perf_counter_ns() - pressed)
+            system.release(key, device)
+
+        sent = time.perf_counter() - started
+
+        application.coalescer.stop()
+        application.executor.join()
+        elapsed = time.perf_counter() - started
+
+        executor = application.executor.snapshot()
+        coalesced = application.coalescer.stats["pressed"] - application.coalescer.stats["flushed"]
+        total = application.latency.merged("total")
+        application.shutdown()
+
+    dispatch_samples.sort()
+
+    return {
+        "events": len(events),
+        "offered_rate": len(events) / sent,
+        # Every event either ran its action or was merged into a coalesced one
+        "throughput": (executor["completed"] + coalesced) / elapsed,
+        "actions_per_s": executor["completed"] / elapsed,
+        "completed": executor["completed"],
+        "dropped": executor["dropped"],
+        "coalesced": coalesced,
+        "dispatch_p50_us": dispatch_samples[len(dispatch_samples) // 2] / 1000,
+        "dispatch_p99_us": dispatch_samples[int(len(dispatch_samples) * 0.99) - 1] / 1000,
+        "total_p50_us": total.percentile(0.5) / 1000,
+        "total_p99_us": total.percentile(0.99) / 1000,
+        "dispatch_samples": dispatch_samples,
+    }
+
+
+def print_result(label, result):
+    report(f"{label} dispatch", result["dispatch_samples"])
+    print(
+        f"{'':<28} offered={result['offered_rate']:.0f}/s  throughput={result['throughput']:.0f}/s  "
+        f"actions={result['actions_per_s']:.0f}/s  "
+        f"completed={result['completed']}  dropped={result['dropped']}  coalesced={result['coalesced']}  "
+        f"total p50={result['total_p50_us']:.0f}us p99={result['total_p99_us']:.0f}us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay synthetic key events through Application and a fake System")
+    parser.add_argument("--rate", type=int, default=1000, help="key events per second")
+    parser.add_argument("--duration", type=float, default=2.0)
+    parser.add_argument("--macros", type=int, default=500)
+    parser.add_argument("--devices", type=int, default=5)
+    parser.add_argument("--actions", type=int, default=12)
+    parser.add_argument("--action-ms", type=float, default=0.0, help="time each stand-in action takes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    result = replay(
+        rate=args.rate,
+        duration=args.duration,
+        macros=args.macros,
+        devices=args.devices,
+        actions=args.actions,
+        action_time=args.action_ms / 1000,
+        seed=args.seed,
+    )
+    print_result(f"{args.rate}/s {args.macros} macros", result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.device_resolver import report
+from src.system.macOS.script_host import ProcessTransport, ScriptHost
+
+STANDIN = os.path.join(os.path.dirname(__file__), "script_host_standin.py")
+SCRIPT = "volume = min(100, 50 + 5)\nresult = volume"
+
+
+def measure(call, count):
+    samples = []
+
+    for _ in range(count):
+        start = time.perf_counter_ns()
+        call()
+        samples.append(time.perf_counter_ns() - start)
+
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Script execution latency: spawn per call vs persistent host")
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--crash-every", type=int, default=0, help="kill the host every N calls")
+    args = parser.parse_args()
+
+    # Before: one interpreter start + compile per action, like osascript -e
+    def spawn_per_call():
+        subprocess.run([sys.executable, "-c", SCRIPT], check=True)
+
+    host = ScriptHost(transport=ProcessTransport(command=[sys.executable, STANDIN]))
+    host.run("volume_up", SCRIPT)
+    calls = 0
+
+    # After: compiled once, executed over the pipe
+    def persistent_host():
+        nonlocal calls
+        calls += 1
+
+        if args.crash_every and calls % args.crash_every == 0:
+            host.transport.process.kill()
+            host.transport.process.wait()
+
+        assert host.run("volume_up") == "55"
+
+    report("spawn per call (before)", measure(spawn_per_call, args.calls))
+    report("persistent host (after)", measure(persistent_host, args.calls * 10))
+    print(f"host restarts: {host.restart_count}")
+
+    host.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import json
+import sys
+
+# Stand-in for script_host.js: the same line-delimited JSON protocol, with Python as the script language
+
+
+def handle(request, scripts):
+    if request["op"] == "compile":
+        try:
+            scripts[request["name"]] = compile(request["source"], request["name"], "exec")
+        except SyntaxError as e:
+            return {"ok": False, "error": str(e)}
+        return {"ok": True}
+
+    if request["op"] == "run":
+        code = scripts.get(request["name"])
+        if code is None:
+            return {"ok": False, "error": f"unknown script {request['name']}"}
+
+        namespace = {"argv": request.get("args", [])}
+        try:
+            exec(code, namespace)
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, "result": str(namespace.get("result", ""))}
+
+    return {"ok": False, "error": f"unknown op {request['op']}"}
+
+
+def main():
+    scripts = {}
+
+    for line in sys.stdin:
+        response = handle(json.loads(line), scripts)
+        sys.stdout.write(json.dumps(response) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
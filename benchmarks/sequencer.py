@@ -0,0 +1,138 @@
+import argparse
+import sys
+import threading
+import time
+
+from benchmarks.device_resolver import report
+from src.application.dispatch import Binding
+from src.executor.executor import MacroExecutor
+from src.executor.scheduler import Scheduler
+from src.executor.sequencer import Sequencer
+
+
+def build_steps(repeats, interval, samples, started):
+    steps = []
+
+    for index in range(repeats):
+        expected = index * interval
+
+        def step(expected=expected):
+            samples.append(time.perf_counter_ns() - started[0] - int(expected * 1e9))
+
+        steps.append((0.0 if index == 0 else interval, Binding(name="step", function=step, group="step")))
+
+    return tuple(steps)
+
+
+def sleep_jitter(interval, count=200):
+    # What the OS itself adds to a single wake-up, no scheduler can be more accurate than this
+    samples = []
+
+    for _ in range(count):
+        start = time.perf_counter_ns()
+        time.sleep(interval)
+        samples.append(time.perf_counter_ns() - start - int(interval * 1e9))
+
+    return samples
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[max(0, int(len(samples) * fraction) - 1)] / 1e6
+
+
+def thread_per_sequence(sequences, repeats, interval):
+    # Before: every running sequence sleeps in its own thread and drifts by each late wake-up
+    samples = []
+
+    def run():
+        started = time.perf_counter_ns()
+
+        for index in range(repeats):
+            if index:
+                time.sleep(interval)
+            samples.append(time.perf_counter_ns() - started - int(index * interval * 1e9))
+
+    threads = [threading.Thread(target=run) for _ in range(sequences)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return samples
+
+
+def shared_scheduler(sequences, repeats, interval, spin):
+    # After: one heap scheduler thread, deadlines counted from the start of each sequence
+    executor = MacroExecutor(workers=4, queue_size=sequences * repeats)
+    scheduler = Scheduler(spin=spin)
+    sequencer = Sequencer(scheduler=scheduler, executor=executor)
+    executor.start()
+    scheduler.start()
+
+    samples = []
+
+    for index in range(sequences):
+        started = [0]
+        steps = build_steps(repeats, interval, samples, started)
+        started[0] = time.perf_counter_ns()
+        sequencer.toggle(f"sequence {index}", steps)
+
+    while sequencer.running:
+        time.sleep(interval)
+    executor.join()
+
+    # Pressing the key again cancels the rest of the sequence
+    steps = build_steps(repeats, interval, [], [time.perf_counter_ns()])
+    sequencer.toggle("cancelled", steps)
+    sequencer.toggle("cancelled", steps)
+    assert not sequencer.is_running("cancelled")
+
+    scheduler.stop()
+    executor.stop()
+
+    return samples, dict(scheduler.stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Timing accuracy of multi-step macro sequences")
+    parser.add_argument("--sequences", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=40)
+    parser.add_argument("--interval-ms", type=float, default=10.0)
+    parser.add_argument("--spin-ms", type=float, default=0.5)
+    parser.add_argument("--max-p50-ms", type=float, default=1.0, help="fail when the median lateness is above this")
+    parser.add_argument(
+        "--max-p99-ms", type=float, default=2.0, help="fail when the p99 lateness exceeds the OS sleep jitter by more"
+    )
+    args = parser.parse_args()
+
+    interval = args.interval_ms / 1000
+
+    jitter = sleep_jitter(interval)
+    report("os sleep jitter", jitter)
+    report("thread per sequence (before)", thread_per_sequence(args.sequences, args.repeats, interval))
+
+    samples, stats = shared_scheduler(args.sequences, args.repeats, interval, args.spin_ms / 1000)
+    report("shared scheduler (after)", samples)
+    print(f"{'':<28} {stats}")
+
+    failures = []
+
+    if percentile(samples, 0.5) > args.max_p50_ms:
+        failures.append(f"median lateness {percentile(samples, 0.5):.2f}ms is above {args.max_p50_ms}ms")
+
+    if percentile(samples, 0.99) > percentile(jitter, 0.99) + args.max_p99_ms:
+        failures.append(
+            f"p99 lateness {percentile(samples, 0.99):.2f}ms is more than {args.max_p99_ms}ms "
+            f"above the OS sleep jitter ({percentile(jitter, 0.99):.2f}ms)"
+        )
+
+    for failure in failures:
+        print(failure)
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
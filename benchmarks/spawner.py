@@ -0,0 +1,111 @@
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks.device_resolver import report
+from src.spawner.spawner import Spawner
+
+PAGE = os.sysconf("SC_PAGE_SIZE")
+
+
+def proc_status(pid, field):
+    # Linux only, values are reported in kB
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+
+    return None
+
+
+def inflate(megabytes, fds):
+    # Stands in for Qt and the rest of the GUI: resident memory the kernel has to map into a fork, and open files
+    ballast = bytearray(megabytes << 20)
+    ballast[::PAGE] = b"\x01" * (len(ballast) // PAGE)
+    files = [open(os.devnull) for _ in range(fds)]
+
+    return ballast, files
+
+
+def measure(run, command, count):
+    samples = []
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+
+    for _ in range(count):
+        start = time.perf_counter_ns()
+        run(command)
+        samples.append(time.perf_counter_ns() - start)
+
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (after.ru_utime + after.ru_stime - usage.ru_utime - usage.ru_stime) / count
+
+    return samples, cpu
+
+
+def direct(command):
+    subprocess.run(command, check=True)
+
+
+def direct_fork(command):
+    # subprocess forks instead of using vfork on macOS and before Python 3.10, and whenever preexec_fn or user/group
+    # changes are given, this is the path the app takes there
+    subprocess._USE_VFORK = False
+    try:
+        subprocess.run(command, check=True)
+    finally:
+        subprocess._USE_VFORK = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and memory of launching commands from a large process")
+    parser.add_argument("--ballast", type=int, nargs="+", default=[0, 256, 1024], help="MB resident in the parent")
+    parser.add_argument("--fds", type=int, default=100, help="open files in the parent")
+    parser.add_argument("--count", type=int, default=200, help="spawns per scenario")
+    parser.add_argument("--command", nargs="+", default=["true"])
+    args = parser.parse_args()
+
+    if not sys.platform.startswith("linux"):
+        print("This benchmark reads /proc and only runs on Linux")
+        return
+
+    # Like main.py, the helper starts before the process grows
+    spawner = Spawner()
+    if not spawner.start():
+        print("spawn helper could not be started")
+        return
+
+    def helper(command):
+        spawner.run(command, check=True)
+
+    runners = [("subprocess.run", direct)]
+    if hasattr(subprocess, "_USE_VFORK"):
+        runners.append(("subprocess.run (fork)", direct_fork))
+    runners.append(("spawn helper", helper))
+
+    try:
+        for megabytes in args.ballast:
+            ballast, files = inflate(megabytes, args.fds)
+            print(
+                f"parent {proc_status(os.getpid(), 'VmRSS') >> 10} MB RSS, "
+                f"{proc_status(os.getpid(), 'VmPTE')} kB page tables, {len(files)} extra fds"
+            )
+
+            for label, run in runners:
+                samples, cpu = measure(run, args.command, args.count)
+                report(f"  {label}", samples)
+                print(f"{'':<28} parent cpu {cpu * 1e6:>8.0f}us/spawn")
+
+            del ballast
+            for file in files:
+                file.close()
+
+        print(f"helper {proc_status(spawner.process.pid, 'VmRSS') >> 10} MB RSS  {spawner.stats}")
+    finally:
+        spawner.stop()
+
+
+if __name__ == "__main__":
+    main()
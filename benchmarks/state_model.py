@@ -0,0 +1,100 @@
+import argparse
+import time
+
+from benchmarks.fake_system import FakeStateProvider, flip_player
+from src.state.state_model import PLAYING, StateModel
+
+ACTIONS = [
+    ("volume", lambda value: min(100, value + 5)),
+    ("volume", lambda value: max(0, value - 5)),
+    ("muted", lambda value: not value),
+    ("player", flip_player),
+]
+
+
+def uncached(presses, latency):
+    provider = FakeStateProvider(latency=latency)
+
+    start = time.perf_counter()
+    for index in range(presses):
+        key, change = ACTIONS[index % len(ACTIONS)]
+        provider.read_then_write(key, change)
+
+    return time.perf_counter() - start, provider
+
+
+def press(model, index):
+    key = ACTIONS[index % len(ACTIONS)][0]
+
+    if key == "volume":
+        return model.adjust(key, 5 if index % len(ACTIONS) == 0 else -5)
+    if key == "muted":
+        return model.toggle(key)
+
+    return model.toggle_player(key)
+
+
+def cached(presses, latency, max_age):
+    provider = FakeStateProvider(latency=latency)
+    model = StateModel(provider=provider, max_age=max_age)
+
+    start = time.perf_counter()
+    for index in range(presses):
+        press(model, index)
+
+    return time.perf_counter() - start, provider
+
+
+def recovery(latency, max_age):
+    # A failed write and an external change must both be picked up again by the next press
+    provider = FakeStateProvider(latency=latency, fail_every=3)
+    model = StateModel(provider=provider, max_age=max_age)
+
+    model.toggle_player("player")
+    model.toggle_player("player")
+    assert not model.toggle_player("player")
+    assert "player" not in model.values
+
+    assert model.toggle_player("player")
+    assert provider.state["player"] == model.get("player")
+
+    provider.fail_every = 0
+    provider.external_change("volume", 90)
+    model.invalidate("volume")
+    model.adjust("volume", 5)
+    assert provider.state["volume"] == 95
+
+    # After max_age the cached value is read again, so a change made elsewhere is not overwritten for long
+    provider.external_change("player", PLAYING)
+    time.sleep(max_age)
+    model.toggle_player("player")
+    assert provider.state["player"] != PLAYING
+
+    return model.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round trips per press with and without the cached state model")
+    parser.add_argument("--presses", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, nargs="+", default=[1.0, 5.0, 20.0])
+    parser.add_argument("--max-age", type=float, default=5.0)
+    args = parser.parse_args()
+
+    for latency_ms in args.latency_ms:
+        latency = latency_ms / 1000
+        presses = args.presses
+
+        before, provider = uncached(presses, latency)
+        after, model_provider = cached(presses, latency, args.max_age)
+
+        print(
+            f"round trip={latency_ms:>5.1f}ms   presses={presses:>4}   "
+            f"read+write={before / presses * 1000:>7.2f}ms/press ({(provider.reads + provider.writes) / presses:.2f} calls)   "
+            f"cached={after / presses * 1000:>7.2f}ms/press ({(model_provider.reads + model_provider.writes) / presses:.2f} calls)"
+        )
+
+    print(f"recovery: {recovery(latency=0.0, max_age=0.05)}")
+
+
+if __name__ == "__main__":
+    main()
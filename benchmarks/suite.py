@@ -0,0 +1,113 @@
+import argparse
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.config_ops import config_operations
+from benchmarks.replay import replay
+
+BASELINE = Path(__file__).parent / "baselines" / "default.json"
+
+SCENARIOS = {
+    # Instant actions, the dispatch path and the executor are the bottleneck
+    "replay_1k_500": {"rate": 1000, "macros": 500},
+    # Actions as slow as a call through the persistent script host
+    "replay_1k_500_slow": {"rate": 1000, "macros": 500, "action_time": 0.002},
+    "replay_5k_500": {"rate": 5000, "macros": 500},
+}
+
+HIGHER_IS_BETTER = {"throughput", "actions_per_s", "offered_rate"}
+# Counts scale with --duration, the rates above already cover them
+NOT_COMPARED = {"events", "completed", "coalesced", "file_size_kb"}
+# Read from the power-of-two latency histograms, so only a move by more than one bucket counts
+BUCKETED = {"total_p50_us", "total_p99_us"}
+
+
+def run(duration, repeat):
+    results = {}
+
+    for name, scenario in SCENARIOS.items():
+        result = replay(duration=duration, **scenario)
+        del result["dispatch_samples"]
+        results[name] = result
+
+    results["config_ops"], _ = config_operations(repeat=repeat)
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baseline.get(name, {}).get(metric)
+            if base is None or metric in NOT_COMPARED:
+                continue
+
+            allowed = 1.0 if metric in BUCKETED else tolerance
+
+            if metric in HIGHER_IS_BETTER:
+                regressed = value < base * (1 - allowed)
+            else:
+                regressed = value > base * (1 + allowed) if base else value > 0
+
+            change = (value - base) / base * 100 if base else float("inf") if value else 0.0
+            marker = "REGRESSION" if regressed else ""
+            print(f"{name + '.' + metric:<40} {base:>12.2f} -> {value:>12.2f}  {change:+7.1f}%  {marker}")
+
+            if regressed:
+                regressions.append(f"{name}.{metric}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run every benchmark and compare against a saved baseline")
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds of key events per replay scenario")
+    parser.add_argument("--repeat", type=int, default=20, help="repetitions of each config operation")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative change before failing")
+    args = parser.parse_args()
+
+    results = run(args.duration, args.repeat)
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(
+            json.dumps(
+                {
+                    "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "machine": {"platform": platform.platform(), "python": platform.python_version()},
+                    "parameters": {"duration": args.duration, "repeat": args.repeat},
+                    "results": results,
+                },
+                indent=2,
+            )
+            + "\n"
+        )
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(json.dumps(results, indent=2))
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+        return
+
+    baseline = json.loads(args.baseline.read_text())
+    print(f"Baseline from {baseline['created']} on {baseline['machine']['platform']}")
+
+    if baseline["parameters"] != {"duration": args.duration, "repeat": args.repeat}:
+        print(f"Warning: baseline was recorded with {baseline['parameters']}, results may not be comparable")
+
+    regressions = compare(results, baseline["results"], args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
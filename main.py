@@ -1,10 +1,107 @@
-from src.application.application import Application
+import argparse
+import json
+import sys
+
 from src.data.settings import settings
+from src.profiler.startup_profiler import StartupProfiler
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description=settings["APP_NAME"])
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--headless", action="store_true", help="uruchom makra w tle, bez okna i bez Qt")
+    mode.add_argument(
+        "--editor", action="store_true", help="otwórz okno tylko do edycji konfiguracji działającego demona"
+    )
+    mode.add_argument("--stats", action="store_true", help="wypisz statystyki działającego procesu i zakończ")
+    mode.add_argument("--invoke", nargs="+", metavar="FUNKCJA", help="wykonaj funkcje w działającym procesie i zakończ")
+    mode.add_argument("--reload", action="store_true", help="przeładuj konfigurację w działającym procesie i zakończ")
+    parser.add_argument(
+        "--latency-stats", action="store_true", help="mierz opóźnienia od naciśnięcia klawisza do wykonania makra"
+    )
+    parser.add_argument(
+        "--profile-startup", action="store_true", help="wypisz czas i szczytowe RSS każdej fazy uruchamiania"
+    )
+
+    return parser.parse_args()
+
+
+def print_stats():
+    from src.profiler.stats_server import query_stats
+
+    try:
+        stats = query_stats(settings["STATS_SOCKET"])
+    except OSError as e:
+        print(f"Nie udało się pobrać statystyk ({settings['STATS_SOCKET']}): {e}")
+        sys.exit(1)
+
+    print(json.dumps(stats, indent=2, ensure_ascii=False))
+
+
+def send_control(request):
+    from src.control.protocol import ControlClient, ControlError
+
+    try:
+        with ControlClient(settings["CONTROL_SOCKET"]) as client:
+            return request(client)
+    except (OSError, ControlError) as e:
+        print(f"Nie udało się wysłać polecenia ({settings['CONTROL_SOCKET']}): {e}")
+        sys.exit(1)
+
+
+def invoke_functions(functions):
+    results = send_control(lambda client: client.batch(functions))
+    missing = [function for function, found in zip(functions, results) if not found]
+
+    for function in missing:
+        print(f"Nie znaleziono funkcji '{function}'")
+
+    if missing:
+        sys.exit(1)
+
+
+def reload_config():
+    changed = send_control(lambda client: client.reload())
+    print("Konfiguracja przeładowana" if changed else "Konfiguracja bez zmian")
 
 
 def main():
-    app = Application(settings=settings)
-    app.run()
+    arguments = parse_arguments()
+
+    if arguments.stats:
+        print_stats()
+        return
+
+    if arguments.invoke:
+        invoke_functions(arguments.invoke)
+        return
+
+    if arguments.reload:
+        reload_config()
+        return
+
+    if arguments.latency_stats:
+        settings["LATENCY_STATS"] = True
+
+    profiler = StartupProfiler(enabled=arguments.profile_startup)
+
+    # Apps and scripts are launched from a small helper, started while this process is still small
+    with profiler.phase("spawner"):
+        from src.spawner.spawner import Spawner
+
+        spawner = Spawner(enabled=settings["SPAWN_HELPER"])
+        spawner.start()
+
+    # Backends and Qt are imported lazily, this only loads the core of the application
+    with profiler.phase("imports"):
+        from src.application.application import Application
+
+    app = Application(settings=settings, profiler=profiler, spawner=spawner)
+
+    if arguments.headless:
+        app.run_headless()
+    else:
+        app.run(editor=arguments.editor)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,61 @@
+import os
+import sys
+
+
+class PluginIndex:
+    def __init__(self, file):
+        self.file = file
+
+        self.stats = {"hits": 0, "scans": 0}
+
+    def entry_points(self, group):
+        fingerprint = path_fingerprint()
+        data = self.file.load_file()
+
+        # Installing or removing a distribution touches its sys.path directory, which changes the fingerprint
+        if isinstance(data, dict) and data.get("fingerprint") == fingerprint and group in data.get("groups", {}):
+            self.stats["hits"] += 1
+            return [tuple(record) for record in data["groups"][group]]
+
+        self.stats["scans"] += 1
+        records = scan_entry_points(group)
+
+        groups = data.get("groups", {}) if isinstance(data, dict) and data.get("fingerprint") == fingerprint else {}
+        groups[group] = records
+
+        try:
+            self.file.save_file(data={"fingerprint": fingerprint, "groups": groups})
+        except OSError as e:
+            print(f"DEBUG: Nie udało się zapisać indeksu wtyczek: {e}")
+
+        return records
+
+
+def path_fingerprint():
+    # One stat per sys.path entry, however many plugins are installed
+    fingerprint = []
+
+    for path in sys.path:
+        try:
+            fingerprint.append([path, os.stat(path or ".").st_mtime_ns])
+        except OSError:
+            continue
+
+    return fingerprint
+
+
+def scan_entry_points(group):
+    import importlib.metadata
+
+    entry_points = importlib.metadata.entry_points()
+
+    # Python 3.8 and 3.9 return a dict of groups instead of a selectable collection
+    if hasattr(entry_points, "select"):
+        selected = entry_points.select(group=group)
+    else:
+        selected = entry_points.get(group, [])
+
+    return [
+        (entry_point.name, entry_point.value, getattr(getattr(entry_point, "dist", None), "name", None))
+        for entry_point in selected
+    ]
@@ -0,0 +1,132 @@
+import functools
+import importlib
+import threading
+
+from src.action.plugin_index import scan_entry_points
+
+ENTRY_POINT_GROUP = "streamdeck.actions"
+
+
+class Action:
+    def __init__(self, action_id, name, category, function=None, loader=None, group=None, coalesce=None, source=None):
+        self.id = action_id
+        self.name = name
+        self.category = category
+        self.function = function
+        self.loader = loader
+        self.group = group or action_id
+        self.coalesce = coalesce
+        self.source = source or "builtin"
+
+    @property
+    def loaded(self):
+        return self.function is not None
+
+    def load(self):
+        # Plugin modules are imported here, the first time the action is bound or invoked
+        if self.function is None:
+            self.function = self.loader()
+
+        return self.function
+
+    def __repr__(self):
+        return f"Action(id={self.id}, name={self.name}, category={self.category}, source={self.source})"
+
+
+class ActionRegistry:
+    def __init__(self):
+        self.by_id = {}
+        self.by_name = {}
+        self.by_category = {}
+        self.lock = threading.Lock()
+
+    def register(self, action):
+        with self.lock:
+            if action.id in self.by_id:
+                print(f"DEBUG: Akcja '{action.id}' jest już zarejestrowana, pomijam ({action.source})")
+                return False
+
+            if action.name in self.by_name:
+                # Two actions with the same label, the later one is listed under its id
+                action.name = action.id
+
+            self.by_id[action.id] = action
+            self.by_name[action.name] = action
+            self.by_category.setdefault(action.category, []).append(action)
+
+        return True
+
+    def register_functions(self, functions, source=None):
+        for function in functions:
+            self.register(
+                Action(
+                    action_id=function.get("id", function["name"]),
+                    name=function["name"],
+                    category=function.get("category", "other"),
+                    function=function["function"],
+                    group=function.get("group"),
+                    coalesce=function.get("coalesce"),
+                    source=source,
+                )
+            )
+
+    def load_entry_points(self, group=ENTRY_POINT_GROUP, index=None):
+        records = index.entry_points(group) if index else scan_entry_points(group)
+
+        # Only the entry point metadata is read, its module is imported by Action.load
+        for action_id, reference, distribution in records:
+            category, _, slug = action_id.rpartition(".")
+
+            self.register(
+                Action(
+                    action_id=action_id,
+                    name=slug.replace("_", " ").capitalize(),
+                    category=category or "plugins",
+                    loader=functools.partial(load_reference, reference),
+                    source=distribution or reference,
+                )
+            )
+
+    def get(self, action_id):
+        return self.by_id.get(action_id)
+
+    def find(self, reference):
+        # Configs written before the registry refer to actions by their label
+        return self.by_id.get(reference) or self.by_name.get(reference)
+
+    def resolve(self, reference):
+        action = self.find(reference)
+
+        if not action:
+            return None
+
+        try:
+            action.load()
+        except Exception as e:
+            print(f"DEBUG: Nie udało się załadować akcji '{action.id}' ({action.source}): {e}")
+            return None
+
+        return action
+
+    def names(self):
+        return list(self.by_name)
+
+    def categories(self):
+        return list(self.by_category)
+
+    def actions(self, category=None):
+        if category is None:
+            return list(self.by_id.values())
+
+        return list(self.by_category.get(category, []))
+
+
+def load_reference(reference):
+    # "package.module:attribute", the same format as an entry point's value
+    module, _, attribute = reference.partition(":")
+    target = importlib.import_module(module.strip())
+
+    for part in attribute.split("[")[0].strip().split(".") if attribute else []:
+        target = getattr(target, part)
+
+    return target
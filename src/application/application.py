@@ -1,125 +1,470 @@
 import platform
+import signal
 import sys
 import threading
+import time
 
-from PyQt6.QtWidgets import QApplication
-
+from src.action.plugin_index import PluginIndex
+from src.action.registry import ActionRegistry
+from src.application.dispatch import DispatchTable
+from src.application.foreground import ForegroundTracker
+from src.application.keymap import KeyMatcher
+from src.control.protocol import ControlClient, ControlError
+from src.device.discovery import DeviceDiscovery
+from src.device.discovery_cache import DiscoveryCache
+from src.device.resolver import DeviceResolver
+from src.executor.coalescer import Coalescer
+from src.executor.executor import MacroExecutor
+from src.executor.scheduler import Scheduler
+from src.executor.sequencer import Sequencer
+from src.file.config_store import ConfigStore
 from src.file.file import JSONFile
-from src.system.macOS.macOS import MacOS
-from src.system.windows.windows import Windows
-from src.ui.main_window import Window
+from src.file.watcher import FileWatcher
+from src.listener.supervisor import ListenerSupervisor
+from src.profiler.latency import LatencyRecorder
+from src.profiler.startup_profiler import StartupProfiler
+from src.profiler.stats_server import StatsServer
+from src.spawner.spawner import Spawner
 
 
 class Application:
-    def __init__(self, settings):
+    def __init__(self, settings, profiler=None, system=None, foreground_source=None, spawner=None):
         self.settings = settings
-        self.system = self.recognize_system()
+        self.profiler = profiler or StartupProfiler()
+        # Without a helper started at boot every command is run with subprocess directly
+        self.spawner = spawner or Spawner(enabled=False)
+
+        with self.profiler.phase("system"):
+            self.system = system or self.recognize_system()
 
         # Devices
         self.recognized_devices = []
+        self.devices_by_probe = {}
+        self.failed_probes = set()
         self.current_device = None
+        self.current_profile = None
+        # The GUI only fires macros of the device selected in the window, the daemon fires all of them
+        self.follow_current_device = True
         self.macros = []
-        self.listener_thread = None
+        self.listener = None
+        self.config_listeners = []
+        self.device_resolver = None
+        self.device_discovery = None
+        self.actions = ActionRegistry()
+        self.dispatch_table = DispatchTable()
+        self.executor = MacroExecutor(
+            workers=self.settings["EXECUTOR_WORKERS"],
+            queue_size=self.settings["EXECUTOR_QUEUE_SIZE"],
+            overflow_policy=self.settings["EXECUTOR_OVERFLOW_POLICY"],
+        )
+        self.coalescer = Coalescer(executor=self.executor)
+        self.scheduler = Scheduler(spin=self.settings["SCHEDULER_SPIN"])
+        self.sequencer = Sequencer(scheduler=self.scheduler, executor=self.executor)
+        self.key_matcher = KeyMatcher(
+            table=self.dispatch_table,
+            submit=self.submit_binding,
+            scheduler=self.scheduler,
+            timeout=self.settings["KEY_SEQUENCE_TIMEOUT"],
+        )
+        self.latency = LatencyRecorder(
+            enabled=self.settings["LATENCY_STATS"], log_interval=self.settings["LATENCY_LOG_INTERVAL"]
+        )
+        self.stats_server = StatsServer(path=self.settings["STATS_SOCKET"], snapshot=self.stats_snapshot)
+        # Created when macros start to run, the editor and short-lived commands never import asyncio
+        self.control_server = None
+
+        # Profiles: "system" asks the backend for the foreground app, "push" only takes what the control socket sends
+        # Without a backend start() reports the unsupported system, there is nothing to poll until then
+        sources = {"system": self.system.get_foreground_app if self.system else None, "push": None}
+        self.foreground = ForegroundTracker(
+            source=foreground_source or sources[self.settings["FOREGROUND_APP_SOURCE"]],
+            on_change=self.key_matcher.select,
+            interval=self.settings["FOREGROUND_POLL_INTERVAL"],
+            enabled=lambda: bool(self.dispatch_table.app_keymaps),
+        )
 
         # Files
-        self.device_config = JSONFile(path="src/data/device_config.json")
+        self.device_config = JSONFile(path=self.settings["DEVICE_CONFIG_PATH"])
+        self.config_store = ConfigStore(
+            file=self.device_config,
+            flush_delay=self.settings["CONFIG_FLUSH_DELAY"],
+            flush_max_delay=self.settings["CONFIG_FLUSH_MAX_DELAY"],
+        )
+        self.discovery_cache = DiscoveryCache(
+            file=JSONFile(path=self.settings["DEVICE_CACHE_PATH"]), ttl=self.settings["DISCOVERY_CACHE_TTL"]
+        )
+        self.plugin_index = PluginIndex(file=JSONFile(path=self.settings["PLUGIN_INDEX_PATH"]))
+        self.config_watcher = FileWatcher(
+            path=self.device_config.path,
+            on_change=self.reload_device_config,
+            interval=self.settings["CONFIG_WATCH_INTERVAL"],
+        )
 
-    def run(self):
+    def start(self):
         if not self.system:
             print("Brak obsługi dla tego systemu")
             exit()
 
+        with self.profiler.phase("actions"):
+            self.actions.register_functions(self.system.functions)
+            self.actions.load_entry_points(index=self.plugin_index)
+
+        with self.profiler.phase("config"):
+            self.discovery_cache.load()
+            self.device_discovery = DeviceDiscovery(
+                probes=self.system.device_probes(),
+                timeouts=self.settings["DISCOVERY_TIMEOUTS"],
+                cache=self.discovery_cache,
+                fingerprints=self.system.device_fingerprints(),
+            )
+
+            # Config
+            self.device_config.ensure_file_exists()
+            self.config_store.load()
+            self.rebuild_dispatch_table()
+            self.config_watcher.start()
+
+    def shutdown(self):
+        if self.listener:
+            self.listener.stop()
+        self.stats_server.stop()
+        if self.control_server:
+            self.control_server.stop()
+        self.foreground.stop()
+        self.latency.stop()
+        self.sequencer.cancel_all()
+        self.scheduler.stop()
+        self.coalescer.stop()
+        self.executor.stop()
+        if self.device_resolver:
+            self.device_resolver.stop()
+
+        self.config_watcher.stop()
+        self.config_store.close()
+        self.spawner.stop()
+
+    def run(self, editor=False):
+        self.start()
+
+        # Qt is only needed by the window, the headless daemon never loads it
+        with self.profiler.phase("qt_imports"):
+            from PyQt6.QtCore import QTimer
+            from PyQt6.QtWidgets import QApplication
+
+            from src.ui.main_window import Window
+
         # Window
-        app = QApplication(sys.argv)
-        window = Window(application=self)
-        window.show()
+        with self.profiler.phase("window"):
+            app = QApplication(sys.argv)
+            window = Window(application=self)
+            window.show()
+
+        # As an editor the window only writes the config, the running daemon picks it up and fires the macros
+        if editor:
+            self.config_store.flush_listeners.append(self.notify_daemon)
+
+        with self.profiler.phase("listener"):
+            self.start_keyboard_listener(execute_macros=not editor)
+
+        # The window is drawn on the first event loop pass, the report waits for the device scan too
+        self.profiler.begin("first_frame")
+        QTimer.singleShot(0, self.finish_first_frame)
+
+        exit_code = app.exec()
+        self.shutdown()
+
+        sys.exit(exit_code)
+
+    def run_headless(self):
+        self.start()
+        self.follow_current_device = False
+
+        stop_event = threading.Event()
+
+        def request_stop(signum, frame):
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGTERM, request_stop)
 
-        # Config
-        self.device_config.ensure_file_exists()
-        self.load_device_config()
+        with self.profiler.phase("listener"):
+            self.start_keyboard_listener()
+        self.profiler.finish()
 
-        sys.exit(app.exec())
+        print(f"DEBUG: Tryb bez okna, urządzenia w konfiguracji: {len(self.config_store.entries)}")
+
+        # A short timeout keeps the main thread responsive to signals
+        while not stop_event.wait(timeout=1.0):
+            pass
+
+        self.shutdown()
+
+    def finish_first_frame(self):
+        self.profiler.end("first_frame")
+        self.profiler.finish()
+
+    def finish_device_scan(self):
+        self.profiler.end("device_scan")
+        self.profiler.finish()
 
     def load_device_config(self):
-        data = self.device_config.load_file()
+        return self.config_store.entries
+
+    def replace_device_config(self, data):
+        self.config_store.replace(data)
+        self.rebuild_dispatch_table()
+
+    def load_cached_devices(self):
+        self.devices_by_probe = self.device_discovery.cached_devices()
+        self.recognized_devices = self.merge_probe_devices()
+
+    def update_probe_devices(self, probe, devices):
+        self.devices_by_probe[probe] = devices
+        self.failed_probes.discard(probe)
+        self.recognized_devices = self.merge_probe_devices()
+
+    def mark_probe_failed(self, probe):
+        # A probe that timed out or raised keeps what the cache had for it, its devices are just not known this time
+        self.failed_probes.add(probe)
+
+    def merge_probe_devices(self):
+        devices = {}
+
+        for probe in self.device_discovery.probes:
+            for device in self.devices_by_probe.get(probe, []):
+                devices.setdefault(device.name, device)
+
+        return list(devices.values())
+
+    def sync_recognized_devices(self, devices):
+        if not devices:
+            return
+
+        serializable_data = []
+
+        for device in devices:
+            # Only what the scan knows is updated, macros, profiles and any other keys of the entry are kept
+            entry = self.config_store.device(device.name)
+            device_dict = dict(entry) if entry else {"macros": []}
+            device_dict.update({"device": device.name, "device_id": device.id, "device_type": device.type})
+
+            serializable_data.append(device_dict)
+
+        # A partial scan cannot tell an unplugged device from one the failed probe would have found,
+        # so nothing is dropped until every probe answers
+        if self.failed_probes:
+            found = {device["device"] for device in serializable_data}
+            serializable_data.extend(dict(entry) for entry in self.config_store.entries if entry["device"] not in found)
+
+        self.replace_device_config(serializable_data)
+
+        if self.device_resolver:
+            self.device_resolver.invalidate()
 
-        return [] if not isinstance(data, list) else data
+    def reload_device_config(self):
+        if not self.config_store.reload():
+            return False
 
-    def load_macros_for_device(self, device):
-        data = self.load_device_config()
+        self.rebuild_dispatch_table()
 
-        for entry in data:
-            if entry["device"] == device:
-                return entry.get("macros", [])
-        return []
+        # Runs on the watcher or control thread, the window swaps its macro list on the GUI thread
+        for listener in self.config_listeners:
+            listener()
+
+        return True
+
+    def notify_daemon(self):
+        # The daemon would notice the new file on its next check anyway, asking it to reload makes it immediate
+        try:
+            with ControlClient(self.settings["CONTROL_SOCKET"]) as client:
+                client.reload()
+        except (OSError, ControlError) as e:
+            print(f"DEBUG: Nie udało się powiadomić działającego procesu o zmianie konfiguracji: {e}")
+
+    def rebuild_dispatch_table(self):
+        with self.config_store.lock:
+            self.dispatch_table.compile(
+                self.config_store.entries,
+                self.actions,
+                coalesce_windows=self.settings["COALESCE_WINDOWS"],
+            )
+
+        # Every profile was compiled above, picking the foreground app's tables is only a reference swap
+        self.key_matcher.select(self.foreground.get())
+
+    def load_macros_for_device(self, device, profile=None):
+        return self.config_store.macros(device, profile)
+
+    def load_profiles_for_device(self, device):
+        return self.config_store.profiles(device)
+
+    def add_profile(self, app):
+        if not self.current_device or not self.config_store.add_profile(self.current_device, app):
+            return False
+
+        self.rebuild_dispatch_table()
+        return True
+
+    def delete_profile(self, app):
+        if not self.current_device or not self.config_store.delete_profile(self.current_device, app):
+            return False
+
+        self.rebuild_dispatch_table()
+        return True
 
     def save_macro(self, key, function):
         if not self.current_device:
             return
 
-        data = self.load_device_config()
+        if not self.config_store.save_macro(self.current_device, key, function, self.current_profile):
+            return
+
+        self.rebuild_dispatch_table()
 
-        for entry in data:
-            if entry["device"] == self.current_device:
-                for macro in entry["macros"]:
-                    if macro["key"] == key:
-                        macro["function"] = function
-                        break
-                else:
-                    entry["macros"].append({"key": key, "function": function})
+        for macro in self.macros:
+            if macro["key"] == key:
+                macro["function"] = function
+                macro.pop("sequence", None)
                 break
 
-        self.device_config.save_file(data=data)
+    def delete_macro(self, macro):
+        if not self.current_device:
+            return
+
+        if self.config_store.delete_macro(self.current_device, macro, self.current_profile):
+            self.rebuild_dispatch_table()
+
+        if macro in self.macros:
+            self.macros.remove(macro)
 
     def execute_macro(self, function_name):
-        for func in self.system.functions:
-            if func["name"] == function_name:
-                func["function"]()
-                return
+        pressed_at = time.perf_counter_ns() if self.latency.enabled else 0
+        binding = self.dispatch_table.function(function_name)
+
+        if binding:
+            self.submit_binding(binding, pressed_at)
+            return True
 
         print(f"DEBUG: Nie znaleziono funkcji '{function_name}'")
+        return False
 
     def update_macro_key(self, old_key, new_key):
         if not self.current_device:
             return
 
-        data = self.load_device_config()
+        if not self.config_store.update_macro_key(self.current_device, old_key, new_key, self.current_profile):
+            return
 
-        for entry in data:
-            if entry["device"] == self.current_device:
-                for macro in entry["macros"]:
-                    if macro["key"] == old_key:
-                        macro["key"] = new_key
-                        self.device_config.save_file(data=data)
+        self.rebuild_dispatch_table()
 
-                        self.macros = self.load_macros_for_device(self.current_device)
-                        self.start_keyboard_listener()
-                        return
+        for macro in self.macros:
+            if macro["key"] == old_key:
+                macro["key"] = new_key
+                break
 
     def on_key_press(self, event):
-        key_name = event.name
-        active_device = self.system.get_active_input_device()
+        # A single attribute check is all the instrumentation costs while it is disabled
+        pressed_at = time.perf_counter_ns() if self.latency.enabled else 0
+        # Backends that know the source device (evdev) attach it to the event
+        active_device = getattr(event, "device", None) or self.device_resolver.get()
 
         if not active_device:
             return
 
-        if active_device != self.current_device:
+        if self.follow_current_device and active_device != self.current_device:
             return
 
-        for macro in self.macros:
-            if macro["key"] == key_name:
-                self.execute_macro(macro["function"])
+        # Chords, leader sequences and layers: one transition of the device's compiled keymap per event
+        self.key_matcher.feed(active_device, event, pressed_at)
+
+    def submit_binding(self, binding, pressed_at=0):
+        if binding.sequence:
+            self.sequencer.toggle(binding.name, binding.sequence)
+            return
+
+        if pressed_at:
+            binding = binding._replace(function=self.latency.timed(binding.name, binding.function, pressed_at))
+
+        if binding.coalesce:
+            self.coalescer.push(binding)
+        else:
+            self.executor.submit(binding.group, binding.function)
+
+    def ignore_key_press(self, event):
+        pass
+
+    def start_keyboard_listener(self, execute_macros=True):
+        if not self.device_resolver:
+            self.device_resolver = DeviceResolver(
+                source=self.system.get_active_input_device,
+                interval=self.settings["DEVICE_REFRESH_INTERVAL"],
+            )
+        self.device_resolver.start()
 
-    def start_keyboard_listener(self):
-        self.listener_thread = threading.Thread(target=self.system.device_listener, daemon=True)
-        self.listener_thread.start()
+        if execute_macros:
+            self.executor.start()
+            self.coalescer.start()
+            self.scheduler.start()
+            self.latency.start()
+            self.stats_server.start()
+            self.start_control_server()
+            self.foreground.start()
+
+        handler = self.on_key_press if execute_macros else self.ignore_key_press
+
+        if not self.listener:
+            self.listener = ListenerSupervisor(
+                listen=self.system.device_listener,
+                handler=handler,
+                stop_listener=self.system.stop_device_listener,
+            )
+        self.listener.start()
+
+    def start_control_server(self):
+        if not self.control_server:
+            from src.control.control_server import ControlServer
+
+            self.control_server = ControlServer(
+                path=self.settings["CONTROL_SOCKET"],
+                invoke=self.execute_macro,
+                reload=self.reload_device_config,
+                foreground=lambda app: self.foreground.push(app),
+            )
+
+        self.control_server.start()
+
+    def stats_snapshot(self):
+        return {
+            "latency": self.latency.snapshot(),
+            "latency_enabled": self.latency.enabled,
+            "executor": self.executor.snapshot(),
+            "coalescer": dict(self.coalescer.stats),
+            "scheduler": dict(self.scheduler.stats),
+            "sequencer": dict(self.sequencer.stats),
+            "keys": dict(self.key_matcher.stats, layers=self.key_matcher.active_layers()),
+            "listener": self.listener.health() if self.listener else None,
+            "config": dict(self.config_store.stats),
+            "control": dict(self.control_server.stats) if self.control_server else None,
+            "foreground": dict(self.foreground.stats, app=self.foreground.get()),
+            "spawner": dict(self.spawner.stats, alive=self.spawner.is_alive()),
+            "state": dict(self.system.state.stats) if getattr(self.system, "state", None) else None,
+        }
 
     def recognize_system(self):
         system_name = platform.system()
 
+        # Only the detected platform's backend is imported, macOS pulls in `keyboard` for example
         if system_name == "Windows":
+            from src.system.windows.windows import Windows
+
             return Windows()
         elif system_name == "Darwin":
+            from src.system.macOS.macOS import MacOS
+
             return MacOS(application=self)
+        elif system_name == "Linux":
+            from src.system.linux.linux import Linux
+
+            return Linux(application=self)
         else:
             return None
@@ -0,0 +1,143 @@
+import collections
+from types import MappingProxyType
+
+from src.application.keymap import LAYER_PREFIX, Keymap
+
+EMPTY_BINDINGS = MappingProxyType({})
+
+Binding = collections.namedtuple(
+    "Binding", ["name", "function", "group", "coalesce", "sequence", "layer"], defaults=[None, None, None]
+)
+
+
+class DispatchTable:
+    def __init__(self):
+        self.functions = EMPTY_BINDINGS
+        self.bindings = EMPTY_BINDINGS
+        self.keymaps = EMPTY_BINDINGS
+        self.app_keymaps = EMPTY_BINDINGS
+        self.registry = None
+        self.coalesce_windows = {}
+
+    def compile(self, config, registry, coalesce_windows=None):
+        coalesce_windows = coalesce_windows or {}
+        functions_by_name = {}
+
+        def bind(reference):
+            # Only actions the config uses are resolved, so unused plugins are never imported
+            if reference not in functions_by_name:
+                action = registry.resolve(reference)
+                functions_by_name[reference] = action_binding(action, coalesce_windows) if action else None
+
+            return functions_by_name[reference]
+
+        def compile_macros(device, macros, device_bindings, layered):
+            for macro in macros:
+                key, name = macro["key"], macro["function"]
+
+                if "sequence" in macro:
+                    function = compile_sequence(device, macro, bind)
+                else:
+                    # Most macros use an action an earlier macro already resolved, a plain subscript is the
+                    # cheapest lookup for them
+                    try:
+                        function = functions_by_name[name]
+                    except KeyError:
+                        function = layer_binding(name) if name.startswith(LAYER_PREFIX) else bind(name)
+
+                if not key or not function:
+                    continue
+
+                if "layer" in macro:
+                    layered.append((macro["layer"], key, function))
+                else:
+                    device_bindings[key] = function
+
+        bindings = {}
+        keymaps = {}
+        profiles = {}
+
+        for entry in config:
+            device = entry["device"]
+            device_bindings, layered = {}, []
+            compile_macros(device, entry.get("macros", []), device_bindings, layered)
+
+            bindings[device] = MappingProxyType(device_bindings)
+            keymaps[device] = Keymap(bindings[device], layered)
+
+            # Every profile is a table of its own: the device's macros with the app's ones on top
+            for app, profile in entry.get("profiles", {}).items():
+                profile_bindings, profile_layered = dict(device_bindings), list(layered)
+                compile_macros(f"{device}/{app}", profile["macros"], profile_bindings, profile_layered)
+
+                profiles.setdefault(app.lower(), {})[device] = Keymap(
+                    MappingProxyType(profile_bindings), profile_layered
+                )
+
+        # An app's tables cover every device, the ones without a profile for it keep their default keymap
+        app_keymaps = {app: MappingProxyType({**keymaps, **devices}) for app, devices in profiles.items()}
+
+        # Each table is published with a single reference assignment, so readers never see a partial build
+        self.functions = MappingProxyType({name: binding for name, binding in functions_by_name.items() if binding})
+        self.bindings = MappingProxyType(bindings)
+        self.keymaps = MappingProxyType(keymaps)
+        self.app_keymaps = MappingProxyType(app_keymaps)
+        self.registry = registry
+        self.coalesce_windows = coalesce_windows
+
+    def keymaps_for(self, app):
+        # Sources differ in how they spell an app's name, profiles are matched case-insensitively
+        return self.app_keymaps.get(app.lower(), self.keymaps) if app else self.keymaps
+
+    def lookup(self, device, key):
+        return self.bindings.get(device, EMPTY_BINDINGS).get(key)
+
+    def function(self, name):
+        binding = self.functions.get(name)
+
+        if binding or not self.registry:
+            return binding
+
+        # An action that is not bound to any key, e.g. run from the window
+        action = self.registry.resolve(name)
+
+        return action_binding(action, self.coalesce_windows) if action else None
+
+
+def layer_binding(name):
+    return Binding(name=name, function=None, group=None, layer=name[len(LAYER_PREFIX) :])
+
+
+def action_binding(action, coalesce_windows):
+    return Binding(
+        name=action.name,
+        function=action.function,
+        group=action.group,
+        coalesce=coalesce_windows.get(action.name, action.coalesce),
+    )
+
+
+def compile_sequence(device, macro, bind):
+    # Steps become (delay before the step, function binding) pairs, repeats are unrolled here once
+    steps = []
+    delay = 0.0
+
+    for step in macro["sequence"]:
+        if "delay" in step:
+            delay += step["delay"]
+            continue
+
+        function = bind(step.get("function"))
+        if not function:
+            print(f"DEBUG: Sekwencja '{macro['function']}' używa nieznanej funkcji '{step.get('function')}'")
+            return None
+
+        for repeat in range(step.get("repeat", 1)):
+            steps.append((delay if repeat == 0 else step.get("interval", 0.0), function))
+        delay = 0.0
+
+    if not steps:
+        return None
+
+    # Named after the key, so pressing it again finds the running sequence
+    return Binding(name=f"{device}/{macro['key']}", function=None, group=None, sequence=tuple(steps))
@@ -0,0 +1,71 @@
+import threading
+import time
+
+
+class ForegroundTracker:
+    def __init__(self, source, on_change, interval=0.5, enabled=None):
+        # source returns the foreground app's name (or None), it is None for sources that only push
+        self.source = source
+        self.on_change = on_change
+        self.interval = interval
+        self.enabled = enabled or (lambda: True)
+
+        self.app = None
+        self.changed_at = None
+        self.stats = {"polls": 0, "pushes": 0, "switches": 0, "errors": 0}
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if not self.source or (self._thread and self._thread.is_alive()):
+            return
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="foreground-app", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def get(self):
+        return self.app
+
+    def push(self, app):
+        # Sources that are told about focus changes (a window manager hook, the control socket) skip the polling
+        self.stats["pushes"] += 1
+        return self.update(app)
+
+    def poll(self):
+        self.stats["polls"] += 1
+
+        try:
+            app = self.source()
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"DEBUG: Błąd podczas sprawdzania aktywnej aplikacji: {e}")
+            return self.app
+
+        self.update(app)
+        return app
+
+    def update(self, app):
+        with self._lock:
+            if app == self.app:
+                return False
+
+            self.app = app
+            self.changed_at = time.monotonic()
+            self.stats["switches"] += 1
+
+        self.on_change(app)
+        return True
+
+    def _run(self):
+        while not self._stopped.is_set():
+            # Without any profile in the config the foreground app does not matter, nothing is polled
+            if self.enabled():
+                self.poll()
+
+            self._stopped.wait(self.interval)
@@ -0,0 +1,394 @@
+import collections
+import functools
+import threading
+import time
+from types import MappingProxyType
+
+KEY_UP = "up"
+LAYER_PREFIX = "layer:"
+STEP_SEPARATOR = ", "
+CHORD_SEPARATOR = "+"
+# The "+" key itself is written "plus" in the config, "+" and "ctrl++" are read too
+PLUS = "plus"
+
+# Left and right variants of a modifier count as the same modifier in a chord
+MODIFIERS = {
+    "ctrl": "ctrl",
+    "control": "ctrl",
+    "left ctrl": "ctrl",
+    "right ctrl": "ctrl",
+    "shift": "shift",
+    "left shift": "shift",
+    "right shift": "shift",
+    "alt": "alt",
+    "option": "alt",
+    "left alt": "alt",
+    "right alt": "alt",
+    "alt gr": "alt",
+    "cmd": "cmd",
+    "command": "cmd",
+    "left cmd": "cmd",
+    "right cmd": "cmd",
+    "windows": "cmd",
+    "left windows": "cmd",
+    "right windows": "cmd",
+}
+MODIFIER_ORDER = ("ctrl", "alt", "shift", "cmd")
+
+KeyNode = collections.namedtuple("KeyNode", ["binding", "children"])
+
+NO_CHILDREN = MappingProxyType({})
+NO_MODIFIERS = frozenset()
+EMPTY_NODE = KeyNode(binding=None, children=NO_CHILDREN)
+
+
+# Every device usually binds the same few keys, each spelling is parsed once
+@functools.lru_cache(maxsize=4096)
+def parse_key(spec):
+    # "f1", "ctrl+1" or "f13, a": steps of a leader sequence, each a chord of modifiers and one key
+    if CHORD_SEPARATOR not in spec and STEP_SEPARATOR not in spec:
+        key = spec.lower().strip()
+        return ((NO_MODIFIERS, CHORD_SEPARATOR if key == PLUS else key),)
+
+    steps = []
+
+    for step in spec.lower().split(STEP_SEPARATOR):
+        step = step.strip()
+
+        # A trailing "+" after the separator is the key, not another separator
+        if step == CHORD_SEPARATOR:
+            modifiers, key = [], CHORD_SEPARATOR
+        elif step.endswith(CHORD_SEPARATOR * 2):
+            modifiers, key = step[:-2].split(CHORD_SEPARATOR), CHORD_SEPARATOR
+        else:
+            *modifiers, key = step.split(CHORD_SEPARATOR)
+
+        if not key or any(modifier not in MODIFIERS for modifier in modifiers):
+            raise ValueError(f"Niepoprawny klawisz: {spec!r}")
+
+        steps.append(
+            (frozenset(MODIFIERS[modifier] for modifier in modifiers), CHORD_SEPARATOR if key == PLUS else key)
+        )
+
+    return tuple(steps)
+
+
+def format_step(modifiers, key):
+    key = PLUS if key == CHORD_SEPARATOR else key
+
+    return CHORD_SEPARATOR.join([modifier for modifier in MODIFIER_ORDER if modifier in modifiers] + [key])
+
+
+def is_key_up(event):
+    # Events without a type (replays, the fake backend) are presses
+    return getattr(event, "event_type", None) == KEY_UP
+
+
+def build_trie(entries):
+    root = [None, {}]
+
+    for steps, binding in entries:
+        node = root
+
+        for step in steps:
+            node = node[1].setdefault(step, [None, {}])
+
+        node[0] = binding
+
+    return freeze(root)
+
+
+def freeze(node):
+    binding, children = node
+
+    if not children:
+        return KeyNode(binding=binding, children=NO_CHILDREN)
+
+    return KeyNode(
+        binding=binding, children=MappingProxyType({step: freeze(child) for step, child in children.items()})
+    )
+
+
+def merge(base, overlay):
+    # Layer bindings win over the base ones on the same keys, the rest of both tries is kept
+    children = dict(base.children)
+
+    for step, node in overlay.children.items():
+        children[step] = merge(children[step], node) if step in children else node
+
+    return KeyNode(binding=overlay.binding or base.binding, children=MappingProxyType(children))
+
+
+class Keymap:
+    def __init__(self, bindings, layered=()):
+        self.bindings = bindings
+        self.layered = layered
+        self.layers = None
+        self.roots = {}
+        self.lock = threading.Lock()
+
+    def root(self, active_layers=NO_MODIFIERS):
+        # Each combination of active layers is merged once, afterwards a press is one dict lookup
+        with self.lock:
+            if active_layers not in self.roots:
+                if self.layers is None:
+                    self.layers = self.build()
+
+                root = self.layers.get(None, EMPTY_NODE)
+
+                for layer in sorted(active_layers):
+                    root = merge(root, self.layers.get(layer, EMPTY_NODE))
+
+                self.roots[active_layers] = root
+
+            return self.roots[active_layers]
+
+    def build(self):
+        # Built on the first key press from the device, a config lists many devices but only a few are in use
+        by_layer = {}
+
+        entries = [(None, key, binding) for key, binding in self.bindings.items()]
+
+        for layer, key, binding in entries + list(self.layered):
+            try:
+                steps = parse_key(key)
+            except ValueError as e:
+                print(f"DEBUG: Pomijam makro: {e}")
+                continue
+
+            by_layer.setdefault(layer, []).append((steps, binding))
+
+        return {layer: build_trie(layer_entries) for layer, layer_entries in by_layer.items()}
+
+
+class MatchState:
+    def __init__(self, keymap, layers=NO_MODIFIERS, modifiers=None, last_pressed=None):
+        self.keymap = keymap
+        self.layers = layers
+        self.root = keymap.root(self.layers)
+        self.node = self.root
+        self.deadline = 0.0
+        self.pending = None
+        self.modifiers = modifiers if modifiers is not None else set()
+        self.last_pressed = last_pressed
+
+
+class KeyMatcher:
+    def __init__(self, table, submit, scheduler, timeout=1.0):
+        self.table = table
+        self.submit = submit
+        self.scheduler = scheduler
+        self.timeout = timeout
+
+        self.app = None
+        self.keymaps = table.keymaps
+        self.states = {}
+        self.lock = threading.Lock()
+
+        self.stats = {"presses": 0, "matches": 0, "prefixes": 0, "timeouts": 0, "misses": 0, "switches": 0}
+
+    def select(self, app):
+        with self.lock:
+            in_use = [(device, state.layers) for device, state in self.states.items()]
+
+        # Tries of the devices in use are built here, on the thread that noticed the switch and without the lock,
+        # so the next press only swaps a reference
+        keymaps = self.table.keymaps_for(app)
+        for device, layers in in_use:
+            if device in keymaps:
+                keymaps[device].root(layers)
+
+        with self.lock:
+            # Read again, a rebuild in the meantime must not be replaced by the keymaps of the old table
+            self.app = app
+            self.keymaps = self.table.keymaps_for(app)
+            self.stats["switches"] += 1
+
+    def state(self, device):
+        keymap = self.keymaps.get(device)
+
+        if keymap is None:
+            return None
+
+        state = self.states.get(device)
+
+        if state is None:
+            state = self.states[device] = MatchState(keymap)
+        elif state.keymap is not keymap:
+            # A reloaded config or another app's profile starts from the root, layers and held keys are kept
+            self.cancel_pending(state)
+            state = self.states[device] = MatchState(
+                keymap, layers=state.layers, modifiers=state.modifiers, last_pressed=state.last_pressed
+            )
+
+        return state
+
+    def feed(self, device, event, pressed_at=0):
+        with self.lock:
+            actions = self.match(device, event, pressed_at)
+
+        # Outside the lock, a blocking executor must not stall the hook and the scheduler together
+        for binding in actions:
+            self.submit(binding, pressed_at)
+
+    def match(self, device, event, pressed_at):
+        ready = []
+        state = self.state(device)
+
+        if state is None:
+            return ready
+
+        name = event.name.lower()
+        modifier = MODIFIERS.get(name)
+
+        if is_key_up(event):
+            if state.last_pressed == name:
+                state.last_pressed = None
+            if modifier:
+                state.modifiers.discard(modifier)
+            return ready
+
+        if state.last_pressed == name:
+            # Auto-repeat of a held key, a held leader must not start its sequence again
+            return ready
+
+        state.last_pressed = name
+        self.stats["presses"] += 1
+        now = time.monotonic()
+
+        if state.node is not state.root and now > state.deadline:
+            self.reset(state, ready)
+
+        step = (frozenset(state.modifiers), name)
+        if modifier:
+            state.modifiers.add(modifier)
+
+        node = state.node.children.get(step)
+
+        if node is None and not modifier and state.node is not state.root:
+            # A key outside the started sequence ends it, and is matched from the root on its own
+            # (a modifier only starts the chord of the next step)
+            self.reset(state, ready)
+            node = state.root.children.get(step)
+
+        if node is None:
+            if not modifier:
+                self.stats["misses"] += 1
+        elif node.children:
+            self.advance(state, node, now, pressed_at)
+        else:
+            self.stats["matches"] += 1
+            ready.append(node.binding)
+            self.cancel_pending(state)
+            state.node = state.root
+
+        return self.run(state, ready)
+
+    def advance(self, state, node, now, pressed_at):
+        self.stats["prefixes"] += 1
+        self.cancel_pending(state)
+
+        state.node = node
+        state.deadline = now + self.timeout
+
+        # "f13" and "f13, a" both bound: the shorter one runs once no second key arrives in time
+        if node.binding:
+            state.pending = self.scheduler.call_at(state.deadline, self.expire, state, node, pressed_at)
+
+    def expire(self, state, node, pressed_at):
+        with self.lock:
+            if state.node is not node:
+                return
+
+            self.stats["timeouts"] += 1
+            state.pending = None
+            state.node = state.root
+
+            actions = self.run(state, [node.binding])
+
+        for binding in actions:
+            self.submit(binding, pressed_at)
+
+    def reset(self, state, ready):
+        # A prefix that is also a binding on its own still runs when its sequence is abandoned
+        if state.pending and state.node.binding:
+            ready.append(state.node.binding)
+
+        self.cancel_pending(state)
+        state.node = state.root
+
+    def cancel_pending(self, state):
+        if state.pending:
+            state.pending.cancel()
+            state.pending = None
+
+    def run(self, state, bindings):
+        # Layers switch here under the lock, the actions are returned for the caller to submit after releasing it
+        actions = []
+
+        for binding in bindings:
+            if binding.layer:
+                self.toggle_layer(state, binding.layer)
+            else:
+                actions.append(binding)
+
+        return actions
+
+    def toggle_layer(self, state, layer):
+        state.layers = state.layers ^ {layer}
+        state.root = state.keymap.root(state.layers)
+        state.node = state.root
+
+        print(f"DEBUG: Warstwa '{layer}' {'włączona' if layer in state.layers else 'wyłączona'}")
+
+    def active_layers(self):
+        with self.lock:
+            return {device: sorted(state.layers) for device, state in self.states.items() if state.layers}
+
+
+class KeyRecorder:
+    def __init__(self, max_steps=4):
+        self.max_steps = max_steps
+
+        self.steps = []
+        self.modifiers = set()
+        self.last_pressed = None
+
+    def feed(self, event):
+        name = event.name.lower()
+        modifier = MODIFIERS.get(name)
+
+        if is_key_up(event):
+            if not modifier:
+                return False
+
+            self.modifiers.discard(modifier)
+
+            # A modifier pressed and released on its own is recorded as a key, like older single-key macros
+            if self.last_pressed != name:
+                return False
+
+            self.last_pressed = None
+            self.steps.append(format_step(self.modifiers, name))
+            return True
+
+        if self.last_pressed == name:
+            # Auto-repeat of a held key
+            return False
+
+        self.last_pressed = name
+
+        if modifier:
+            self.modifiers.add(modifier)
+            return False
+
+        self.steps.append(format_step(self.modifiers, name))
+        return True
+
+    @property
+    def full(self):
+        return len(self.steps) >= self.max_steps
+
+    @property
+    def key(self):
+        return STEP_SEPARATOR.join(self.steps)
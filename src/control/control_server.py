@@ -0,0 +1,161 @@
+import asyncio
+import os
+import threading
+
+from src.control.protocol import ProtocolError, encode, read_message
+from src.profiler.stats_server import is_listening
+
+
+class ControlServer:
+    def __init__(self, path, invoke, reload, foreground=None):
+        self.path = path
+        self.invoke = invoke
+        self.reload = reload
+        self.foreground = foreground
+
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.writers = set()
+
+        self.stats = {"connections": 0, "requests": 0, "invoked": 0, "errors": 0}
+        self.operations = {
+            "ping": self.op_ping,
+            "invoke": self.op_invoke,
+            "batch": self.op_batch,
+            "reload": self.op_reload,
+            "foreground": self.op_foreground,
+        }
+
+    def start(self):
+        if self.thread or not hasattr(asyncio, "start_unix_server"):
+            return False
+
+        if os.path.exists(self.path):
+            if is_listening(self.path):
+                print(f"DEBUG: Gniazdo sterowania jest już używane przez inny proces ({self.path})")
+                return False
+
+            # A socket left behind by a process that did not shut down cleanly
+            os.unlink(self.path)
+
+        self.ready.clear()
+        self.thread = threading.Thread(target=self._run, name="control-server", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+
+        return self.server is not None
+
+    def stop(self):
+        if not self.thread:
+            return
+
+        if self.server:
+            asyncio.run_coroutine_threadsafe(self._close(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+        self.thread.join()
+        self.thread = None
+        self.server = None
+        self.loop = None
+
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+
+        try:
+            self.server = loop.run_until_complete(asyncio.start_unix_server(self.handle, path=self.path))
+            self.loop = loop
+            self.ready.set()
+            loop.run_forever()
+        except OSError as e:
+            print(f"DEBUG: Nie udało się uruchomić serwera sterowania ({self.path}): {e}")
+        finally:
+            self.ready.set()
+            loop.close()
+
+    async def _close(self):
+        self.server.close()
+
+        # Connected clients would keep wait_closed waiting, their streams are closed first
+        for writer in list(self.writers):
+            writer.close()
+
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.stats["connections"] += 1
+        self.writers.add(writer)
+
+        try:
+            while True:
+                try:
+                    message = await read_message(reader)
+                except asyncio.IncompleteReadError:
+                    return
+                except ProtocolError as e:
+                    # The stream can not be trusted past a bad frame, the client is told why and dropped
+                    self.stats["errors"] += 1
+                    writer.write(encode({"id": None, "ok": False, "error": str(e)}))
+                    await writer.drain()
+                    return
+
+                writer.write(encode(await self.respond(message)))
+                await writer.drain()
+        except ConnectionError:
+            return
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    async def respond(self, message):
+        self.stats["requests"] += 1
+        operation = self.operations.get(message.get("op"))
+
+        if not operation:
+            self.stats["errors"] += 1
+            return {"id": message.get("id"), "ok": False, "error": f"Nieznana operacja: {message.get('op')!r}"}
+
+        try:
+            result = operation(message)
+            if asyncio.iscoroutine(result):
+                result = await result
+        except (KeyError, TypeError, ValueError) as e:
+            self.stats["errors"] += 1
+            return {"id": message.get("id"), "ok": False, "error": f"Niepoprawne żądanie: {e}"}
+        except Exception as e:
+            # A failing action or reload is the client's answer, the connection stays open for the next request
+            self.stats["errors"] += 1
+            print(f"DEBUG: Błąd podczas obsługi polecenia {message.get('op')!r}: {e}")
+            return {"id": message.get("id"), "ok": False, "error": f"Błąd wykonania: {e}"}
+
+        return {"id": message.get("id"), "ok": True, "result": result}
+
+    def op_ping(self, message):
+        return None
+
+    def op_invoke(self, message):
+        self.stats["invoked"] += 1
+        return self.invoke(message["action"])
+
+    def op_batch(self, message):
+        if not isinstance(message["actions"], list):
+            raise TypeError("actions musi być listą")
+
+        self.stats["invoked"] += len(message["actions"])
+        return [self.invoke(action) for action in message["actions"]]
+
+    def op_foreground(self, message):
+        if not self.foreground:
+            raise ValueError("zmiana aktywnej aplikacji nie jest obsługiwana")
+
+        return self.foreground(message["app"])
+
+    async def op_reload(self, message):
+        # Reading and compiling the config is file work, it must not hold up other clients
+        return await asyncio.get_running_loop().run_in_executor(None, self.reload)
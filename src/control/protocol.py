@@ -0,0 +1,110 @@
+import json
+import socket
+import struct
+
+# Every message is a 4-byte big-endian length followed by that many bytes of compact JSON
+HEADER = struct.Struct("!I")
+MAX_FRAME = 1 << 20
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class ControlError(Exception):
+    pass
+
+
+def encode(message):
+    payload = json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode()
+
+    if len(payload) > MAX_FRAME:
+        raise ProtocolError(f"Wiadomość jest za duża ({len(payload)} B)")
+
+    return HEADER.pack(len(payload)) + payload
+
+
+def decode(payload):
+    try:
+        message = json.loads(payload)
+    except ValueError as e:
+        raise ProtocolError(f"Niepoprawny JSON: {e}")
+
+    if not isinstance(message, dict):
+        raise ProtocolError("Wiadomość musi być obiektem")
+
+    return message
+
+
+async def read_message(reader):
+    (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+
+    if length > MAX_FRAME:
+        raise ProtocolError(f"Ramka jest za duża ({length} B)")
+
+    return decode(await reader.readexactly(length))
+
+
+class ControlClient:
+    def __init__(self, path, timeout=2.0):
+        self.path = path
+        self.timeout = timeout
+
+        self.socket = None
+        self.counter = 0
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def connect(self):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(self.timeout)
+        self.socket.connect(self.path)
+
+    def close(self):
+        if self.socket:
+            self.socket.close()
+            self.socket = None
+
+    def request(self, op, **fields):
+        self.counter += 1
+        self.socket.sendall(encode({"id": self.counter, "op": op, **fields}))
+
+        response = self.receive()
+
+        if not response.get("ok"):
+            raise ControlError(response.get("error", "nieznany błąd"))
+
+        return response.get("result")
+
+    def receive(self):
+        (length,) = HEADER.unpack(self.receive_exactly(HEADER.size))
+
+        return decode(self.receive_exactly(length))
+
+    def receive_exactly(self, size):
+        data = bytearray()
+
+        while len(data) < size:
+            chunk = self.socket.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Połączenie zostało zamknięte")
+            data += chunk
+
+        return bytes(data)
+
+    def invoke(self, action):
+        return self.request("invoke", action=action)
+
+    def batch(self, actions):
+        return self.request("batch", actions=list(actions))
+
+    def reload(self):
+        return self.request("reload")
+
+    def foreground(self, app):
+        return self.request("foreground", app=app)
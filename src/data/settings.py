@@ -1,4 +1,28 @@
 settings = {
     "APP_NAME": "Stream Deck",
     "APP_GEOMETRY": (0, 0, 800, 450),
+    "DEVICE_REFRESH_INTERVAL": 2.0,
+    "EXECUTOR_WORKERS": 2,
+    "EXECUTOR_QUEUE_SIZE": 64,
+    "EXECUTOR_OVERFLOW_POLICY": "drop-oldest",
+    "COALESCE_WINDOWS": {},
+    "SCHEDULER_SPIN": 0.0005,
+    "KEY_SEQUENCE_TIMEOUT": 1.0,
+    "KEY_SEQUENCE_MAX_STEPS": 4,
+    "FOREGROUND_APP_SOURCE": "system",
+    "FOREGROUND_POLL_INTERVAL": 0.5,
+    "STATE_MAX_AGE": 5.0,
+    "SPAWN_HELPER": True,
+    "DEVICE_CONFIG_PATH": "src/data/device_config.json",
+    "DEVICE_CACHE_PATH": "src/data/device_cache.json",
+    "PLUGIN_INDEX_PATH": "src/data/plugin_index.json",
+    "CONFIG_FLUSH_DELAY": 1.0,
+    "CONFIG_FLUSH_MAX_DELAY": 5.0,
+    "CONFIG_WATCH_INTERVAL": 1.0,
+    "DISCOVERY_TIMEOUTS": {"builtin": 3.0, "usb": 10.0, "bluetooth": 10.0},
+    "DISCOVERY_CACHE_TTL": 24 * 60 * 60,
+    "LATENCY_STATS": False,
+    "LATENCY_LOG_INTERVAL": 60.0,
+    "STATS_SOCKET": "src/data/streamdeck.sock",
+    "CONTROL_SOCKET": "src/data/streamdeck-control.sock",
 }
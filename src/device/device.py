@@ -4,5 +4,12 @@ class Device:
         self.name = name
         self.type = device_type
 
+    def to_dict(self):
+        return {"name": self.name, "device_id": self.id, "device_type": self.type}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(name=data["name"], device_type=data["device_type"], device_id=data.get("device_id"))
+
     def __repr__(self):
         return f"Device(name={self.name}, device_id={self.id}, device_type={self.type})"
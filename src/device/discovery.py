@@ -0,0 +1,104 @@
+import threading
+import time
+
+
+class DeviceDiscovery:
+    def __init__(self, probes, timeouts=None, default_timeout=10.0, cache=None, fingerprints=None):
+        self.probes = probes
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self.cache = cache
+        self.fingerprints = fingerprints or {}
+
+        self.pool = None
+        self.pool_lock = threading.Lock()
+
+    def discover(self, on_result, on_finished=None, force=False):
+        thread = threading.Thread(target=self.collect, args=(on_result, on_finished, force), daemon=True)
+        thread.start()
+
+        return thread
+
+    def cached_devices(self):
+        if not self.cache:
+            return {}
+
+        return self.cache.devices(probes=self.probes)
+
+    def get_pool(self):
+        # concurrent.futures is only imported once a scan actually runs, the headless daemon never scans
+        import concurrent.futures
+
+        with self.pool_lock:
+            if not self.pool:
+                # Spare workers, so a probe still stuck past its timeout does not hold back the next scan
+                self.pool = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=max(1, len(self.probes) * 2), thread_name_prefix="device-probe"
+                )
+
+            return self.pool
+
+    def collect(self, on_result, on_finished=None, force=False):
+        import concurrent.futures
+
+        pool = self.get_pool()
+        started = time.monotonic()
+        futures = {pool.submit(self._probe, name, probe, force): name for name, probe in self.probes.items()}
+        deadlines = {
+            future: started + self.timeouts.get(name, self.default_timeout) for future, name in futures.items()
+        }
+
+        devices = []
+        pending = set(futures)
+
+        while pending:
+            timeout = max(0.0, min(deadlines[future] for future in pending) - time.monotonic())
+            done, pending = concurrent.futures.wait(
+                pending, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+
+            for future in done:
+                name = futures[future]
+
+                try:
+                    result = [device for device in future.result() if device and device.name]
+                except Exception as e:
+                    print(f"DEBUG: Błąd podczas wykrywania urządzeń ({name}): {e}")
+                    on_result(name, [], e)
+                    continue
+
+                devices.extend(result)
+                on_result(name, result, None)
+
+            now = time.monotonic()
+            for future in [future for future in pending if deadlines[future] <= now]:
+                pending.discard(future)
+                name = futures[future]
+
+                print(f"DEBUG: Przekroczono czas wykrywania urządzeń ({name})")
+                on_result(name, [], TimeoutError(name))
+
+        if self.cache:
+            self.cache.save()
+
+        if on_finished:
+            on_finished(devices)
+
+        return devices
+
+    def _probe(self, name, probe, force):
+        if not self.cache:
+            return probe()
+
+        fingerprint_probe = self.fingerprints.get(name)
+        fingerprint = fingerprint_probe() if fingerprint_probe else None
+
+        if not force:
+            devices = self.cache.get(name, fingerprint)
+            if devices is not None:
+                return devices
+
+        devices = probe()
+        self.cache.put(name, devices, fingerprint)
+
+        return devices
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from src.device.device import Device
+
+
+class DiscoveryCache:
+    def __init__(self, file, ttl=86400.0):
+        self.file = file
+        self.ttl = ttl
+
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.dirty = False
+
+    def load(self):
+        data = self.file.load_file()
+
+        with self.lock:
+            self.entries = data if isinstance(data, dict) else {}
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+
+            self.file.save_file(data=self.entries)
+            self.dirty = False
+
+    def get(self, probe, fingerprint=None):
+        with self.lock:
+            entry = self.entries.get(probe)
+
+        if not entry or time.time() - entry["updated_at"] > self.ttl:
+            return None
+
+        if fingerprint is not None and entry.get("fingerprint") != fingerprint:
+            return None
+
+        return [Device.from_dict(device) for device in entry["devices"]]
+
+    def put(self, probe, devices, fingerprint=None):
+        with self.lock:
+            self.entries[probe] = {
+                "devices": [device.to_dict() for device in devices if device],
+                "fingerprint": fingerprint,
+                "updated_at": time.time(),
+            }
+            self.dirty = True
+
+    def devices(self, probes=None):
+        with self.lock:
+            entries = dict(self.entries)
+
+        # Stale entries are still good enough to show before revalidation finishes
+        return {
+            probe: [Device.from_dict(device) for device in entry["devices"]]
+            for probe, entry in entries.items()
+            if probes is None or probe in probes
+        }
@@ -0,0 +1,70 @@
+import threading
+import time
+
+
+class DeviceResolver:
+    def __init__(self, source, interval=2.0):
+        self.source = source
+        self.interval = interval
+
+        self.snapshot = None
+        self.refreshed_at = None
+        self.refresh_count = 0
+
+        self._invalidated = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stopped.clear()
+        self.refresh()
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._invalidated.set()
+
+    def get(self):
+        return self.snapshot
+
+    def invalidate(self):
+        self._invalidated.set()
+
+    def refresh(self):
+        try:
+            self.snapshot = self.source()
+        except Exception as e:
+            print(f"DEBUG: Błąd podczas odświeżania aktywnego urządzenia: {e}")
+
+        self.refreshed_at = time.monotonic()
+        self.refresh_count += 1
+
+        return self.snapshot
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._invalidated.wait(self.interval)
+            self._invalidated.clear()
+
+            if self._stopped.is_set():
+                break
+
+            self.refresh()
+
+
+class ReplaySource:
+    def __init__(self, outputs, parser=None):
+        self.outputs = list(outputs)
+        self.parser = parser
+        self.index = 0
+
+    def __call__(self):
+        output = self.outputs[self.index % len(self.outputs)]
+        self.index += 1
+
+        return self.parser(output) if self.parser else output
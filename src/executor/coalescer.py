@@ -0,0 +1,87 @@
+import threading
+import time
+
+
+class Coalescer:
+    def __init__(self, executor):
+        self.executor = executor
+
+        self.pending = {}
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopped = False
+
+        self.stats = {"pressed": 0, "flushed": 0}
+
+    def start(self):
+        with self.condition:
+            if self.thread:
+                return
+
+            self.stopped = False
+            self.thread = threading.Thread(target=self._run, name="macro-coalescer", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def push(self, binding):
+        with self.condition:
+            self.stats["pressed"] += 1
+            entry = self.pending.get(binding.name)
+
+            if entry:
+                # The trailing flush runs the latest binding, e.g. after a config reload swapped the function
+                entry[1] += 1
+                entry[2] = binding
+                return
+
+            # The first press fires immediately and opens a window that collects the following ones
+            self.pending[binding.name] = [time.monotonic() + binding.coalesce, 0, binding]
+            self.stats["flushed"] += 1
+            self.condition.notify_all()
+
+        self._submit(binding, 1)
+
+    def _submit(self, binding, steps):
+        self.executor.submit(binding.group, binding.function, steps)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                if self.stopped:
+                    return
+
+                if not self.pending:
+                    self.condition.wait()
+                    continue
+
+                now = time.monotonic()
+                deadline = min(entry[0] for entry in self.pending.values())
+
+                if deadline > now:
+                    self.condition.wait(deadline - now)
+                    continue
+
+                due = []
+                for name, entry in list(self.pending.items()):
+                    if entry[0] > now:
+                        continue
+
+                    deadline, steps, binding = entry
+                    if steps:
+                        # Keep the window open while the key is still repeating
+                        self.pending[name] = [now + binding.coalesce, 0, binding]
+                        self.stats["flushed"] += 1
+                        due.append((binding, steps))
+                    else:
+                        del self.pending[name]
+
+            for binding, steps in due:
+                self._submit(binding, steps)
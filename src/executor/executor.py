@@ -0,0 +1,124 @@
+import collections
+import threading
+
+DROP_OLDEST = "drop-oldest"
+DROP_NEWEST = "drop-newest"
+BLOCK = "block"
+
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+Job = collections.namedtuple("Job", ["key", "function", "args", "on_drop"])
+
+
+class MacroExecutor:
+    def __init__(self, workers=2, queue_size=64, overflow_policy=DROP_OLDEST):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Nieznana polityka przepełnienia: {overflow_policy}")
+
+        self.workers = workers
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+
+        self.queue = collections.deque()
+        self.running = set()
+        self.condition = threading.Condition()
+        self.threads = []
+        self.stopped = False
+
+        self.stats = {"queued": 0, "dropped": 0, "completed": 0, "failed": 0}
+
+    def start(self):
+        with self.condition:
+            if self.threads:
+                return
+
+            self.stopped = False
+
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"macro-executor-{index}", daemon=True)
+                self.threads.append(thread)
+                thread.start()
+
+    def stop(self, wait=True):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+        if wait:
+            for thread in self.threads:
+                thread.join()
+
+        self.threads = []
+
+    def submit(self, key, function, *args, on_drop=None):
+        dropped = None
+
+        with self.condition:
+            if len(self.queue) >= self.queue_size:
+                if self.overflow_policy == DROP_NEWEST:
+                    self.stats["dropped"] += 1
+                    return False
+
+                if self.overflow_policy == DROP_OLDEST:
+                    dropped = self.queue.popleft()
+                    self.stats["dropped"] += 1
+
+                else:
+                    while len(self.queue) >= self.queue_size and not self.stopped:
+                        self.condition.wait()
+
+            self.queue.append(Job(key=key, function=function, args=args, on_drop=on_drop))
+            self.stats["queued"] += 1
+            self.condition.notify_all()
+
+        # A submitter waiting for its job to finish learns that it never will, outside the queue lock
+        if dropped and dropped.on_drop:
+            dropped.on_drop()
+
+        return True
+
+    def snapshot(self):
+        with self.condition:
+            return {**self.stats, "pending": len(self.queue), "running": len(self.running)}
+
+    def join(self):
+        with self.condition:
+            while self.queue or self.running:
+                self.condition.wait()
+
+    def _next_job(self):
+        # Jobs sharing a key never run concurrently and keep their submission order
+        for index, job in enumerate(self.queue):
+            if job.key not in self.running:
+                del self.queue[index]
+                return job
+
+        return None
+
+    def _work(self):
+        while True:
+            with self.condition:
+                job = self._next_job()
+
+                while job is None:
+                    if self.stopped:
+                        return
+
+                    self.condition.wait()
+                    job = self._next_job()
+
+                self.running.add(job.key)
+                self.condition.notify_all()
+
+            failed = False
+
+            try:
+                job.function(*job.args)
+            except Exception as e:
+                failed = True
+                print(f"DEBUG: Błąd podczas wykonywania makra: {e}")
+
+            with self.condition:
+                self.running.discard(job.key)
+                self.stats["failed" if failed else "completed"] += 1
+                self.condition.notify_all()
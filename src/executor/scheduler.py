@@ -0,0 +1,105 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class Timer:
+    def __init__(self, deadline, callback, args):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        # Cancelled timers stay in the heap and are skipped when they come up
+        self.cancelled = True
+
+
+class Scheduler:
+    def __init__(self, spin=0.0005):
+        self.spin = spin
+
+        self.heap = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopped = False
+
+        self.stats = {"scheduled": 0, "fired": 0, "cancelled": 0}
+
+    def start(self):
+        with self.condition:
+            if self.thread:
+                return
+
+            self.stopped = False
+            self.thread = threading.Thread(target=self._run, name="macro-scheduler", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def call_at(self, deadline, callback, *args):
+        timer = Timer(deadline, callback, args)
+
+        with self.condition:
+            heapq.heappush(self.heap, (deadline, next(self.counter), timer))
+            self.stats["scheduled"] += 1
+
+            # Only a new earliest deadline needs to shorten the current wait
+            if self.heap[0][2] is timer:
+                self.condition.notify_all()
+
+        return timer
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(time.monotonic() + delay, callback, *args)
+
+    def _next_timer(self):
+        while True:
+            with self.condition:
+                if self.stopped:
+                    return None
+
+                while self.heap and self.heap[0][2].cancelled:
+                    heapq.heappop(self.heap)
+                    self.stats["cancelled"] += 1
+
+                if not self.heap:
+                    self.condition.wait()
+                    continue
+
+                deadline = self.heap[0][0]
+                remaining = deadline - time.monotonic()
+
+                if remaining <= 0:
+                    self.stats["fired"] += 1
+                    return heapq.heappop(self.heap)[2]
+
+                if remaining > self.spin:
+                    # Wake up a little early, the last stretch is spun to keep the jitter low
+                    self.condition.wait(remaining - self.spin)
+                    continue
+
+            # Spinning outside the lock, so new timers can still be scheduled meanwhile
+            while time.monotonic() < deadline:
+                time.sleep(0)
+
+    def _run(self):
+        while True:
+            timer = self._next_timer()
+
+            if timer is None:
+                return
+
+            try:
+                timer.callback(*timer.args)
+            except Exception as e:
+                print(f"DEBUG: Błąd w zaplanowanym zadaniu: {e}")
@@ -0,0 +1,113 @@
+import functools
+import threading
+import time
+
+
+class SequenceRun:
+    def __init__(self, name, steps, started_at):
+        self.name = name
+        self.steps = steps
+        self.index = 0
+        self.next_at = started_at
+        self.timer = None
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+        if self.timer:
+            self.timer.cancel()
+
+
+class Sequencer:
+    def __init__(self, scheduler, executor):
+        self.scheduler = scheduler
+        self.executor = executor
+
+        self.running = {}
+        self.lock = threading.Lock()
+
+        self.stats = {"started": 0, "cancelled": 0, "finished": 0, "steps": 0}
+
+    def toggle(self, name, steps):
+        # Pressing the key of a running sequence stops it instead of starting it twice
+        with self.lock:
+            run = self.running.pop(name, None)
+
+            if run:
+                run.cancel()
+                self.stats["cancelled"] += 1
+                return False
+
+            run = SequenceRun(name, steps, time.monotonic())
+            self.running[name] = run
+            self.stats["started"] += 1
+            self._schedule(run)
+
+        return True
+
+    def cancel(self, name):
+        with self.lock:
+            run = self.running.pop(name, None)
+
+            if not run:
+                return False
+
+            run.cancel()
+            self.stats["cancelled"] += 1
+
+        return True
+
+    def cancel_all(self):
+        with self.lock:
+            for run in self.running.values():
+                run.cancel()
+
+            self.stats["cancelled"] += len(self.running)
+            self.running = {}
+
+    def is_running(self, name):
+        return name in self.running
+
+    def _schedule(self, run):
+        # Deadlines add up from the start, so a late timer does not push back the rest of the sequence
+        delay, binding = run.steps[run.index]
+        run.next_at += delay
+        run.timer = self.scheduler.call_at(run.next_at, self._fire, run)
+
+    def _fire(self, run):
+        with self.lock:
+            if run.cancelled:
+                return
+
+            delay, binding = run.steps[run.index]
+            run.index += 1
+            self.stats["steps"] += 1
+
+        # Submitted without the lock, a blocking executor must not stall the steps that would free its queue.
+        # A step runs under its action's group so it never overlaps a key press of the same action
+        on_done = functools.partial(self._step_done, run)
+        if not self.executor.submit(binding.group, self._run_step, on_done, binding.function, on_drop=on_done):
+            on_done()
+
+    def _run_step(self, on_done, function):
+        try:
+            function()
+        finally:
+            on_done()
+
+    def _step_done(self, run):
+        # The next step is only scheduled once this one is done or dropped, so steps stay in order when an action
+        # outlasts the delay after it and a full queue does not leave the run stuck in running
+        with self.lock:
+            if not run.cancelled:
+                self._advance(run)
+
+    def _advance(self, run):
+        if run.index < len(run.steps):
+            self._schedule(run)
+            return
+
+        if self.running.get(run.name) is run:
+            del self.running[run.name]
+        self.stats["finished"] += 1
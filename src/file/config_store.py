@@ -0,0 +1,325 @@
+import atexit
+import copy
+import threading
+import time
+import weakref
+
+from src.application.keymap import parse_key
+from src.file.watcher import file_fingerprint
+
+# Stores with edits that may not be written yet, flushed once when the interpreter exits
+open_stores = weakref.WeakSet()
+
+
+class ConfigStore:
+    def __init__(self, file, flush_delay=1.0, flush_max_delay=5.0):
+        self.file = file
+        self.flush_delay = flush_delay
+        self.flush_max_delay = flush_max_delay
+
+        self.entries = []
+        self.devices = {}
+
+        self.lock = threading.RLock()
+        # Held for a whole write, so an older copy never replaces a newer file and a reload never reads half a flush
+        self.write_lock = threading.Lock()
+        self.version = 0
+        self.dirty = False
+        self.timer = None
+        self.dirty_since = None
+        self.last_edit_at = None
+        self.fingerprint = None
+        self.flush_listeners = []
+
+        self.stats = {"loads": 0, "edits": 0, "writes": 0, "write_errors": 0, "reloads": 0, "reload_errors": 0}
+
+        open_stores.add(self)
+
+    def load(self):
+        data = self.file.load_file()
+
+        with self.lock:
+            self._set_entries(data if isinstance(data, list) else [])
+            self.dirty = False
+            self.fingerprint = file_fingerprint(self.file.path)
+            self.stats["loads"] += 1
+
+        return self.entries
+
+    def reload(self):
+        with self.write_lock, self.lock:
+            fingerprint = file_fingerprint(self.file.path)
+
+            # Our own flush, or a change that was already applied
+            if fingerprint == self.fingerprint:
+                return False
+
+            try:
+                data = self.file.read_file()
+                validate_config(data)
+            except (OSError, ValueError) as e:
+                self.stats["reload_errors"] += 1
+                print(f"DEBUG: Niepoprawny plik konfiguracji, zostaje poprzednia wersja: {e}")
+                return False
+
+            if self.dirty:
+                print("DEBUG: Konfiguracja zmieniona na dysku, niezapisane zmiany zostają odrzucone")
+
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+
+            self._set_entries(data)
+            self.dirty = False
+            self.fingerprint = fingerprint
+            self.stats["reloads"] += 1
+
+        return True
+
+    def device(self, device):
+        return self.devices.get(device)
+
+    def macros(self, device, profile=None):
+        macros = self.profile_macros(device, profile)
+
+        return [dict(macro) for macro in macros] if macros is not None else []
+
+    def profiles(self, device):
+        entry = self.devices.get(device)
+
+        return list(entry.get("profiles", {})) if entry else []
+
+    def profile_macros(self, device, profile=None):
+        # The device's own macro list is the default profile, an app profile only lists what it changes
+        entry = self.devices.get(device)
+
+        if not entry:
+            return None
+
+        if profile is None:
+            return entry["macros"]
+
+        return entry.get("profiles", {}).get(profile, {}).get("macros")
+
+    def add_profile(self, device, profile):
+        with self.lock:
+            entry = self.devices.get(device)
+            if not entry or profile in entry.get("profiles", {}):
+                return False
+
+            entry.setdefault("profiles", {})[profile] = {"macros": []}
+            self._mark_dirty()
+            return True
+
+    def delete_profile(self, device, profile):
+        with self.lock:
+            entry = self.devices.get(device)
+            if not entry or profile not in entry.get("profiles", {}):
+                return False
+
+            del entry["profiles"][profile]
+            self._mark_dirty()
+            return True
+
+    def replace(self, entries):
+        with self.lock:
+            self._set_entries(entries)
+            self._mark_dirty()
+
+    def save_macro(self, device, key, function, profile=None):
+        with self.lock:
+            macros = self.profile_macros(device, profile)
+            if macros is None:
+                return False
+
+            for macro in macros:
+                if macro["key"] == key:
+                    macro["function"] = function
+                    # Picking a single function replaces the sequence the macro ran before
+                    macro.pop("sequence", None)
+                    break
+            else:
+                macros.append({"key": key, "function": function})
+
+            self._mark_dirty()
+            return True
+
+    def update_macro_key(self, device, old_key, new_key, profile=None):
+        with self.lock:
+            macros = self.profile_macros(device, profile)
+            if macros is None:
+                return False
+
+            for macro in macros:
+                if macro["key"] == old_key:
+                    macro["key"] = new_key
+                    self._mark_dirty()
+                    return True
+
+            return False
+
+    def delete_macro(self, device, macro, profile=None):
+        with self.lock:
+            macros = self.profile_macros(device, profile)
+            if macros is None or macro not in macros:
+                return False
+
+            macros.remove(macro)
+            self._mark_dirty()
+            return True
+
+    def flush(self):
+        with self.write_lock:
+            with self.lock:
+                if self.timer:
+                    self.timer.cancel()
+                    self.timer = None
+
+                if not self.dirty:
+                    return False
+
+                # The copy is written without the lock, edits and lookups do not wait for the fsync
+                data = copy.deepcopy(self.entries)
+                version = self.version
+
+            try:
+                self.file.save_file(data=data)
+            except OSError as e:
+                with self.lock:
+                    self.stats["write_errors"] += 1
+                    # Still dirty, the write is tried again after another delay instead of waiting for the next edit
+                    if self.flush_delay is not None and not self.timer:
+                        self._start_timer(self.flush_delay)
+
+                print(f"DEBUG: Nie udało się zapisać konfiguracji, zmiany czekają na kolejny zapis: {e}")
+                return False
+
+            with self.lock:
+                # Edits made during the write are not in the file yet, they keep the store dirty for their own timer
+                self.dirty = self.version != version
+                self.fingerprint = file_fingerprint(self.file.path)
+                self.stats["writes"] += 1
+
+        for listener in self.flush_listeners:
+            listener()
+
+        return True
+
+    def close(self):
+        open_stores.discard(self)
+        self.flush()
+
+    def _set_entries(self, entries):
+        for entry in entries:
+            entry.setdefault("macros", [])
+
+        self.entries = entries
+        self.devices = {entry["device"]: entry for entry in entries}
+
+    def _mark_dirty(self):
+        now = time.monotonic()
+
+        if not self.dirty:
+            self.dirty_since = now
+        self.dirty = True
+        self.last_edit_at = now
+        self.version += 1
+        self.stats["edits"] += 1
+
+        if self.flush_delay is not None and not self.timer:
+            self._start_timer(self.flush_delay)
+
+    def _flush_due_at(self):
+        # Debounced: the write waits for a quiet period, but a stream of edits cannot hold it back forever
+        due_at = self.last_edit_at + self.flush_delay
+
+        if self.flush_max_delay is not None:
+            due_at = min(due_at, self.dirty_since + self.flush_max_delay)
+
+        return due_at
+
+    def _start_timer(self, delay):
+        self.timer = threading.Timer(delay, self._on_timer)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def _on_timer(self):
+        with self.lock:
+            # Cancelled by a flush or reload while it waited for the lock, a newer timer may be running already
+            if self.timer is not threading.current_thread():
+                return
+
+            if not self.dirty:
+                self.timer = None
+                return
+
+            # One timer for the whole burst, edits made while it waited move it on instead of starting a new one
+            remaining = self._flush_due_at() - time.monotonic()
+            if remaining > 0:
+                self._start_timer(remaining)
+                return
+
+        self.flush()
+
+
+@atexit.register
+def close_open_stores():
+    for store in list(open_stores):
+        store.close()
+
+
+def validate_config(data):
+    if not isinstance(data, list):
+        raise ValueError("Konfiguracja musi być listą urządzeń")
+
+    for entry in data:
+        if not isinstance(entry, dict) or not isinstance(entry.get("device"), str):
+            raise ValueError(f"Niepoprawny wpis urządzenia: {entry!r}")
+
+        validate_macros(entry["device"], entry.get("macros", []))
+
+        if not isinstance(entry.get("profiles", {}), dict):
+            raise ValueError(f"Profile urządzenia {entry['device']} muszą być słownikiem aplikacji: {entry!r}")
+
+        for app, profile in entry.get("profiles", {}).items():
+            if not app or not isinstance(profile, dict) or not isinstance(profile.get("macros"), list):
+                raise ValueError(f"Niepoprawny profil '{app}' w {entry['device']}: {profile!r}")
+
+            validate_macros(f"{entry['device']} ({app})", profile["macros"])
+
+
+def validate_macros(device, macros):
+    for macro in macros:
+        if not isinstance(macro, dict) or "key" not in macro or "function" not in macro:
+            raise ValueError(f"Niepoprawne makro w {device}: {macro!r}")
+
+        if "sequence" in macro:
+            validate_sequence(device, macro)
+
+        if not isinstance(macro["key"], str):
+            raise ValueError(f"Niepoprawny klawisz makra w {device}: {macro!r}")
+
+        if "layer" in macro and (not isinstance(macro["layer"], str) or not macro["layer"]):
+            raise ValueError(f"Niepoprawna warstwa makra w {device}: {macro!r}")
+
+        if macro["key"]:
+            parse_key(macro["key"])
+
+
+def validate_sequence(device, macro):
+    if not isinstance(macro["sequence"], list):
+        raise ValueError(f"Sekwencja makra w {device} musi być listą kroków: {macro!r}")
+
+    for step in macro["sequence"]:
+        if not isinstance(step, dict):
+            raise ValueError(f"Niepoprawny krok sekwencji w {device}: {step!r}")
+
+        if "delay" in step:
+            if not isinstance(step["delay"], (int, float)) or step["delay"] < 0:
+                raise ValueError(f"Niepoprawne opóźnienie w {device}: {step!r}")
+        elif not isinstance(step.get("function"), str):
+            raise ValueError(f"Krok sekwencji w {device} wymaga funkcji lub opóźnienia: {step!r}")
+        elif not isinstance(step.get("repeat", 1), int) or step.get("repeat", 1) < 1:
+            raise ValueError(f"Niepoprawna liczba powtórzeń w {device}: {step!r}")
+        elif not isinstance(step.get("interval", 0), (int, float)) or step.get("interval", 0) < 0:
+            raise ValueError(f"Niepoprawny odstęp powtórzeń w {device}: {step!r}")
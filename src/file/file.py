@@ -1,5 +1,6 @@
 import json
 import os
+import tempfile
 
 
 class File:
@@ -19,13 +20,43 @@ class JSONFile(File):
                 json.dump([], f, indent=self.indent, ensure_ascii=False)
 
     def save_file(self, data):
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=self.indent, ensure_ascii=False)
-            f.write("\n")
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=directory)
+
+        try:
+            os.chmod(temp_path, os.stat(self.path).st_mode if os.path.exists(self.path) else 0o644)
+
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=self.indent, ensure_ascii=False)
+                f.write("\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        self.sync_directory(directory)
+
+    @staticmethod
+    def sync_directory(directory):
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def read_file(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
 
     def load_file(self):
         try:
-            with open(self.path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return self.read_file()
         except (FileNotFoundError, json.JSONDecodeError):
             return []
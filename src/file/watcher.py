@@ -0,0 +1,176 @@
+import ctypes
+import os
+import select
+import struct
+import sys
+import threading
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class PollingBackend:
+    def __init__(self, path):
+        self.path = path
+        self.stopped = threading.Event()
+
+    def wait(self, timeout):
+        self.stopped.wait(timeout)
+
+    def wakeup(self):
+        self.stopped.set()
+
+    def close(self):
+        self.stopped.set()
+
+
+def load_libc():
+    # libc is already mapped into the interpreter, ctypes.util.find_library would spawn ldconfig to find it
+    return ctypes.CDLL(None, use_errno=True)
+
+
+class InotifyBackend:
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path).encode()
+
+        libc = load_libc()
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+
+        # The directory is watched, because an atomic replace swaps the file's inode
+        directory = os.path.dirname(os.path.abspath(path)).encode()
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, directory, mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, "inotify_add_watch")
+
+        self.wakeup_read, self.wakeup_write = os.pipe()
+
+    @staticmethod
+    def is_supported():
+        if not sys.platform.startswith("linux"):
+            return False
+
+        try:
+            return hasattr(load_libc(), "inotify_init1")
+        except OSError:
+            return False
+
+    def wait(self, timeout):
+        readable, _, _ = select.select([self.fd, self.wakeup_read], [], [], timeout)
+
+        if self.fd in readable:
+            self._drain()
+
+    def wakeup(self):
+        os.write(self.wakeup_write, b"\0")
+
+    def close(self):
+        # Only once nothing waits on the descriptors any more, a closed fd number could be reused under select
+        for fd in (self.fd, self.wakeup_read, self.wakeup_write):
+            os.close(fd)
+
+    def _drain(self):
+        changed = False
+
+        while True:
+            try:
+                data = os.read(self.fd, 4096)
+            except BlockingIOError:
+                return changed
+
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                name = data[offset + INOTIFY_EVENT.size : offset + INOTIFY_EVENT.size + length].rstrip(b"\0")
+                changed = changed or name == self.name
+                offset += INOTIFY_EVENT.size + length
+
+
+class FileWatcher:
+    def __init__(self, path, on_change, interval=1.0, backend=None):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.backend = backend
+
+        self.fingerprint = file_fingerprint(path)
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread:
+            return
+
+        if not self.backend:
+            self.backend = self._create_backend()
+
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, name="file-watcher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+        if self.backend:
+            self.backend.wakeup()
+
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+        # A restart creates a new backend, this one would keep the inotify fd and its pipe open
+        if self.backend:
+            self.backend.close()
+            self.backend = None
+
+    def check(self):
+        fingerprint = file_fingerprint(self.path)
+
+        if fingerprint == self.fingerprint:
+            return False
+
+        self.fingerprint = fingerprint
+        if fingerprint is not None:
+            self.on_change()
+
+        return True
+
+    def _create_backend(self):
+        if InotifyBackend.is_supported():
+            try:
+                return InotifyBackend(self.path)
+            except OSError as e:
+                print(f"DEBUG: inotify niedostępne, przełączam na odpytywanie: {e}")
+
+        return PollingBackend(self.path)
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.backend.wait(self.interval)
+
+            if self.stopped.is_set():
+                break
+
+            try:
+                self.check()
+            except Exception as e:
+                print(f"DEBUG: Błąd podczas przeładowania pliku {self.path}: {e}")
+
+
+def file_fingerprint(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
@@ -0,0 +1,94 @@
+import threading
+import time
+
+from src.application.keymap import is_key_up
+
+
+class ListenerSupervisor:
+    def __init__(self, listen, handler, stop_listener=None, restart_delay=1.0):
+        self.listen = listen
+        self.handler = handler
+        self.stop_listener = stop_listener
+        self.restart_delay = restart_delay
+
+        self.capture = None
+        self.thread = None
+        self.running = False
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+
+        self.restart_count = 0
+        self.event_count = 0
+        self.error_count = 0
+        self.started_at = None
+        self.last_event_at = None
+
+    def start(self):
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+
+            self.stopped.clear()
+            self.started_at = time.monotonic()
+            self.thread = threading.Thread(target=self._supervise, name="keyboard-listener", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+        if self.stop_listener:
+            self.stop_listener()
+
+    def capture_keys(self, callback):
+        # Key events go to the callback until it returns False or the capture is cancelled
+        self.capture = callback
+
+    def cancel_capture(self):
+        self.capture = None
+
+    def health(self):
+        now = time.monotonic()
+
+        return {
+            "alive": bool(self.thread and self.thread.is_alive() and self.running),
+            "restarts": self.restart_count,
+            "events": self.event_count,
+            "errors": self.error_count,
+            "capturing": self.capture is not None,
+            "uptime": now - self.started_at if self.started_at else 0.0,
+            "last_event_age": now - self.last_event_at if self.last_event_at else None,
+        }
+
+    def dispatch(self, event):
+        self.event_count += 1
+        self.last_event_at = time.monotonic()
+
+        capture = self.capture
+
+        try:
+            if capture and not capture(event) and self.capture is capture:
+                self.capture = None
+
+            # Releases still reach the bindings while capturing, so no modifier is left held there
+            if not capture or is_key_up(event):
+                self.handler(event)
+        except Exception as e:
+            self.error_count += 1
+            print(f"DEBUG: Błąd podczas obsługi klawisza: {e}")
+
+    def _supervise(self):
+        while not self.stopped.is_set():
+            self.running = True
+
+            try:
+                self.listen(self.dispatch)
+                print("DEBUG: Nasłuchiwanie klawiszy zakończyło się")
+            except Exception as e:
+                print(f"DEBUG: Błąd podczas nasłuchiwania klawiszy: {e}")
+
+            self.running = False
+
+            if self.stopped.wait(self.restart_delay):
+                return
+
+            self.restart_count += 1
@@ -0,0 +1,146 @@
+import threading
+import time
+
+# Stages of a key press: device lookup and dispatch, waiting for a worker, running the action
+STAGES = ("dispatch", "queue", "action", "total")
+
+# Power of two buckets in nanoseconds, the last one collects everything above ~17 s
+BUCKETS = 35
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, duration_ns):
+        self.counts[min(max(duration_ns, 1).bit_length() - 1, BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += duration_ns
+        self.max = max(self.max, duration_ns)
+
+    def merge(self, other):
+        self.counts = [count + other_count for count, other_count in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, fraction):
+        if not self.count:
+            return 0
+
+        rank = fraction * self.count
+        seen = 0
+
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                # The bucket's upper bound, never more than the largest recorded value
+                return min(2 ** (bucket + 1), self.max)
+
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count / 1000 if self.count else 0.0,
+            "p50_us": self.percentile(0.5) / 1000,
+            "p90_us": self.percentile(0.9) / 1000,
+            "p99_us": self.percentile(0.99) / 1000,
+            "max_us": self.max / 1000,
+        }
+
+
+class LatencyRecorder:
+    def __init__(self, enabled=False, log_interval=60.0):
+        self.enabled = enabled
+        self.log_interval = log_interval
+
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if not self.enabled or not self.log_interval or self.thread:
+            return
+
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._log, name="latency-log", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread = None
+
+    def record(self, action, stage, duration_ns):
+        with self.lock:
+            histograms = self.histograms.get(action)
+
+            if histograms is None:
+                histograms = self.histograms[action] = {stage: Histogram() for stage in STAGES}
+
+            histograms[stage].add(duration_ns)
+
+    def timed(self, action, function, pressed_at):
+        # Only called when enabled, the disabled path never allocates the wrapper
+        submitted_at = time.perf_counter_ns()
+        self.record(action, "dispatch", submitted_at - pressed_at)
+
+        def run(*args):
+            started_at = time.perf_counter_ns()
+            self.record(action, "queue", started_at - submitted_at)
+
+            try:
+                return function(*args)
+            finally:
+                finished_at = time.perf_counter_ns()
+                self.record(action, "action", finished_at - started_at)
+                self.record(action, "total", finished_at - pressed_at)
+
+        return run
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                action: {stage: histogram.to_dict() for stage, histogram in histograms.items()}
+                for action, histograms in self.histograms.items()
+            }
+
+    def merged(self, stage):
+        histogram = Histogram()
+
+        with self.lock:
+            for histograms in self.histograms.values():
+                histogram.merge(histograms[stage])
+
+        return histogram
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+
+    def summary(self):
+        parts = []
+
+        for action, stages in sorted(self.snapshot().items()):
+            total = stages["total"]
+            if not total["count"]:
+                continue
+
+            parts.append(
+                f"{action} n={total['count']} p50={total['p50_us']:.0f}us p99={total['p99_us']:.0f}us "
+                f"(dispatch {stages['dispatch']['p50_us']:.0f}us, queue {stages['queue']['p50_us']:.0f}us, "
+                f"action {stages['action']['p50_us']:.0f}us)"
+            )
+
+        return "; ".join(parts)
+
+    def _log(self):
+        while not self.stopped.wait(self.log_interval):
+            summary = self.summary()
+
+            if summary:
+                print(f"DEBUG: Opóźnienia makr: {summary}")
@@ -0,0 +1,77 @@
+import contextlib
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # Windows has no getrusage, the report then shows wall time only
+    resource = None
+
+
+def peak_rss():
+    if not resource:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StartupProfiler:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started_at = time.perf_counter()
+        self.initial_rss = peak_rss() if enabled else None
+
+        self.phases = {}
+        self.running = {}
+        self.reported = False
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def begin(self, name):
+        if not self.enabled or name in self.phases:
+            return
+
+        self.running[name] = time.perf_counter()
+
+    def end(self, name):
+        started_at = self.running.pop(name, None)
+
+        if started_at is None:
+            return
+
+        self.phases[name] = (time.perf_counter() - started_at, peak_rss())
+
+    def finish(self):
+        # Phases that end asynchronously (device scan) can keep the report waiting
+        if not self.enabled or self.reported or self.running:
+            return
+
+        self.reported = True
+        print(self.report())
+
+    def report(self):
+        lines = ["Profil uruchamiania:"]
+        previous_rss = self.initial_rss
+
+        for name, (duration, rss) in self.phases.items():
+            line = f"  {name:<16} {duration * 1000:9.1f} ms"
+
+            if rss is not None:
+                line += f"   peak RSS {rss / 2**20:7.1f} MB (+{(rss - previous_rss) / 2**20:.1f} MB)"
+                previous_rss = rss
+
+            lines.append(line)
+
+        lines.append(f"  {'total':<16} {(time.perf_counter() - self.started_at) * 1000:9.1f} ms")
+
+        return "\n".join(lines)
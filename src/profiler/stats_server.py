@@ -0,0 +1,76 @@
+import json
+import os
+import socket
+import socketserver
+import threading
+
+
+class StatsHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.wfile.write(json.dumps(self.server.snapshot(), ensure_ascii=False).encode() + b"\n")
+
+
+class StatsServer:
+    def __init__(self, path, snapshot):
+        self.path = path
+        self.snapshot = snapshot
+
+        self.server = None
+        self.thread = None
+
+    @staticmethod
+    def is_supported():
+        return hasattr(socket, "AF_UNIX")
+
+    def start(self):
+        if self.server or not self.is_supported():
+            return False
+
+        if os.path.exists(self.path):
+            if is_listening(self.path):
+                print(f"DEBUG: Statystyki są już udostępniane przez inny proces ({self.path})")
+                return False
+
+            # A socket left behind by a process that did not shut down cleanly
+            os.unlink(self.path)
+
+        self.server = socketserver.ThreadingUnixStreamServer(self.path, StatsHandler)
+        self.server.daemon_threads = True
+        self.server.snapshot = self.snapshot
+
+        self.thread = threading.Thread(target=self.server.serve_forever, name="stats-server", daemon=True)
+        self.thread.start()
+
+        return True
+
+    def stop(self):
+        if not self.server:
+            return
+
+        self.server.shutdown()
+        self.server.server_close()
+        self.server = None
+
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def is_listening(path):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(path)
+    except OSError:
+        return False
+
+    return True
+
+
+def query_stats(path, timeout=2.0):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(path)
+
+        with client.makefile("rb") as stream:
+            return json.loads(stream.readline())
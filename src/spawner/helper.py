@@ -0,0 +1,193 @@
+import json
+import os
+import selectors
+import signal
+import sys
+
+# Run as a script by the spawner before the application's imports, so it must only need the standard library.
+# Requests arrive on stdin and responses leave on stdout, one JSON object per line.
+
+# Python ignores SIGPIPE and the helper SIGINT, children get the default handlers back like with subprocess
+RESTORED_SIGNALS = tuple(getattr(signal, name) for name in ("SIGINT", "SIGPIPE", "SIGXFSZ") if hasattr(signal, name))
+
+
+class Child:
+    def __init__(self, request_id, output=None):
+        self.request_id = request_id
+        self.output = output
+        self.chunks = []
+        self.returncode = None
+
+
+class Helper:
+    def __init__(self, requests=0, responses=1):
+        self.requests = requests
+        self.responses = responses
+
+        self.selector = selectors.DefaultSelector()
+        self.children = {}
+        self.outputs = {}
+        self.buffer = b""
+        self.running = True
+
+    def send(self, message):
+        data = json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+        while data:
+            data = data[os.write(self.responses, data) :]
+
+    def run(self):
+        wakeup_read, wakeup_write = os.pipe()
+        os.set_blocking(wakeup_read, False)
+        os.set_blocking(wakeup_write, False)
+
+        # Exits are reported from the loop, the handler only wakes it up through the pipe
+        signal.set_wakeup_fd(wakeup_write)
+        signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+        self.selector.register(self.requests, selectors.EVENT_READ, self.read_requests)
+        self.selector.register(wakeup_read, selectors.EVENT_READ, self.reap)
+
+        while self.running:
+            for key, _ in self.selector.select():
+                key.data(key.fd)
+
+    def read_requests(self, fd):
+        chunk = os.read(fd, 65536)
+
+        # The application closed the pipe or died, launched programs are left running
+        if not chunk:
+            self.running = False
+            return
+
+        self.buffer += chunk
+
+        while b"\n" in self.buffer:
+            line, self.buffer = self.buffer.split(b"\n", 1)
+            self.handle(json.loads(line))
+
+    def handle(self, request):
+        if request.get("op") == "kill":
+            for pid, child in self.children.items():
+                if child.request_id == request["id"]:
+                    os.kill(pid, signal.SIGKILL)
+            return
+
+        try:
+            pid, output = self.spawn(request)
+        except OSError as e:
+            self.send({"id": request["id"], "errno": e.errno, "error": e.strerror or str(e)})
+            return
+
+        self.children[pid] = Child(request["id"], output)
+        if output is not None:
+            self.outputs[output] = pid
+            self.selector.register(output, selectors.EVENT_READ, self.read_output)
+
+        self.send({"id": request["id"], "pid": pid})
+
+    def spawn(self, request):
+        output_read = output_write = None
+        actions = [(os.POSIX_SPAWN_OPEN, 0, os.devnull, os.O_RDONLY, 0)]
+
+        if request.get("capture"):
+            output_read, output_write = os.pipe()
+            actions.append((os.POSIX_SPAWN_DUP2, output_write, 1))
+        else:
+            # stdout of the helper is the response pipe, a child must never write into it
+            actions.append((os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0))
+
+        if request.get("capture") or request.get("quiet"):
+            actions.append((os.POSIX_SPAWN_OPEN, 2, os.devnull, os.O_WRONLY, 0))
+
+        try:
+            pid = self.posix_spawn(request, actions)
+        except OSError:
+            if output_read is not None:
+                os.close(output_read)
+            raise
+        finally:
+            if output_write is not None:
+                os.close(output_write)
+
+        return pid, output_read
+
+    @staticmethod
+    def posix_spawn(request, actions):
+        argv = request["argv"]
+        options = {"file_actions": actions, "setsigdef": RESTORED_SIGNALS}
+
+        if not request.get("new_session"):
+            return os.posix_spawnp(argv[0], argv, os.environ, **options)
+
+        try:
+            return os.posix_spawnp(argv[0], argv, os.environ, setsid=True, **options)
+        except NotImplementedError:
+            # No POSIX_SPAWN_SETSID in this libc, a process group of its own still detaches it from our signals
+            return os.posix_spawnp(argv[0], argv, os.environ, setpgroup=0, **options)
+
+    def read_output(self, fd):
+        pid = self.outputs[fd]
+        chunk = os.read(fd, 65536)
+
+        if chunk:
+            self.children[pid].chunks.append(chunk)
+            return
+
+        self.selector.unregister(fd)
+        os.close(fd)
+        del self.outputs[fd]
+        self.children[pid].output = None
+
+        self.finish(pid)
+
+    def reap(self, fd):
+        try:
+            while os.read(fd, 512):
+                pass
+        except BlockingIOError:
+            pass
+
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+
+            if not pid:
+                return
+
+            child = self.children.get(pid)
+            if child:
+                child.returncode = os.waitstatus_to_exitcode(status)
+                self.finish(pid)
+
+    def finish(self, pid):
+        child = self.children[pid]
+
+        # A captured child is done once it has exited and its output reached the end
+        if child.returncode is None or child.output is not None:
+            return
+
+        del self.children[pid]
+        response = {"id": child.request_id, "returncode": child.returncode}
+        if child.chunks:
+            response["stdout"] = b"".join(child.chunks).decode("utf-8", "replace")
+
+        self.send(response)
+
+
+def main():
+    # Interrupting the application in a terminal sends SIGINT to the whole group, the helper waits for the pipe
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    try:
+        Helper().run()
+    except BrokenPipeError:
+        pass
+
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
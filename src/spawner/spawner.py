@@ -0,0 +1,218 @@
+import errno
+import json
+import os
+import subprocess
+import sys
+import threading
+
+HELPER_PATH = os.path.join(os.path.dirname(__file__), "helper.py")
+
+
+class SpawnError(OSError):
+    pass
+
+
+def report_failure(process):
+    if process.error or process.returncode:
+        print(f"DEBUG: {process.command[0]} zakończył działanie z błędem: {process.error or process.returncode}")
+
+
+class SpawnedProcess:
+    def __init__(self, command, on_exit=None):
+        self.command = command
+        self.on_exit = on_exit
+
+        self.request_id = None
+        self.pid = None
+        self.returncode = None
+        self.stdout = None
+        self.error = None
+        self.started = threading.Event()
+        self.exited = threading.Event()
+
+    def wait(self, timeout=None):
+        if not self.exited.wait(timeout):
+            raise subprocess.TimeoutExpired(self.command, timeout)
+
+        if self.error:
+            raise self.error
+
+        return self.returncode
+
+
+class Spawner:
+    def __init__(self, enabled=True):
+        self.enabled = enabled and hasattr(os, "posix_spawnp")
+
+        self.process = None
+        self.reader = None
+        self.pending = {}
+        self.counter = 0
+        self.lock = threading.Lock()
+        self.started = False
+        self.stats = {"spawned": 0, "fallbacks": 0, "errors": 0, "restarts": 0}
+
+    def start(self):
+        if not self.enabled:
+            return False
+
+        # -I -S: no site-packages and no environment tweaks, the helper only needs the standard library
+        try:
+            self.process = subprocess.Popen(
+                [sys.executable, "-I", "-S", HELPER_PATH], stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0
+            )
+        except OSError as e:
+            print(f"DEBUG: Nie udało się uruchomić procesu pomocniczego: {e}")
+            return False
+
+        # Each helper has its own pending requests, a dead one only fails those that were sent to it
+        self.pending = {}
+        self.reader = threading.Thread(
+            target=self._read, args=(self.process, self.pending), name="spawn-helper", daemon=True
+        )
+        self.reader.start()
+        self.started = True
+
+        return True
+
+    def stop(self):
+        if not self.process:
+            return
+
+        # The helper exits when its input ends, programs it launched keep running
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+
+        self.reader.join()
+        self.process = None
+        self.started = False
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def spawn(self, command, capture=False, quiet=False, new_session=False, on_exit=None):
+        handle = SpawnedProcess(list(command), on_exit)
+
+        with self.lock:
+            if not self.is_alive() and not self._restart():
+                self.stats["fallbacks"] += 1
+                return None
+
+            self.counter += 1
+            handle.request_id = self.counter
+            self.pending[handle.request_id] = handle
+
+            message = {"id": handle.request_id, "argv": handle.command}
+            for option, value in (("capture", capture), ("quiet", quiet), ("new_session", new_session)):
+                if value:
+                    message[option] = True
+
+            try:
+                self.process.stdin.write(json.dumps(message).encode("utf-8") + b"\n")
+            except OSError as e:
+                del self.pending[handle.request_id]
+                print(f"DEBUG: Nie udało się wysłać polecenia do procesu pomocniczego: {e}")
+                self.stats["fallbacks"] += 1
+                return None
+
+            self.stats["spawned"] += 1
+
+        return handle
+
+    def run(self, command, check=False, capture_output=False, text=False, quiet=False, timeout=None):
+        handle = self.spawn(command, capture=capture_output, quiet=quiet)
+
+        # Without the helper (Windows, a failed start) the command runs the way it always did
+        if not handle:
+            if capture_output:
+                output = {"capture_output": True, "text": text}
+            else:
+                output = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL} if quiet else {}
+
+            return subprocess.run(command, check=check, timeout=timeout, **output)
+
+        try:
+            returncode = handle.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.kill(handle)
+            raise
+
+        stdout = None
+        if capture_output:
+            stdout = handle.stdout or ""
+            stdout = stdout if text else stdout.encode("utf-8")
+
+        if check and returncode:
+            raise subprocess.CalledProcessError(returncode, command, stdout)
+
+        return subprocess.CompletedProcess(command, returncode, stdout)
+
+    def kill(self, handle):
+        with self.lock:
+            if not self.is_alive():
+                return
+
+            try:
+                self.process.stdin.write(json.dumps({"op": "kill", "id": handle.request_id}).encode("utf-8") + b"\n")
+            except OSError as e:
+                print(f"DEBUG: Nie udało się zatrzymać {handle.command[0]}: {e}")
+
+    def _restart(self):
+        # Only a helper that was started at boot is brought back, starting one now would fork this large process
+        if not self.started:
+            return False
+
+        if self.process:
+            self.process.wait()
+
+        self.stats["restarts"] += 1
+        print("DEBUG: Restart procesu pomocniczego")
+        return self.start()
+
+    def _read(self, process, pending):
+        for line in process.stdout:
+            message = json.loads(line)
+
+            with self.lock:
+                handle = pending.get(message["id"]) if "pid" in message else pending.pop(message["id"], None)
+
+            if not handle:
+                continue
+
+            if "pid" in message:
+                handle.pid = message["pid"]
+                handle.started.set()
+                continue
+
+            if "errno" in message:
+                self.stats["errors"] += 1
+                handle.error = OSError(message["errno"], message["error"], handle.command[0])
+            else:
+                handle.returncode = message["returncode"]
+                handle.stdout = message.get("stdout")
+
+            self.finish(handle)
+
+        # The helper is gone, nobody will report the programs it was waiting for
+        with self.lock:
+            handles = list(pending.values())
+            pending.clear()
+
+        for handle in handles:
+            handle.error = SpawnError(errno.ECHILD, "Proces pomocniczy zakończył działanie", handle.command[0])
+            self.finish(handle)
+
+    @staticmethod
+    def finish(handle):
+        handle.started.set()
+        handle.exited.set()
+
+        if handle.on_exit:
+            try:
+                handle.on_exit(handle)
+            except Exception as e:
+                print(f"DEBUG: Błąd w obsłudze zakończenia {handle.command[0]}: {e}")
@@ -0,0 +1,91 @@
+import threading
+import time
+
+PLAYING = "playing"
+PAUSED = "paused"
+
+
+class StateModel:
+    def __init__(self, provider, max_age=5.0):
+        self.provider = provider
+        self.max_age = max_age
+
+        self.values = {}
+        self.lock = threading.Lock()
+        self.key_locks = {}
+
+        self.stats = {"reads": 0, "writes": 0, "hits": 0, "failures": 0}
+
+    def key_lock(self, key):
+        # One lock per key, so a slow player query does not hold up the volume keys
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.RLock())
+
+    def get(self, key):
+        with self.key_lock(key):
+            entry = self.values.get(key)
+
+            # Other apps can change the state too, so the cached value is only trusted for a while
+            if entry and time.monotonic() - entry[1] < self.max_age:
+                self.stats["hits"] += 1
+                return entry[0]
+
+            self.stats["reads"] += 1
+            value = self.provider.read(key)
+
+            if value is None:
+                self.values.pop(key, None)
+            else:
+                self.values[key] = (value, time.monotonic())
+
+            return value
+
+    def set(self, key, value):
+        with self.key_lock(key):
+            self.stats["writes"] += 1
+
+            if not self.provider.write(key, value):
+                # The real state is unknown after a failed write, the next action reads it again
+                self.stats["failures"] += 1
+                self.values.pop(key, None)
+                return False
+
+            self.values[key] = (value, time.monotonic())
+            return True
+
+    def toggle(self, key):
+        with self.key_lock(key):
+            value = self.get(key)
+
+            if value is None:
+                return False
+
+            return self.set(key, not value)
+
+    def adjust(self, key, delta, low=0, high=100):
+        with self.key_lock(key):
+            value = self.get(key)
+
+            if value is None:
+                return False
+
+            # A level already outside the range (e.g. boosted above 100%) is never pulled back by a step the other way
+            target = max(min(low, value), min(max(high, value), value + delta))
+
+            if target == value:
+                return True
+
+            return self.set(key, target)
+
+    def toggle_player(self, key):
+        with self.key_lock(key):
+            return self.set(key, PAUSED if self.get(key) == PLAYING else PLAYING)
+
+    def invalidate(self, key=None):
+        if key is None:
+            self.values.clear()
+        else:
+            self.values.pop(key, None)
+
+    def snapshot(self):
+        return {key: value for key, (value, _) in list(self.values.items())}
@@ -0,0 +1,304 @@
+import collections
+import errno
+import glob
+import os
+import selectors
+import struct
+import time
+
+from src.device.device import Device
+
+# struct input_event: struct timeval, __u16 type, __u16 code, __s32 value
+INPUT_EVENT = struct.Struct("llHHi")
+LONG_BITS = struct.calcsize("l") * 8
+
+EV_KEY = 0x01
+KEY_UP, KEY_DOWN, KEY_HOLD = 0, 1, 2
+
+BUS_TYPES = {0x03: "USB", 0x05: "Bluetooth", 0x11: "Builtin", 0x18: "Builtin", 0x19: "Builtin"}
+NON_KEYBOARD_KEYS = {116, 142, 143}  # power, sleep, wakeup
+
+KEY_NAMES = {
+    1: "esc",
+    14: "backspace",
+    15: "tab",
+    28: "enter",
+    29: "ctrl",
+    42: "shift",
+    54: "right shift",
+    56: "alt",
+    57: "space",
+    58: "caps lock",
+    97: "right ctrl",
+    100: "alt gr",
+    102: "home",
+    103: "up",
+    104: "page up",
+    105: "left",
+    106: "right",
+    107: "end",
+    108: "down",
+    109: "page down",
+    110: "insert",
+    111: "delete",
+    113: "volume mute",
+    114: "volume down",
+    115: "volume up",
+    119: "pause",
+    125: "windows",
+    126: "right windows",
+    127: "menu",
+    163: "next track",
+    164: "play/pause",
+    165: "previous track",
+    12: "-",
+    13: "=",
+    26: "[",
+    27: "]",
+    39: ";",
+    40: "'",
+    41: "`",
+    43: "\\",
+    51: ",",
+    52: ".",
+    53: "/",
+    55: "*",
+    78: "+",
+    69: "num lock",
+    70: "scroll lock",
+    99: "print screen",
+}
+KEY_NAMES.update({2 + index: str((index + 1) % 10) for index in range(10)})
+for first_code, letters in ((16, "qwertyuiop"), (30, "asdfghjkl"), (44, "zxcvbnm")):
+    KEY_NAMES.update({first_code + index: letter for index, letter in enumerate(letters)})
+KEY_NAMES.update({59 + index: f"f{index + 1}" for index in range(10)})
+KEY_NAMES.update({87: "f11", 88: "f12"})
+KEY_NAMES.update({183 + index: f"f{index + 13}" for index in range(12)})
+
+KeyEvent = collections.namedtuple("KeyEvent", ["name", "scan_code", "event_type", "device", "time"])
+InputDevice = collections.namedtuple("InputDevice", ["device", "path", "handlers"])
+
+
+def key_name(code):
+    return KEY_NAMES.get(code, f"key {code}")
+
+
+def parse_key_bitmap(value):
+    codes = set()
+
+    for index, word in enumerate(reversed(value.split())):
+        bits = int(word, 16)
+        offset = index * LONG_BITS
+
+        while bits:
+            bit = bits & -bits
+            codes.add(offset + bit.bit_length() - 1)
+            bits ^= bit
+
+    return codes
+
+
+def is_keyboard(handlers, key_codes):
+    return "kbd" in handlers and any(0 < code < 256 and code not in NON_KEYBOARD_KEYS for code in key_codes)
+
+
+# /proc/bus/input/devices
+def parse_input_devices(text, input_root="/dev/input"):
+    devices = []
+
+    for block in text.split("\n\n"):
+        fields = {}
+        bitmaps = {}
+
+        for line in block.splitlines():
+            kind, _, value = line.partition(": ")
+
+            if kind == "I":
+                fields.update(item.split("=", 1) for item in value.split())
+            elif kind == "N":
+                fields["Name"] = value.partition("=")[2].strip('"')
+            elif kind == "H":
+                fields["Handlers"] = value.partition("=")[2].split()
+            elif kind == "B":
+                name, _, bitmap = value.partition("=")
+                bitmaps[name] = bitmap
+
+        handlers = fields.get("Handlers", [])
+        event_nodes = [handler for handler in handlers if handler.startswith("event")]
+
+        if not event_nodes or not is_keyboard(handlers, parse_key_bitmap(bitmaps.get("KEY", "0"))):
+            continue
+
+        device = Device(
+            name=fields["Name"],
+            device_id=int(fields.get("Product", "0"), 16),
+            device_type=BUS_TYPES.get(int(fields.get("Bus", "0"), 16), "Other"),
+        )
+        devices.append(InputDevice(device=device, path=os.path.join(input_root, event_nodes[0]), handlers=handlers))
+
+    return devices
+
+
+# /sys/class/input, used when /proc is not mounted
+def read_sysfs_input_devices(sysfs_root="/sys/class/input", input_root="/dev/input"):
+    devices = []
+
+    for event_path in sorted(glob.glob(os.path.join(sysfs_root, "event*"))):
+        device_path = os.path.join(event_path, "device")
+
+        try:
+            name = read_text(os.path.join(device_path, "name"))
+            bus = int(read_text(os.path.join(device_path, "id", "bustype")), 16)
+            product = int(read_text(os.path.join(device_path, "id", "product")), 16)
+            key_codes = parse_key_bitmap(read_text(os.path.join(device_path, "capabilities", "key")))
+        except (OSError, ValueError):
+            continue
+
+        if not is_keyboard(["kbd"], key_codes):
+            continue
+
+        device = Device(name=name, device_id=product, device_type=BUS_TYPES.get(bus, "Other"))
+        node = os.path.basename(event_path)
+        devices.append(InputDevice(device=device, path=os.path.join(input_root, node), handlers=["kbd", node]))
+
+    return devices
+
+
+def read_text(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def list_input_devices(proc_path="/proc/bus/input/devices"):
+    try:
+        return parse_input_devices(read_text(proc_path))
+    except OSError:
+        return read_sysfs_input_devices()
+
+
+class EvdevReader:
+    def __init__(self, on_event, list_devices=None, rescan_interval=None):
+        self.on_event = on_event
+        self.list_devices = list_devices
+        self.rescan_interval = rescan_interval
+
+        self.selector = selectors.DefaultSelector()
+        self.buffers = {}
+        self.paths = {}
+        self.unavailable = set()
+        self.wakeup_read, self.wakeup_write = os.pipe()
+        self.selector.register(self.wakeup_read, selectors.EVENT_READ, None)
+        self.stopped = False
+        self.closed = False
+
+    def add(self, fd, device):
+        os.set_blocking(fd, False)
+        self.selector.register(fd, selectors.EVENT_READ, device)
+        self.buffers[fd] = b""
+
+    def open(self, input_device):
+        try:
+            fd = os.open(input_device.path, os.O_RDONLY | os.O_NONBLOCK | os.O_CLOEXEC)
+        except OSError as e:
+            # Rescans retry the node, the reason is only logged once
+            if input_device.path not in self.unavailable:
+                print(f"DEBUG: Nie można otworzyć {input_device.path}: {e}")
+                self.unavailable.add(input_device.path)
+            return None
+
+        self.add(fd, input_device.device)
+        self.paths[input_device.path] = fd
+        self.unavailable.discard(input_device.path)
+        return fd
+
+    def remove(self, fd):
+        self.selector.unregister(fd)
+        self.buffers.pop(fd, None)
+        self.paths = {path: opened for path, opened in self.paths.items() if opened != fd}
+        os.close(fd)
+
+    def rescan(self):
+        # Keyboards plugged in after the start show up here, unplugged ones were already dropped on ENODEV
+        for input_device in self.list_devices():
+            if input_device.path not in self.paths:
+                self.open(input_device)
+
+    def stop(self):
+        self.stopped = True
+
+        try:
+            if not self.closed:
+                os.write(self.wakeup_write, b"\0")
+        except OSError:
+            pass
+
+    def close(self):
+        for fd in list(self.buffers):
+            self.remove(fd)
+
+        self.selector.close()
+        os.close(self.wakeup_read)
+        os.close(self.wakeup_write)
+        self.closed = True
+
+    def run(self):
+        # The caller opens the devices it knows about, the first rescan is one interval later
+        next_rescan = time.monotonic() + (self.rescan_interval or 0)
+
+        try:
+            while not self.stopped:
+                timeout = None
+
+                if self.list_devices and self.rescan_interval:
+                    if time.monotonic() >= next_rescan:
+                        self.rescan()
+                        next_rescan = time.monotonic() + self.rescan_interval
+
+                    timeout = max(0.0, next_rescan - time.monotonic())
+
+                for key, _ in self.selector.select(timeout):
+                    if key.fd == self.wakeup_read:
+                        os.read(self.wakeup_read, 64)
+                        continue
+
+                    self.read(key.fd, key.data)
+        finally:
+            # The supervisor starts a new reader on restart, this one must not keep the devices open
+            self.close()
+
+    def read(self, fd, device):
+        try:
+            data = self.buffers[fd] + os.read(fd, INPUT_EVENT.size * 64)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            if e.errno == errno.ENODEV:
+                self.remove(fd)
+                return
+            raise
+
+        if len(data) == len(self.buffers[fd]):
+            # End of stream (a closed pipe when replaying a recording)
+            self.remove(fd)
+            return
+
+        usable = len(data) - len(data) % INPUT_EVENT.size
+        self.buffers[fd] = data[usable:]
+
+        for seconds, microseconds, event_type, code, value in INPUT_EVENT.iter_unpack(data[:usable]):
+            if event_type != EV_KEY:
+                continue
+
+            self.on_event(
+                KeyEvent(
+                    name=key_name(code),
+                    scan_code=code,
+                    event_type="up" if value == KEY_UP else "down",
+                    device=device.name,
+                    time=seconds + microseconds / 1e6,
+                )
+            )
+
+
+def pack_key_event(code, value, seconds=0, microseconds=0):
+    return INPUT_EVENT.pack(seconds, microseconds, EV_KEY, code, value)
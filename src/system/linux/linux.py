@@ -0,0 +1,246 @@
+import functools
+import os
+import shutil
+import subprocess
+
+from src.spawner.spawner import SpawnError, report_failure
+from src.state.state_model import StateModel
+from src.system.linux.evdev import EvdevReader, list_input_devices
+from src.system.linux.state import PulseStateProvider
+from src.system.linux.x11 import active_window_class
+from src.system.system.system import System
+
+
+def handle_subprocess_error(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except (subprocess.CalledProcessError, FileNotFoundError, SpawnError) as e:
+            print(f"DEBUG: Błąd w funkcji {func.__name__}: {e}")
+
+    return wrapper
+
+
+class Linux(System):
+    def __init__(self, application):
+        super().__init__(name="Linux")
+
+        self.application = application
+        self.reader = None
+        self.last_device = None
+
+        # Volume, mute and player state, so toggles and relative changes are a single write
+        self.state = StateModel(provider=PulseStateProvider(system=self), max_age=application.settings["STATE_MAX_AGE"])
+
+        self.functions = [
+            # Audio
+            {
+                "id": "audio.volume_up",
+                "name": "Volume +",
+                "category": "audio",
+                "function": self.volume_up,
+                "group": "audio",
+                "coalesce": 0.15,
+            },
+            {
+                "id": "audio.volume_down",
+                "name": "Volume -",
+                "category": "audio",
+                "function": self.volume_down,
+                "group": "audio",
+                "coalesce": 0.15,
+            },
+            {
+                "id": "audio.mute",
+                "name": "Mute/Unmute",
+                "category": "audio",
+                "function": self.mute_unmute,
+                "group": "audio",
+            },
+            # Media player
+            {
+                "id": "player.toggle",
+                "name": "Toggle player",
+                "category": "player",
+                "function": self.toggle_player,
+                "group": "player",
+            },
+            {
+                "id": "player.next_track",
+                "name": "Next track",
+                "category": "player",
+                "function": self.next_track,
+                "group": "player",
+                "coalesce": 0.3,
+            },
+            {
+                "id": "player.previous_track",
+                "name": "Previous track",
+                "category": "player",
+                "function": self.previous_track,
+                "group": "player",
+                "coalesce": 0.3,
+            },
+            {"id": "spotify.open", "name": "Open Spotify", "category": "spotify", "function": self.open_spotify},
+            # Brightness
+            {
+                "id": "brightness.up",
+                "name": "Brightness +",
+                "category": "brightness",
+                "function": self.increase_brightness,
+                "group": "brightness",
+                "coalesce": 0.15,
+            },
+            {
+                "id": "brightness.down",
+                "name": "Brightness -",
+                "category": "brightness",
+                "function": self.decrease_brightness,
+                "group": "brightness",
+                "coalesce": 0.15,
+            },
+            # Utils
+            {
+                "id": "utils.open_calculator",
+                "name": "Open calculator",
+                "category": "utils",
+                "function": self.open_calculator,
+            },
+            {"id": "utils.open_terminal", "name": "Open terminal", "category": "utils", "function": self.open_terminal},
+            {"id": "utils.open_browser", "name": "Open browser", "category": "utils", "function": self.open_browser},
+            {
+                "id": "utils.open_file_manager",
+                "name": "Open file manager",
+                "category": "utils",
+                "function": self.open_file_manager,
+            },
+        ]
+
+    def get_active_input_device(self):
+        # Every evdev event already names its device, this only serves callers without an event at hand
+        return self.last_device
+
+    def get_foreground_app(self):
+        # Polled twice a second while profiles exist, xprop is started by the spawn helper
+        return active_window_class(run=self.application.spawner.run)
+
+    def recognize_devices(self):
+        return [input_device.device for input_device in list_input_devices()]
+
+    def device_probes(self):
+        return {"input": self.recognize_devices}
+
+    def device_listener(self, handler):
+        self.reader = EvdevReader(
+            on_event=lambda event: self.on_event(event, handler),
+            list_devices=list_input_devices,
+            rescan_interval=self.application.settings["DEVICE_REFRESH_INTERVAL"],
+        )
+
+        opened = [self.reader.open(input_device) for input_device in list_input_devices()]
+        if not any(fd is not None for fd in opened):
+            print("DEBUG: Brak dostępnych urządzeń /dev/input (czy użytkownik należy do grupy input?)")
+
+        self.reader.run()
+
+    def stop_device_listener(self):
+        if self.reader:
+            self.reader.stop()
+
+    def on_event(self, event, handler):
+        # Releases are passed on too, chords need to know which modifiers are still held
+        if event.event_type == "down":
+            self.last_device = event.device
+
+        handler(event)
+
+    @handle_subprocess_error
+    def run(self, *command):
+        self.application.spawner.run(command, check=True, quiet=True)
+        return True
+
+    def output(self, *command):
+        try:
+            return self.application.spawner.run(command, check=True, capture_output=True, text=True).stdout
+        except (subprocess.CalledProcessError, FileNotFoundError, SpawnError):
+            return None
+
+    @handle_subprocess_error
+    def open_app(self, *candidates):
+        for command in candidates:
+            if not shutil.which(command[0]):
+                continue
+
+            # The app outlives the launch, its exit is only logged when it failed
+            if not self.application.spawner.spawn(command, new_session=True, on_exit=report_failure):
+                subprocess.Popen(command, start_new_session=True)
+            return
+
+        print(f"DEBUG: Nie znaleziono żadnej z aplikacji: {[command[0] for command in candidates]}")
+
+    # Audio
+    def volume_up(self, steps=1):
+        if self.state.adjust("volume", 5 * steps):
+            return
+
+        # Unknown state (no sink, pactl missing) or a failed write, fall back to the relative change
+        self.run("pactl", "set-sink-volume", "@DEFAULT_SINK@", f"+{5 * steps}%")
+
+    def volume_down(self, steps=1):
+        if self.state.adjust("volume", -5 * steps):
+            return
+
+        self.run("pactl", "set-sink-volume", "@DEFAULT_SINK@", f"-{5 * steps}%")
+
+    def mute_unmute(self):
+        if self.state.toggle("muted"):
+            return
+
+        self.run("pactl", "set-sink-mute", "@DEFAULT_SINK@", "toggle")
+
+    # Media player
+    def toggle_player(self):
+        if self.state.toggle_player("player"):
+            return
+
+        self.run("playerctl", "play-pause")
+
+    def next_track(self, steps=1):
+        for _ in range(steps):
+            self.run("playerctl", "next")
+
+    def previous_track(self, steps=1):
+        for _ in range(steps):
+            self.run("playerctl", "previous")
+
+    # Brightness
+    def increase_brightness(self, steps=1):
+        self.run("brightnessctl", "set", f"+{5 * steps}%")
+
+    def decrease_brightness(self, steps=1):
+        self.run("brightnessctl", "set", f"{5 * steps}%-")
+
+    # Utils
+    def open_calculator(self):
+        self.open_app(["gnome-calculator"], ["kcalc"], ["galculator"])
+
+    def open_terminal(self):
+        self.open_app(["x-terminal-emulator"], ["gnome-terminal"], ["konsole"], ["xterm"])
+
+    def open_browser(self):
+        candidates = [["x-www-browser"], ["sensible-browser"]]
+
+        # Outside Debian the default browser is only known as a desktop file, which gtk-launch starts
+        if not any(shutil.which(command[0]) for command in candidates):
+            desktop_file = (self.output("xdg-settings", "get", "default-web-browser") or "").strip()
+            if desktop_file:
+                candidates.append(["gtk-launch", desktop_file])
+
+        self.open_app(*candidates, ["google-chrome"], ["firefox"])
+
+    def open_file_manager(self):
+        self.open_app(["xdg-open", os.path.expanduser("~")])
+
+    def open_spotify(self):
+        self.open_app(["spotify"])
@@ -0,0 +1,38 @@
+import re
+
+from src.state.state_model import PAUSED, PLAYING
+
+VOLUME_PATTERN = re.compile(r"(\d+)%")
+
+
+class PulseStateProvider:
+    def __init__(self, system):
+        self.system = system
+
+    def read(self, key):
+        if key == "volume":
+            match = VOLUME_PATTERN.search(self.system.output("pactl", "get-sink-volume", "@DEFAULT_SINK@") or "")
+            return int(match.group(1)) if match else None
+
+        if key == "muted":
+            output = self.system.output("pactl", "get-sink-mute", "@DEFAULT_SINK@")
+            return None if output is None else "yes" in output
+
+        if key == "player":
+            output = self.system.output("playerctl", "status")
+            # playerctl prints nothing and fails when no player is running
+            return None if not output else PLAYING if output.strip() == "Playing" else PAUSED
+
+        return None
+
+    def write(self, key, value):
+        if key == "volume":
+            return self.system.run("pactl", "set-sink-volume", "@DEFAULT_SINK@", f"{value}%")
+
+        if key == "muted":
+            return self.system.run("pactl", "set-sink-mute", "@DEFAULT_SINK@", "1" if value else "0")
+
+        if key == "player":
+            return self.system.run("playerctl", "play" if value == PLAYING else "pause")
+
+        return False
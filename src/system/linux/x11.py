@@ -0,0 +1,39 @@
+import os
+import re
+import subprocess
+
+from src.spawner.spawner import SpawnError
+
+WINDOW_ID = re.compile(r"window id # (0x[0-9a-fA-F]+)")
+QUOTED = re.compile(r'"([^"]*)"')
+
+
+def parse_active_window(output):
+    match = WINDOW_ID.search(output or "")
+
+    # 0x0 while the desktop itself has the focus
+    return match.group(1) if match and int(match.group(1), 16) else None
+
+
+def parse_wm_class(output):
+    # WM_CLASS(STRING) = "instance", "Class", the class is the application's name
+    names = QUOTED.findall(output or "")
+
+    return names[-1] if names else None
+
+
+def xprop(run, *arguments):
+    try:
+        return run(["xprop", *arguments], check=True, capture_output=True, text=True, timeout=1.0).stdout
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError, SpawnError):
+        return None
+
+
+def active_window_class(run=subprocess.run):
+    # Wayland compositors do not expose the focused window, the app has to be pushed through the control socket
+    if not os.environ.get("DISPLAY"):
+        return None
+
+    window = parse_active_window(xprop(run, "-root", "_NET_ACTIVE_WINDOW"))
+
+    return parse_wm_class(xprop(run, "-id", window, "WM_CLASS")) if window else None
@@ -1,19 +1,75 @@
 import functools
-import re
+import hashlib
+import io
+import json
+import os
 import subprocess
+import xml.etree.ElementTree as ElementTree
 
 import keyboard
 
-from src.device.device import Device
+from src.spawner.spawner import SpawnError, report_failure
+from src.state.state_model import StateModel
+from src.system.macOS.parsers import (
+    parse_active_input_device,
+    parse_bluetooth_devices,
+    parse_builtin_keyboard,
+    parse_usb_devices,
+)
+from src.system.macOS.script_host import (
+    ProcessTransport,
+    ScriptError,
+    ScriptHost,
+    ScriptHostError,
+    run_handler,
+)
+from src.system.macOS.state import AppleScriptStateProvider
 from src.system.system.system import System
 
+SCRIPT_HOST_PATH = os.path.join(os.path.dirname(__file__), "script_host.js")
+PROBE_TIMEOUT = 15.0
+
+
+def run_command(command, timeout=PROBE_TIMEOUT, run=subprocess.run):
+    try:
+        return run(["/bin/sh", "-c", command], capture_output=True, text=True, timeout=timeout).stdout
+    except subprocess.TimeoutExpired:
+        print(f"DEBUG: Przekroczono czas wykonania: {command}")
+        return ""
+
+
+def load_json(output):
+    try:
+        return json.loads(output)
+    except json.JSONDecodeError as e:
+        print(f"DEBUG: Niepoprawny wynik JSON: {e}")
+        return {}
+
+
+def command_fingerprint(command, line_filter, run=subprocess.run):
+    lines = sorted(line_filter(line.strip()) for line in run_command(command, timeout=3.0, run=run).split("\n"))
+
+    return hashlib.sha1("\n".join(line for line in lines if line).encode("utf-8")).hexdigest()
+
+
+def repeat_script(application, command):
+    return run_handler(
+        f"""
+            tell application "{application}"
+                repeat (item 1 of argv as integer) times
+                    {command}
+                end repeat
+            end tell
+            """
+    )
+
 
 def handle_subprocess_error(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, SpawnError) as e:
             print(f"DEBUG: Błąd w funkcji {func.__name__}: {e}")
 
     return wrapper
@@ -24,224 +80,281 @@ class MacOS(System):
         super().__init__(name="MacOS")
 
         self.application = application
+        self.hooked = None
 
         self.functions = [
             # Audio
-            {"name": "Volume +", "function": self.volume_up},
-            {"name": "Volume -", "function": self.volume_down},
-            {"name": "Mute/Unmute", "function": self.mute_unmute},
+            {
+                "id": "audio.volume_up",
+                "name": "Volume +",
+                "category": "audio",
+                "function": self.volume_up,
+                "group": "audio",
+                "coalesce": 0.15,
+            },
+            {
+                "id": "audio.volume_down",
+                "name": "Volume -",
+                "category": "audio",
+                "function": self.volume_down,
+                "group": "audio",
+                "coalesce": 0.15,
+            },
+            {
+                "id": "audio.mute",
+                "name": "Mute/Unmute",
+                "category": "audio",
+                "function": self.mute_unmute,
+                "group": "audio",
+            },
             # Apple Music
-            {"name": "Toggle Apple music", "function": self.toggle_apple_music},
-            {"name": "Next track Apple music", "function": self.next_track_apple_music},
-            {"name": "Previous track Apple music", "function": self.previous_track_apple_music},
+            {
+                "id": "apple_music.toggle",
+                "name": "Toggle Apple music",
+                "category": "apple_music",
+                "function": self.toggle_apple_music,
+                "group": "music",
+            },
+            {
+                "id": "apple_music.next_track",
+                "name": "Next track Apple music",
+                "category": "apple_music",
+                "function": self.next_track_apple_music,
+                "group": "music",
+                "coalesce": 0.3,
+            },
+            {
+                "id": "apple_music.previous_track",
+                "name": "Previous track Apple music",
+                "category": "apple_music",
+                "function": self.previous_track_apple_music,
+                "group": "music",
+                "coalesce": 0.3,
+            },
             # Spotify
-            {"name": "Toggle Spotify", "function": self.toggle_spotify},
-            {"name": "Next track spotify", "function": self.next_track_spotify},
-            {"name": "Previous track spotify", "function": self.previous_track_spotify},
-            {"name": "Open Spotify", "function": self.open_spotify},
+            {
+                "id": "spotify.toggle",
+                "name": "Toggle Spotify",
+                "category": "spotify",
+                "function": self.toggle_spotify,
+                "group": "spotify",
+            },
+            {
+                "id": "spotify.next_track",
+                "name": "Next track spotify",
+                "category": "spotify",
+                "function": self.next_track_spotify,
+                "group": "spotify",
+                "coalesce": 0.3,
+            },
+            {
+                "id": "spotify.previous_track",
+                "name": "Previous track spotify",
+                "category": "spotify",
+                "function": self.previous_track_spotify,
+                "group": "spotify",
+                "coalesce": 0.3,
+            },
+            {"id": "spotify.open", "name": "Open Spotify", "category": "spotify", "function": self.open_spotify},
             # Brightness
-            {"name": "Brightness +", "function": self.increase_brightness},
-            {"name": "Brightness -", "function": self.decrease_brightness},
+            {
+                "id": "brightness.up",
+                "name": "Brightness +",
+                "category": "brightness",
+                "function": self.increase_brightness,
+                "group": "brightness",
+                "coalesce": 0.15,
+            },
+            {
+                "id": "brightness.down",
+                "name": "Brightness -",
+                "category": "brightness",
+                "function": self.decrease_brightness,
+                "group": "brightness",
+                "coalesce": 0.15,
+            },
             # Utils
-            {"name": "Toggle bar", "function": self.toggle_bar},
-            {"name": "Open calculator", "function": self.open_calculator},
-            {"name": "Open terminal", "function": self.open_terminal},
-            {"name": "Open google chrome", "function": self.open_google_chrome},
-            {"name": "Open finder", "function": self.open_finder},
+            {"id": "utils.toggle_bar", "name": "Toggle bar", "category": "utils", "function": self.toggle_bar},
+            {
+                "id": "utils.open_calculator",
+                "name": "Open calculator",
+                "category": "utils",
+                "function": self.open_calculator,
+            },
+            {"id": "utils.open_terminal", "name": "Open terminal", "category": "utils", "function": self.open_terminal},
+            {
+                "id": "utils.open_browser",
+                "name": "Open google chrome",
+                "category": "utils",
+                "function": self.open_google_chrome,
+            },
+            {"id": "utils.open_file_manager", "name": "Open finder", "category": "utils", "function": self.open_finder},
         ]
 
-    def get_active_input_device(self):
-        result = subprocess.getoutput("ioreg -r -c IOHIDDevice")
-
-        devices = []
-        current_device = None
-
-        for line in result.split("\n"):
-            line = line.strip()
-
-            if '"Product"' in line:
-                match = re.search(r'"Product" = "(.*?)"', line)
-                if match:
-                    current_device = match.group(1)
+        # Scripts
+        self.script_host = ScriptHost(
+            transport=ProcessTransport(command=["osascript", "-l", "JavaScript", SCRIPT_HOST_PATH])
+        )
 
-            if current_device and (
-                "Keyboard" in current_device or "Trackpad" in current_device or "Mouse" in current_device
-            ):
-                devices.append(current_device)
+        # Volume, mute and player state, so toggles and relative changes are a single write
+        self.state = StateModel(
+            provider=AppleScriptStateProvider(system=self), max_age=self.application.settings["STATE_MAX_AGE"]
+        )
 
-        if devices:
-            return devices[0]
+    def get_active_input_device(self):
+        return self.parse_command_output(
+            ["ioreg", "-a", "-r", "-c", "IOHIDDevice", "-d", "1"], parse_active_input_device
+        )
 
-        return None
+    def get_foreground_app(self):
+        return self.query_osascript(
+            'tell application "System Events" to get name of first application process whose frontmost is true',
+            name="foreground_app",
+        )
 
     def recognize_devices(self):
-        devices = [self.get_builtin_keyboard()]
-
-        usb_devices = self.get_usb_devices()
-        bluetooth_devices = self.get_bluetooth_devices()
-
-        devices.extend(usb_devices)
-        devices.extend(bluetooth_devices)
-
-        return devices
-
-    def get_usb_devices(self):
-        result = subprocess.getoutput("system_profiler SPUSBDataType")
         devices = []
 
-        current_device = None
-
-        for line in result.split("\n"):
-            line = line.strip()
-
-            if line.startswith("Product Name:"):
-                device_name = line.split(":")[1].strip()
-                current_device = Device(name=device_name, device_type="USB")
-
-            elif line.startswith("Product ID:") and current_device:
-                match = re.search(r"Product ID: 0x(\w+)", line)
-                if match:
-                    current_device.device_id = int(match.group(1), 16)
-
-            if current_device and current_device.name:
-                devices.append(current_device)
-                current_device = None
+        for probe in self.device_probes().values():
+            devices.extend(device for device in probe() if device)
 
         return devices
 
-    def get_bluetooth_devices(self):
-        result = subprocess.getoutput("system_profiler SPBluetoothDataType")
-
-        devices = []
-        inside_connected_section = False
-        current_device_name = None
-        current_device_data = {}
-
-        for line in result.split("\n"):
-            line = line.strip()
-
-            if line.startswith("Connected:"):
-                inside_connected_section = True
-                continue
-
-            if line.startswith("Not Connected:"):
-                break
-
-            if inside_connected_section:
-                device_match = re.match(r"^([A-Za-z0-9 ()-_]+):$", line)
-                if device_match:
-                    if current_device_name:
-                        devices.append({"name": current_device_name, "data": current_device_data})
-
-                    current_device_name = device_match.group(1)
-                    current_device_data = {}
+    def device_probes(self):
+        return {
+            "builtin": lambda: [self.get_builtin_keyboard()],
+            "usb": self.get_usb_devices,
+            "bluetooth": self.get_bluetooth_devices,
+        }
+
+    def device_fingerprints(self):
+        # Cheap ioreg listings, stripped of counters that change on every call. They run on every refresh,
+        # so they are started by the spawn helper instead of forking the process that has Qt loaded
+        run = self.application.spawner.run
+
+        return {
+            "usb": lambda: command_fingerprint("ioreg -p IOUSB -w0", lambda line: line.split("<")[0], run),
+            "bluetooth": lambda: command_fingerprint(
+                "ioreg -r -c IOHIDDevice -d 1 -w0",
+                lambda line: line if line.startswith(('"Product" =', '"Transport" =')) else "",
+                run,
+            ),
+        }
 
-                else:
-                    data_match = re.match(r"^(.+?):\s(.+)$", line)
-                    if data_match:
-                        key = data_match.group(1).strip()
-                        value = data_match.group(2).strip()
-
-                        key = key.lower().replace(" ", "_")
-
-                        if key == "minor_type":
-                            key = "minor_type"
+    def get_usb_devices(self):
+        data = load_json(run_command("system_profiler -json SPUSBDataType", run=self.application.spawner.run))
 
-                        current_device_data[key] = value
+        return parse_usb_devices(data)
 
-        if current_device_name:
-            devices.append({"name": current_device_name, "data": current_device_data})
+    def get_bluetooth_devices(self):
+        data = load_json(run_command("system_profiler -json SPBluetoothDataType", run=self.application.spawner.run))
 
-        final_devices = []
-        for device in devices:
-            new_device = Device(
-                name=device["name"], device_type="Bluetooth", device_id=device["data"].get("product_id")
-            )
-            final_devices.append(new_device)
-        return final_devices
+        return parse_bluetooth_devices(data)
 
     def get_builtin_keyboard(self):
-        result = subprocess.getoutput("ioreg -r -c AppleEmbeddedKeyboard -d 1 | grep -i 'Product'")
-
-        if result:
-            device_name = None
-            device_id = None
-            device_type = "Builtin"
-
-            for line in result.split("\n"):
-                line = line.strip()
-
-                if '"Product"' in line:
-                    match = re.search(r'"Product" = "(.*?)"', line)
-                    if match:
-                        device_name = match.group(1)
-
-                if '"ProductID"' in line:
-                    match = re.search(r'"ProductID" = (\d+)', line)
-                    if match:
-                        device_id = int(match.group(1))
-
-            builtin_device = Device(name=device_name, device_id=device_id, device_type=device_type)
-
-            return builtin_device
-        return None
+        return self.parse_command_output(
+            ["ioreg", "-a", "-r", "-c", "AppleEmbeddedKeyboard", "-d", "1"], parse_builtin_keyboard
+        )
 
-    def device_listener(self):
+    def parse_command_output(self, command, parser):
+        # The active device is polled every refresh, so ioreg is started by the spawn helper like the fingerprints
         try:
-            keyboard.on_press(self.application.on_key_press)
-            keyboard.wait()
-        except Exception as e:
-            print(f"DEBUG: Błąd podczas nasłuchiwania klawiszy: {e}")
-
-    def listen_for_key(self, macro, key_button):
-        key_button.setText("Naciśnij klawisz...")
-        key_button.setEnabled(False)
-
-        def on_key_press(event):
-            new_key = event.name
-            keyboard.unhook_all()
-
-            for existing_macro in self.application.macros:
-                if existing_macro["key"] == new_key:
-                    key_button.setText(macro["key"])
-                    key_button.setEnabled(True)
-                    return
-
-            old_key = macro["key"]
-            macro["key"] = new_key
-            key_button.setText(new_key)
-            key_button.setEnabled(True)
+            output = self.application.spawner.run(command, capture_output=True, timeout=PROBE_TIMEOUT).stdout
+        except (subprocess.TimeoutExpired, OSError) as e:
+            print(f"DEBUG: Nie udało się uruchomić {command[0]}: {e}")
+            return None
 
-            self.application.update_macro_key(old_key, new_key)
-
-        keyboard.hook(on_key_press)
-        return
+        try:
+            return parser(io.BytesIO(output))
+        except ElementTree.ParseError as e:
+            print(f"DEBUG: Nie udało się odczytać wyniku {command[0]}: {e}")
+            return None
+
+    def device_listener(self, handler):
+        # The hook stays installed for the process lifetime, a restarted listener only replaces it for a new handler.
+        # Presses and releases, chords need to know which modifiers are still held
+        if self.hooked != handler:
+            if self.hooked:
+                keyboard.unhook(self.hooked)
+            keyboard.hook(handler)
+            self.hooked = handler
+
+        keyboard.wait()
 
     @handle_subprocess_error
     def open_app(self, app_name):
-        subprocess.run(["open", "-a", app_name], check=True)
+        self.launch(["open", "-a", app_name])
 
     @handle_subprocess_error
     def open_url(self, url):
-        subprocess.run(["open", url], check=True)
+        self.launch(["open", url])
+
+    def launch(self, command):
+        # The worker does not wait for `open`, a failure is reported once the helper sees it exit
+        if not self.application.spawner.spawn(command, on_exit=report_failure):
+            subprocess.run(command, check=True)
 
     @handle_subprocess_error
-    def execture_osascript(self, command):
-        subprocess.run(["osascript", "-e", command], check=False)
+    def execture_osascript(self, command, name=None, args=()):
+        if name:
+            try:
+                self.script_host.run(name, command, args)
+                return True
+            except ScriptError as e:
+                print(f"DEBUG: Błąd skryptu {name}: {e}")
+                return False
+            except (ScriptHostError, OSError) as e:
+                print(f"DEBUG: Host skryptów niedostępny, uruchamiam osascript: {e}")
+
+        return self.application.spawner.run(["osascript", "-e", command, *map(str, args)]).returncode == 0
+
+    def query_osascript(self, command, name, args=()):
+        try:
+            return self.script_host.run(name, command, args)
+        except ScriptError as e:
+            print(f"DEBUG: Błąd skryptu {name}: {e}")
+            return None
+        except (ScriptHostError, OSError) as e:
+            print(f"DEBUG: Host skryptów niedostępny, uruchamiam osascript: {e}")
+
+        result = self.application.spawner.run(
+            ["osascript", "-e", command, *map(str, args)], capture_output=True, text=True
+        )
+
+        return result.stdout.strip() if result.returncode == 0 else None
 
     # Audio
-    def volume_up(self):
+    def volume_up(self, steps=1):
+        if self.state.adjust("volume", 5 * steps):
+            return
+
+        # Unknown state (no volume control on this output) or a failed write, fall back to the relative script
         self.execture_osascript(
-            command="set volume output volume (output volume of (get volume settings) + 5) --100 max"
+            name="volume_up",
+            command=run_handler(
+                "set volume output volume (output volume of (get volume settings) + (item 1 of argv as integer))"
+            ),
+            args=(5 * steps,),
         )
 
-    def volume_down(self):
+    def volume_down(self, steps=1):
+        if self.state.adjust("volume", -5 * steps):
+            return
+
         self.execture_osascript(
-            command="set volume output volume (output volume of (get volume settings) - 5) --100 max"
+            name="volume_down",
+            command=run_handler(
+                "set volume output volume (output volume of (get volume settings) - (item 1 of argv as integer))"
+            ),
+            args=(5 * steps,),
         )
 
     def mute_unmute(self):
+        if self.state.toggle("muted"):
+            return
+
         self.execture_osascript(
+            name="mute_unmute",
             command="""
             set currentMute to output muted of (get volume settings)
             if currentMute then
@@ -249,12 +362,16 @@ class MacOS(System):
             else
                 set volume output muted true
             end if
-        """
+        """,
         )
 
     # Apple Music
     def toggle_apple_music(self):
+        if self.state.toggle_player("player:music"):
+            return
+
         self.execture_osascript(
+            name="toggle_apple_music",
             command="""
         tell application "Music"
             if player state is playing then
@@ -263,18 +380,26 @@ class MacOS(System):
                 play
             end if
         end tell
-        """
+        """,
         )
 
-    def next_track_apple_music(self):
-        self.execture_osascript(command='tell application "Music" to next track')
+    def next_track_apple_music(self, steps=1):
+        self.execture_osascript(
+            name="next_track_apple_music", command=repeat_script("Music", "next track"), args=(steps,)
+        )
 
-    def previous_track_apple_music(self):
-        self.execture_osascript(command='tell application "Music" to previous track')
+    def previous_track_apple_music(self, steps=1):
+        self.execture_osascript(
+            name="previous_track_apple_music", command=repeat_script("Music", "previous track"), args=(steps,)
+        )
 
     # Spotify
     def toggle_spotify(self):
+        if self.state.toggle_player("player:spotify"):
+            return
+
         self.execture_osascript(
+            name="toggle_spotify",
             command="""
         tell application "Spotify"
             if player state is playing then
@@ -283,32 +408,41 @@ class MacOS(System):
                 play
             end if
         end tell
-        """
+        """,
         )
 
-    def next_track_spotify(self):
-        self.execture_osascript(command='tell application "Spotify" to next track')
+    def next_track_spotify(self, steps=1):
+        self.execture_osascript(
+            name="next_track_spotify", command=repeat_script("Spotify", "next track"), args=(steps,)
+        )
 
-    def previous_track_spotify(self):
-        self.execture_osascript(command='tell application "Spotify" to previous track')
+    def previous_track_spotify(self, steps=1):
+        self.execture_osascript(
+            name="previous_track_spotify", command=repeat_script("Spotify", "previous track"), args=(steps,)
+        )
 
     # Brightness
-    def increase_brightness(self):
-        self.execture_osascript(command='tell application "System Events" to key code 144')
+    def increase_brightness(self, steps=1):
+        self.execture_osascript(
+            name="increase_brightness", command=repeat_script("System Events", "key code 144"), args=(steps,)
+        )
 
-    def decrease_brightness(self):
-        self.execture_osascript(command='tell application "System Events" to key code 145')
+    def decrease_brightness(self, steps=1):
+        self.execture_osascript(
+            name="decrease_brightness", command=repeat_script("System Events", "key code 145"), args=(steps,)
+        )
 
     # Sidebar (calendar, battery lvl etc.)
     def toggle_bar(self):
         self.execture_osascript(
+            name="toggle_bar",
             command="""
         tell application "System Events"
             tell process "ControlCenter"
                 click menu bar item 1 of menu bar 1
             end tell
         end tell
-        """
+        """,
         )
 
     def open_calculator(self):
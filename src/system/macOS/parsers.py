@@ -0,0 +1,96 @@
+import base64
+import xml.etree.ElementTree as ElementTree
+
+from src.device.device import Device
+
+INPUT_DEVICE_KEYWORDS = ("Keyboard", "Trackpad", "Mouse")
+
+
+# ioreg -a (XML plist)
+def iter_plist_records(stream):
+    # Yields every top-level dict as soon as its closing tag is read: plist > array > dict
+    depth = 0
+
+    for event, element in ElementTree.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            continue
+
+        depth -= 1
+
+        if depth == 2 and element.tag == "dict":
+            yield plist_value(element)
+            element.clear()
+
+
+def plist_value(element):
+    tag = element.tag
+
+    if tag == "dict":
+        children = list(element)
+        return {children[index].text or "": plist_value(children[index + 1]) for index in range(0, len(children), 2)}
+    if tag == "array":
+        return [plist_value(child) for child in element]
+    if tag == "integer":
+        return int(element.text)
+    if tag == "real":
+        return float(element.text)
+    if tag == "true":
+        return True
+    if tag == "false":
+        return False
+    if tag == "data":
+        return base64.b64decode(element.text or "")
+
+    return element.text or ""
+
+
+def parse_active_input_device(stream):
+    for record in iter_plist_records(stream):
+        device_name = record.get("Product")
+
+        if device_name and any(keyword in device_name for keyword in INPUT_DEVICE_KEYWORDS):
+            return device_name
+
+    return None
+
+
+def parse_builtin_keyboard(stream):
+    for record in iter_plist_records(stream):
+        if record.get("Product"):
+            return Device(name=record["Product"], device_id=record.get("ProductID"), device_type="Builtin")
+
+    return None
+
+
+# system_profiler -json
+def parse_hex_id(value):
+    try:
+        return int(value.split()[0], 16)
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def iter_usb_devices(items):
+    for item in items:
+        if "product_id" in item:
+            yield Device(name=item["_name"], device_id=parse_hex_id(item["product_id"]), device_type="USB")
+
+        yield from iter_usb_devices(item.get("_items", []))
+
+
+def parse_usb_devices(data):
+    return list(iter_usb_devices(data.get("SPUSBDataType", [])))
+
+
+def parse_bluetooth_devices(data):
+    devices = []
+
+    for controller in data.get("SPBluetoothDataType", []):
+        for entry in controller.get("device_connected", []):
+            for device_name, properties in entry.items():
+                # Kept as the "0x..." string the text output gave, so device_id of existing config entries still matches
+                device_id = properties.get("device_productID")
+                devices.append(Device(name=device_name, device_id=device_id, device_type="Bluetooth"))
+
+    return devices
@@ -0,0 +1,102 @@
+// Long-lived AppleScript host: reads JSON requests from stdin, one per line,
+// compiles each script once with NSAppleScript and runs it on demand.
+ObjC.import("Foundation");
+
+// Four-character codes of the "open application" event, which calls a script's run handler
+const kCoreEventClass = 0x61657674; // 'aevt'
+const kAEOpenApplication = 0x6f617070; // 'oapp'
+const keyDirectObject = 0x2d2d2d2d; // '----'
+const kAutoGenerateReturnID = -1;
+const kAnyTransactionID = 0;
+
+const scripts = {};
+
+function describeError(error) {
+    const info = ObjC.deepUnwrap(error[0]);
+    return info ? String(info.NSAppleScriptErrorMessage || JSON.stringify(info)) : "unknown error";
+}
+
+function handle(request) {
+    if (request.op === "compile") {
+        const script = $.NSAppleScript.alloc.initWithSource($(request.source));
+        const error = Ref();
+
+        if (!script.compileAndReturnError(error)) {
+            return { ok: false, error: describeError(error) };
+        }
+
+        scripts[request.name] = script;
+        return { ok: true };
+    }
+
+    if (request.op === "run") {
+        const script = scripts[request.name];
+
+        if (!script) {
+            return { ok: false, error: "unknown script " + request.name };
+        }
+
+        const error = Ref();
+        const result = request.args
+            ? script.executeAppleEventError(runEvent(request.args), error)
+            : script.executeAndReturnError(error);
+
+        if (result.isNil()) {
+            return { ok: false, error: describeError(error) };
+        }
+
+        return { ok: true, result: ObjC.unwrap(result.stringValue) || "" };
+    }
+
+    return { ok: false, error: "unknown op " + request.op };
+}
+
+// Arguments reach the script's "on run argv" handler, so one compiled script serves every value
+function runEvent(args) {
+    const argv = $.NSAppleEventDescriptor.listDescriptor;
+    args.forEach((arg, index) => {
+        argv.insertDescriptorAtIndex($.NSAppleEventDescriptor.descriptorWithString($(arg)), index + 1);
+    });
+
+    const event = $.NSAppleEventDescriptor.appleEventWithEventClassEventIDTargetDescriptorReturnIDTransactionID(
+        kCoreEventClass,
+        kAEOpenApplication,
+        $.NSAppleEventDescriptor.nullDescriptor,
+        kAutoGenerateReturnID,
+        kAnyTransactionID
+    );
+    event.setParamDescriptorForKeyword(argv, keyDirectObject);
+
+    return event;
+}
+
+function run() {
+    const stdin = $.NSFileHandle.fileHandleWithStandardInput;
+    const stdout = $.NSFileHandle.fileHandleWithStandardOutput;
+    let buffer = "";
+
+    while (true) {
+        const data = stdin.availableData;
+
+        if (data.length === 0) {
+            return;
+        }
+
+        buffer += ObjC.unwrap($.NSString.alloc.initWithDataEncoding(data, $.NSUTF8StringEncoding));
+
+        let newline;
+        while ((newline = buffer.indexOf("\n")) >= 0) {
+            const line = buffer.slice(0, newline);
+            buffer = buffer.slice(newline + 1);
+
+            let response;
+            try {
+                response = handle(JSON.parse(line));
+            } catch (e) {
+                response = { ok: false, error: String(e) };
+            }
+
+            stdout.writeData($(JSON.stringify(response) + "\n").dataUsingEncoding($.NSUTF8StringEncoding));
+        }
+    }
+}
@@ -0,0 +1,174 @@
+import abc
+import json
+import os
+import selectors
+import subprocess
+import threading
+
+
+def run_handler(body):
+    # The script reads its values from argv, one compiled script serves every value it is run with
+    return f"""
+        on run argv
+            {body}
+        end run
+        """
+
+
+class ScriptHostError(Exception):
+    pass
+
+
+class ScriptError(Exception):
+    pass
+
+
+class ScriptTransport(abc.ABC):
+    @abc.abstractmethod
+    def start(self):
+        pass
+
+    @abc.abstractmethod
+    def stop(self):
+        pass
+
+    @abc.abstractmethod
+    def is_alive(self):
+        pass
+
+    @abc.abstractmethod
+    def request(self, message):
+        pass
+
+
+class ProcessTransport(ScriptTransport):
+    def __init__(self, command, timeout=5.0):
+        self.command = command
+        self.timeout = timeout
+
+        self.process = None
+        self.buffer = b""
+
+    def start(self):
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0)
+        self.buffer = b""
+
+    def stop(self):
+        if not self.process:
+            return
+
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+
+        self.process = None
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def request(self, message):
+        if not self.is_alive():
+            raise ScriptHostError("Proces hosta skryptów nie działa")
+
+        try:
+            self.process.stdin.write(json.dumps(message).encode("utf-8") + b"\n")
+        except OSError as e:
+            raise ScriptHostError(f"Nie udało się wysłać polecenia: {e}")
+
+        # A garbled reply means the host is out of step with us, it is restarted like a dead one
+        try:
+            return json.loads(self._read_line())
+        except ValueError as e:
+            raise ScriptHostError(f"Nieprawidłowa odpowiedź hosta skryptów: {e}")
+
+    def _read_line(self):
+        fd = self.process.stdout.fileno()
+
+        with selectors.DefaultSelector() as selector:
+            selector.register(fd, selectors.EVENT_READ)
+
+            while b"\n" not in self.buffer:
+                if not selector.select(self.timeout):
+                    self.process.kill()
+                    raise ScriptHostError("Przekroczono czas oczekiwania na odpowiedź hosta skryptów")
+
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    raise ScriptHostError("Host skryptów zakończył działanie")
+
+                self.buffer += chunk
+
+        line, self.buffer = self.buffer.split(b"\n", 1)
+        return line.decode("utf-8")
+
+
+class ScriptHost:
+    def __init__(self, transport):
+        self.transport = transport
+
+        self.scripts = {}
+        self.compiled = set()
+        self.lock = threading.Lock()
+        self.started = False
+        self.restart_count = 0
+
+    def register(self, name, source):
+        with self.lock:
+            if self.scripts.get(name) != source:
+                self.scripts[name] = source
+                self.compiled.discard(name)
+
+    def run(self, name, source=None, args=()):
+        if source is not None:
+            self.register(name, source)
+
+        with self.lock:
+            try:
+                return self._run(name, args)
+            except ScriptHostError as e:
+                print(f"DEBUG: Restart hosta skryptów po błędzie: {e}")
+                self._restart()
+                return self._run(name, args)
+
+    def stop(self):
+        with self.lock:
+            self.transport.stop()
+            self.started = False
+            self.compiled.clear()
+
+    def _run(self, name, args=()):
+        if not self.transport.is_alive():
+            if self.started:
+                self.restart_count += 1
+
+            self.transport.start()
+            self.started = True
+            self.compiled.clear()
+
+        if name not in self.compiled:
+            self._request({"op": "compile", "name": name, "source": self.scripts[name]})
+            self.compiled.add(name)
+
+        message = {"op": "run", "name": name}
+        if args:
+            # Passed to the script's run handler, values do not need a compiled script each
+            message["args"] = [str(arg) for arg in args]
+
+        return self._request(message).get("result")
+
+    def _request(self, message):
+        response = self.transport.request(message)
+
+        if not response.get("ok"):
+            raise ScriptError(response.get("error"))
+
+        return response
+
+    def _restart(self):
+        self.transport.stop()
+        self.transport.start()
+        self.compiled.clear()
+        self.restart_count += 1
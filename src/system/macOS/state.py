@@ -0,0 +1,56 @@
+from src.state.state_model import PAUSED, PLAYING
+from src.system.macOS.script_host import run_handler
+
+PLAYER_APPS = {"player:music": "Music", "player:spotify": "Spotify"}
+
+
+class AppleScriptStateProvider:
+    def __init__(self, system):
+        self.system = system
+
+    def read(self, key):
+        if key == "volume":
+            return parse_int(self.system.query_osascript("output volume of (get volume settings)", name="state_volume"))
+
+        if key == "muted":
+            result = self.system.query_osascript("output muted of (get volume settings)", name="state_muted")
+            return None if result is None else result == "true"
+
+        if key in PLAYER_APPS:
+            app = PLAYER_APPS[key]
+            result = self.system.query_osascript(
+                f'tell application "{app}" to player state as string', name=f"state_{key.replace(':', '_')}"
+            )
+            return None if result is None else PLAYING if result == "playing" else PAUSED
+
+        return None
+
+    def write(self, key, value):
+        # Absolute values only, so a write is a single run. The volume is an argument of one compiled script
+        if key == "volume":
+            return self.system.execture_osascript(
+                run_handler("set volume output volume (item 1 of argv as integer)"),
+                name="state_set_volume",
+                args=(value,),
+            )
+
+        if key == "muted":
+            flag = "true" if value else "false"
+            return self.system.execture_osascript(f"set volume output muted {flag}", name=f"state_set_muted_{flag}")
+
+        if key in PLAYER_APPS:
+            command = "play" if value == PLAYING else "pause"
+            return self.system.execture_osascript(
+                f'tell application "{PLAYER_APPS[key]}" to {command}',
+                name=f"state_set_{key.replace(':', '_')}_{command}",
+            )
+
+        return False
+
+
+def parse_int(result):
+    # "missing value" when the output device has no volume control
+    try:
+        return int(result)
+    except (TypeError, ValueError):
+        return None
@@ -1,3 +1,16 @@
 class System:
     def __init__(self, name):
         self.name = name
+        self.functions = []
+
+    def device_probes(self):
+        return {}
+
+    def device_fingerprints(self):
+        return {}
+
+    def get_foreground_app(self):
+        return None
+
+    def stop_device_listener(self):
+        pass
@@ -0,0 +1,156 @@
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt, QTimer
+from PyQt6.QtWidgets import QComboBox, QStyledItemDelegate
+
+KEY_COLUMN, FUNCTION_COLUMN, DELETE_COLUMN = range(3)
+FETCH_BATCH = 100
+
+
+class MacroModel(QAbstractTableModel):
+    def __init__(self, application, delete_icon, parent=None):
+        super().__init__(parent)
+
+        self.application = application
+        self.delete_icon = delete_icon
+
+        self.loaded = 0
+        self.capturing = None
+        self.captured_key = None
+
+    @property
+    def macros(self):
+        return self.application.macros
+
+    def reset(self, macros=None):
+        self.beginResetModel()
+        # The list is swapped inside the reset, the view never reads rows of the new list with the old count
+        if macros is not None:
+            self.application.macros = macros
+        self.loaded = min(len(self.macros), FETCH_BATCH)
+        self.capturing = None
+        self.endResetModel()
+
+    # Rows are handed to the view in batches as it scrolls
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.loaded < len(self.macros)
+
+    def fetchMore(self, parent=QModelIndex()):
+        count = min(FETCH_BATCH, len(self.macros) - self.loaded)
+
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 3
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return ("Klawisz", "Funkcja", "")[section]
+
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+
+        if index.column() == FUNCTION_COLUMN:
+            flags |= Qt.ItemFlag.ItemIsEditable
+
+        return flags
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        macro = self.macros[index.row()]
+        column = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == KEY_COLUMN:
+                if macro is self.capturing:
+                    return f"{self.captured_key}, ..." if self.captured_key else "Naciśnij klawisz..."
+                if macro.get("layer"):
+                    return f"{macro['layer']}: {macro['key']}"
+                return macro["key"] or "Ustaw klawisz"
+            if column == FUNCTION_COLUMN:
+                return macro.get("function") or "Wybierz funkcję"
+
+        if role == Qt.ItemDataRole.EditRole and column == FUNCTION_COLUMN:
+            return macro.get("function", "")
+
+        if role == Qt.ItemDataRole.DecorationRole and column == DELETE_COLUMN:
+            return self.delete_icon
+
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or index.column() != FUNCTION_COLUMN:
+            return False
+
+        macro = self.macros[index.row()]
+        if macro["function"] == value:
+            return False
+
+        self.application.save_macro(macro["key"], value)
+        self.dataChanged.emit(index, index)
+
+        return True
+
+    def append_macro(self):
+        row = len(self.macros)
+        visible = self.loaded == row
+
+        if visible:
+            self.beginInsertRows(QModelIndex(), row, row)
+
+        self.macros.append({"key": "", "function": ""})
+        self.application.save_macro("", "")
+
+        if visible:
+            self.loaded += 1
+            self.endInsertRows()
+
+    def remove_macro(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.application.delete_macro(self.macros[row])
+        self.loaded -= 1
+        self.endRemoveRows()
+
+    def set_capturing(self, macro, captured_key=None):
+        previous, self.capturing = self.capturing, macro
+        self.captured_key = captured_key
+
+        for changed in (previous, macro):
+            self.macro_changed(changed)
+
+    def macro_changed(self, macro):
+        for row in range(self.loaded):
+            if self.macros[row] is macro:
+                self.dataChanged.emit(self.index(row, KEY_COLUMN), self.index(row, DELETE_COLUMN))
+                return
+
+
+class FunctionDelegate(QStyledItemDelegate):
+    def __init__(self, functions_model, parent=None):
+        super().__init__(parent)
+
+        self.functions_model = functions_model
+
+    def createEditor(self, parent, option, index):
+        # Every editor shares one list model instead of copying all functions into its own items
+        editor = QComboBox(parent)
+        editor.setModel(self.functions_model)
+        editor.activated.connect(lambda _: self.commit_and_close(editor))
+
+        QTimer.singleShot(0, editor.showPopup)
+
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setCurrentText(index.data(Qt.ItemDataRole.EditRole))
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentText(), Qt.ItemDataRole.EditRole)
+
+    def commit_and_close(self, editor):
+        self.commitData.emit(editor)
+        self.closeEditor.emit(editor)
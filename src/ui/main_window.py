@@ -1,29 +1,48 @@
 import os
-from functools import partial
 
-from PyQt6.QtCore import QRect, QSize
-from PyQt6.QtGui import QFontMetrics, QIcon
+from PyQt6.QtCore import QRect, QSize, QStringListModel, QTimer, pyqtSignal
+from PyQt6.QtGui import QFontMetrics
 from PyQt6.QtWidgets import (
-    QVBoxLayout,
-    QWidget,
+    QAbstractItemView,
     QComboBox,
-    QSizePolicy,
-    QPushButton,
     QHBoxLayout,
+    QHeaderView,
+    QInputDialog,
     QLabel,
-    QGridLayout,
-    QScrollArea,
+    QPushButton,
+    QSizePolicy,
+    QTableView,
+    QVBoxLayout,
+    QWidget,
+)
+
+from src.application.keymap import KeyRecorder
+from src.ui.macro_model import (
+    DELETE_COLUMN,
+    FUNCTION_COLUMN,
+    KEY_COLUMN,
+    FunctionDelegate,
+    MacroModel,
 )
+from src.ui.resources import resources
 
 os.environ["QT_FONT_DPI"] = "96"
 
+DEFAULT_PROFILE = "Wszystkie aplikacje"
+
 
 class Window(QWidget):
+    probe_finished = pyqtSignal(str, object, object)
+    discovery_finished = pyqtSignal(object)
+    key_captured = pyqtSignal(object, str, bool)
+    config_reloaded = pyqtSignal()
+
     def __init__(self, application):
         super().__init__()
 
         self.application = application
         self.style_file = "src/ui/themes/py_dracula_dark.qss"
+        self.stylesheet = None
 
         self.setWindowTitle(f"{self.application.settings['APP_NAME']} {self.application.system.name}")
         self.setGeometry(*self.application.settings["APP_GEOMETRY"])
@@ -48,48 +67,89 @@ class Window(QWidget):
         self.device_select.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
         self.device_select.currentIndexChanged.connect(self.on_select_device)
 
+        # Profiles of the selected device, the default one applies to every app without a profile of its own
+        self.profile_select = QComboBox()
+        self.profile_select.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
+        self.profile_select.currentIndexChanged.connect(self.on_select_profile)
+
+        self.probe_finished.connect(self.on_probe_finished)
+        self.discovery_finished.connect(self.on_discovery_finished)
+        self.key_captured.connect(self.on_key_captured)
+        self.config_reloaded.connect(self.on_config_reloaded)
+        self.application.config_listeners.append(self.config_reloaded.emit)
+
         add_new_macro_button = self.button_with_icon(
             text="Dodaj makro", icon="src/ui/icons/plus-solid.svg", on_click=self.add_macro_section
         )
 
         refresh_device_select_button = self.button_with_icon(
-            text="Odśwież", icon="src/ui/icons/rotate-solid.svg", on_click=self.refresh_device_list
+            text="Odśwież", icon="src/ui/icons/rotate-solid.svg", on_click=self.rescan_devices
         )
 
+        add_profile_button = self.button_with_icon(
+            text="Dodaj profil", icon="src/ui/icons/plus-solid.svg", on_click=self.add_profile
+        )
+
+        self.delete_profile_button = self.button_with_icon(
+            text="Usuń profil", icon="src/ui/icons/trash-solid.svg", on_click=self.delete_profile
+        )
+        self.delete_profile_button.setEnabled(False)
+
         self.navbar.addWidget(self.device_select, stretch=1)
         self.navbar.addWidget(refresh_device_select_button, stretch=0)
+        self.navbar.addWidget(self.profile_select, stretch=1)
+        self.navbar.addWidget(add_profile_button, stretch=0)
+        self.navbar.addWidget(self.delete_profile_button, stretch=0)
         self.navbar.addWidget(add_new_macro_button, stretch=0)
 
         self.main_layout.addWidget(self.navbar_widget)
 
-        # Content
-        self.scroll_area = QScrollArea(self)
-        self.scroll_area.setWidgetResizable(True)
-
-        self.content_widget = QWidget(self)
-        self.content_widget.setObjectName("content_widget")
-
-        self.content_layout = QVBoxLayout()
-        self.content_layout.setContentsMargins(0, 0, 0, 0)
-
-        self.content_widget.setLayout(self.content_layout)
-
-        self.scroll_area.setWidget(self.content_widget)
-
-        self.main_layout.addWidget(self.scroll_area)
-
         # Macro list
-        self.macro_grid = QGridLayout()
-        self.macro_grid.setContentsMargins(0, 0, 0, 0)
-        self.macro_grid.setSpacing(0)
-
-        self.content_layout.addLayout(self.macro_grid)
+        self.functions_model = QStringListModel(self.application.actions.names())
+        self.macro_model = MacroModel(
+            application=self.application, delete_icon=resources.icon("src/ui/icons/trash-solid.svg")
+        )
 
+        self.macro_view = QTableView(self)
+        self.macro_view.setObjectName("content_widget")
+        self.macro_view.setModel(self.macro_model)
+        self.macro_view.setItemDelegateForColumn(
+            FUNCTION_COLUMN, FunctionDelegate(functions_model=self.functions_model, parent=self.macro_view)
+        )
+        self.macro_view.setEditTriggers(
+            QAbstractItemView.EditTrigger.CurrentChanged | QAbstractItemView.EditTrigger.SelectedClicked
+        )
+        self.macro_view.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.macro_view.verticalHeader().setVisible(False)
+        self.macro_view.verticalHeader().setDefaultSectionSize(36)
+        self.macro_view.horizontalHeader().setSectionResizeMode(KEY_COLUMN, QHeaderView.ResizeMode.Stretch)
+        self.macro_view.horizontalHeader().setSectionResizeMode(FUNCTION_COLUMN, QHeaderView.ResizeMode.Stretch)
+        self.macro_view.horizontalHeader().setSectionResizeMode(DELETE_COLUMN, QHeaderView.ResizeMode.Fixed)
+        self.macro_view.horizontalHeader().resizeSection(DELETE_COLUMN, 40)
+        self.macro_view.clicked.connect(self.on_macro_clicked)
+
+        self.main_layout.addWidget(self.macro_view)
+
+        # A multi-key binding is complete once no further key is pressed for the sequence timeout
+        self.captured_key = None
+        self.capture_timer = QTimer(self)
+        self.capture_timer.setSingleShot(True)
+        self.capture_timer.setInterval(int(self.application.settings["KEY_SEQUENCE_TIMEOUT"] * 1000))
+        self.capture_timer.timeout.connect(self.finish_key_capture)
+
+        self.application.load_cached_devices()
+        self.show_devices()
+
+        self.application.profiler.begin("device_scan")
         self.refresh_device_list()
-        self.application.start_keyboard_listener()
 
     def reload_stylesheet(self):
-        self.setStyleSheet(open(self.style_file, "r").read())
+        stylesheet = resources.stylesheet(self.style_file)
+
+        # Applying a stylesheet re-polishes every widget, so only do it when the file changed
+        if stylesheet is not self.stylesheet:
+            self.stylesheet = stylesheet
+            self.setStyleSheet(stylesheet)
 
     def button_with_icon(self, text, icon, on_click):
         button = QPushButton()
@@ -100,8 +160,7 @@ class Window(QWidget):
         button_layout.setSpacing(8)
 
         icon_label = QLabel()
-        icon = QIcon(icon)
-        icon_label.setPixmap(icon.pixmap(QSize(18, 18)))
+        icon_label.setPixmap(resources.pixmap(icon, QSize(18, 18), self.devicePixelRatioF()))
 
         text_label = QLabel(text)
 
@@ -124,107 +183,171 @@ class Window(QWidget):
         if not self.application.current_device:
             return
 
-        new_macro = {"key": "", "function": ""}
-        self.application.macros.append(new_macro)
-
-        self.application.save_macro("", "")
+        # Macros are saved by key, a second row without one could never be stored, so the unset row is picked instead
+        for macro in self.application.macros:
+            if not macro["key"]:
+                self.listen_for_key(macro)
+                return
 
-        self.populate_macro_list()
+        self.macro_model.append_macro()
 
-    def refresh_device_list(self):
+    def refresh_device_list(self, force=False):
         self.reload_stylesheet()
 
-        self.application.recognized_devices = self.application.system.recognize_devices()
-        self.device_select.clear()
-        self.device_select.addItems([device.name for device in self.application.recognized_devices])
+        self.application.device_discovery.discover(
+            on_result=self.probe_finished.emit,
+            on_finished=self.discovery_finished.emit,
+            force=force,
+        )
 
-        data = self.application.load_device_config()
+    def rescan_devices(self):
+        self.refresh_device_list(force=True)
 
-        serializable_data = []
+    def on_probe_finished(self, name, devices, error):
+        if error:
+            self.application.mark_probe_failed(name)
+            return
 
-        for device in self.application.recognized_devices:
-            device_dict = {
-                "device": device.name,
-                "device_id": device.id,
-                "device_type": device.type,
-                "macros": next((entry["macros"] for entry in data if entry["device"] == device.name), []),
-            }
+        self.application.update_probe_devices(name, devices)
+        self.show_devices()
 
-            serializable_data.append(device_dict)
+    def on_discovery_finished(self, devices):
+        self.application.sync_recognized_devices(self.application.recognized_devices)
+        self.application.finish_device_scan()
 
-        self.application.device_config.save_file(serializable_data)
+    def show_devices(self):
+        names = [device.name for device in self.application.recognized_devices]
+        current_device = self.device_select.currentText()
+
+        if names == [self.device_select.itemText(index) for index in range(self.device_select.count())]:
+            return
+
+        self.device_select.blockSignals(True)
+        self.device_select.clear()
+        self.device_select.addItems(names)
+        if current_device in names:
+            self.device_select.setCurrentText(current_device)
+        self.device_select.blockSignals(False)
+
+        if self.device_select.currentText() != current_device:
+            self.on_select_device()
 
     def on_select_device(self):
-        selected_device = self.device_select.currentText()
-        self.application.current_device = selected_device
-        self.application.macros = self.application.load_macros_for_device(selected_device) or []
-        self.populate_macro_list()
+        self.application.current_device = self.device_select.currentText()
+        self.application.current_profile = None
+        self.show_profiles()
+        self.load_macros()
+
+    def on_config_reloaded(self):
+        self.show_profiles()
+        self.load_macros()
+
+    def show_profiles(self):
+        profiles = self.application.load_profiles_for_device(self.application.current_device)
+
+        # A profile removed from the file while it was open falls back to the default one
+        if self.application.current_profile not in profiles:
+            self.application.current_profile = None
+
+        self.profile_select.blockSignals(True)
+        self.profile_select.clear()
+        self.profile_select.addItem(DEFAULT_PROFILE)
+        self.profile_select.addItems(profiles)
+        if self.application.current_profile is not None:
+            self.profile_select.setCurrentIndex(profiles.index(self.application.current_profile) + 1)
+        self.profile_select.blockSignals(False)
+
+        self.delete_profile_button.setEnabled(self.application.current_profile is not None)
+
+    def on_select_profile(self, index):
+        self.application.current_profile = self.profile_select.itemText(index) if index > 0 else None
+        self.delete_profile_button.setEnabled(self.application.current_profile is not None)
+        self.load_macros()
+
+    def add_profile(self):
+        if not self.application.current_device:
+            return
 
-    def populate_macro_list(self):
-        while self.macro_grid.count():
-            item = self.macro_grid.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
+        app, accepted = QInputDialog.getText(self, "Nowy profil", "Nazwa aplikacji:")
+        app = app.strip()
 
-        num_columns = 2
-        row, col = 0, 0
+        if not accepted or not app or not self.application.add_profile(app):
+            return
 
-        for macro in self.application.macros:
-            item_widget = QWidget()
-            layout = QHBoxLayout()
+        self.application.current_profile = app
+        self.show_profiles()
+        self.load_macros()
 
-            key_button = QPushButton(macro["key"] if macro["key"] else "Ustaw klawisz")
-            key_button.setFixedHeight(30)
-            key_button.clicked.connect(partial(self.application.system.listen_for_key, macro, key_button))
+    def delete_profile(self):
+        if self.application.current_profile is None:
+            return
 
-            function_select = QComboBox()
-            for function in self.application.system.functions:
-                function_select.addItem(function["name"])
+        self.application.delete_profile(self.application.current_profile)
+        self.application.current_profile = None
+        self.show_profiles()
+        self.load_macros()
 
-            function_select.setCurrentText(macro.get("function", "Wybierz funkcję"))
-            function_select.setFixedHeight(30)
-            function_select.currentIndexChanged.connect(
-                lambda _, k=macro["key"], f=function_select: self.on_macro_change(k, f.currentText())
-            )
+    def load_macros(self):
+        self.populate_macro_list(
+            self.application.load_macros_for_device(self.application.current_device, self.application.current_profile)
+            or []
+        )
 
-            delete_button = QPushButton()
-            delete_button.setIcon(QIcon("src/ui/icons/trash-solid.svg"))
-            delete_button.setFixedSize(30, 30)
-            delete_button.clicked.connect(partial(self.delete_macro, macro))
+    def populate_macro_list(self, macros):
+        self.macro_model.reset(macros)
 
-            layout.addWidget(key_button)
-            layout.addWidget(function_select)
-            layout.addWidget(delete_button)
-            item_widget.setLayout(layout)
+    def on_macro_clicked(self, index):
+        if index.column() == KEY_COLUMN:
+            self.listen_for_key(self.application.macros[index.row()])
+        elif index.column() == DELETE_COLUMN:
+            self.macro_model.remove_macro(index.row())
 
-            self.macro_grid.addWidget(item_widget, row, col)
+    def listen_for_key(self, macro):
+        self.finish_key_capture()
+        self.macro_model.set_capturing(macro)
 
-            col += 1
-            if col >= num_columns:
-                col = 0
-                row += 1
+        recorder = KeyRecorder(max_steps=self.application.settings["KEY_SEQUENCE_MAX_STEPS"])
 
-        self.content_layout.addStretch(1)
+        # Runs on the listener thread, every recorded step is handed over to the window through the signal
+        def capture(event):
+            if recorder.feed(event):
+                self.key_captured.emit(macro, recorder.key, recorder.full)
 
-    def on_macro_change(self, key, function_name):
-        self.application.save_macro(key, function_name)
-        self.application.macros = self.application.load_macros_for_device(self.application.current_device)
+            return not recorder.full
 
-    def delete_macro(self, macro):
-        if not self.application.current_device:
+        self.application.listener.capture_keys(capture)
+
+    def on_key_captured(self, macro, key, full):
+        # A step recorded for a capture that has already been finished or replaced
+        if macro is not self.macro_model.capturing:
             return
 
-        data = self.application.load_device_config()
+        self.captured_key = (macro, key)
+        self.macro_model.set_capturing(macro, key)
 
-        for entry in data:
-            if entry["device"] == self.application.current_device:
-                if macro in entry["macros"]:
-                    entry["macros"].remove(macro)
-                    break
+        if full:
+            self.finish_key_capture()
+        else:
+            self.capture_timer.start()
+
+    def finish_key_capture(self):
+        self.capture_timer.stop()
+        self.application.listener.cancel_capture()
+
+        if self.macro_model.capturing is None:
+            return
+
+        captured, self.captured_key = self.captured_key, None
+        self.macro_model.set_capturing(None)
+
+        if not captured:
+            return
 
-        self.application.device_config.save_file(data)
+        macro, new_key = captured
 
-        if macro in self.application.macros:
-            self.application.macros.remove(macro)
+        for existing_macro in self.application.macros:
+            if existing_macro["key"] == new_key:
+                return
 
-        self.populate_macro_list()
+        self.application.update_macro_key(macro["key"], new_key)
+        self.macro_model.macro_changed(macro)
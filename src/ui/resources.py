@@ -0,0 +1,49 @@
+import os
+
+from PyQt6.QtCore import QSize
+from PyQt6.QtGui import QIcon
+
+
+class ResourceCache:
+    def __init__(self):
+        self.entries = {}
+        self.stats = {kind: {"hits": 0, "misses": 0} for kind in ("stylesheet", "icon", "pixmap")}
+
+    def stylesheet(self, path):
+        return self._get("stylesheet", path, (path,), lambda: read_text(path))
+
+    def icon(self, path):
+        return self._get("icon", path, (path,), lambda: QIcon(path))
+
+    def pixmap(self, path, size, device_pixel_ratio=1.0):
+        if not isinstance(size, QSize):
+            size = QSize(size, size)
+
+        key = (path, size.width(), size.height(), device_pixel_ratio)
+        return self._get("pixmap", path, key, lambda: self.icon(path).pixmap(size, device_pixel_ratio))
+
+    def clear(self):
+        self.entries.clear()
+
+    def _get(self, kind, path, key, load):
+        # Entries stay valid until the file on disk gets a new mtime
+        mtime = os.stat(path).st_mtime_ns
+        entry = self.entries.get((kind, key))
+
+        if entry and entry[0] == mtime:
+            self.stats[kind]["hits"] += 1
+            return entry[1]
+
+        self.stats[kind]["misses"] += 1
+        value = load()
+        self.entries[(kind, key)] = (mtime, value)
+
+        return value
+
+
+def read_text(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+resources = ResourceCache()